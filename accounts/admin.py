@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from accounts.models import CustomUser
+from accounts.models import CustomUser, Notification
 from admins.models import DoctorAllocation
 from doctors.models import DoctorAvailability  # Replaced DoctorSchedule with DoctorAvailability
 
@@ -94,3 +94,15 @@ except admin.sites.NotRegistered:
 
 # Now register our custom admin
 admin.site.register(CustomUser, CustomUserAdmin)
+
+
+# -----------------------------
+# Notification Queue
+# -----------------------------
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'user', 'created_at', 'sent_at', 'attempts')
+    list_filter = ('sent_at', 'created_at')
+    search_fields = ('subject', 'user__username', 'user__email')
+    readonly_fields = ('created_at', 'sent_at', 'attempts')
+    raw_id_fields = ('user',)
@@ -0,0 +1,62 @@
+# accounts/counters.py
+"""
+Denormalized counters for dashboard widgets.
+
+A counter row is changed with a single UPDATE ... SET n = n + delta, so
+concurrent writers never lose each other's increments, and the row is
+created on first use. Counters are kept in step by model hooks; writes that
+bypass them (queryset updates, raw SQL, restores) are repaired by the
+nightly `manage.py reconcile_counters`.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import CustomUser, RoleCount
+
+
+def bump(model, key, **deltas):
+    """Add `deltas` ({column: n}) to the counter row matching `key` ({column: value})."""
+    changes = {column: F(column) + delta for column, delta in deltas.items() if delta}
+    if not changes:
+        return
+    if model.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key)
+    except IntegrityError:
+        pass  # created by a concurrent writer
+    model.objects.filter(**key).update(**changes)
+
+
+# -----------------------------
+# Users by role
+# -----------------------------
+def count_role(role, delta):
+    if role:
+        bump(RoleCount, {'role': role}, count=delta)
+
+
+def role_counts():
+    """{role: number of users} for every role, from the counter rows."""
+    counts = dict.fromkeys((role for role, _ in CustomUser.ROLE_CHOICES), 0)
+    counts.update(RoleCount.objects.values_list('role', 'count'))
+    return counts
+
+
+def reconcile_role_counts(dry_run=False):
+    """Recount users by role; returns {role: (counted, actual)} for the rows that were off."""
+    actual = dict.fromkeys(role_counts(), 0)
+    actual.update(
+        CustomUser.objects.order_by().values('role').annotate(n=Count('id')).values_list('role', 'n')
+    )
+    stored = dict(RoleCount.objects.values_list('role', 'count'))
+    drift = {
+        role: (stored.get(role, 0), count)
+        for role, count in actual.items()
+        if stored.get(role, 0) != count
+    }
+    if not dry_run:
+        for role, (counted, count) in drift.items():
+            bump(RoleCount, {'role': role}, count=count - counted)
+    return drift
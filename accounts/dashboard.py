@@ -0,0 +1,64 @@
+# accounts/dashboard.py
+"""
+Role dashboards are a light shell plus one fragment per tab.
+
+The shell renders a single tab inline (?tab=, else the default); the other
+panes hold their fragment URL and are fetched the first time they are shown
+(see templates/dashboard_tabs.html). Each tab has its own template and a
+function building just that tab's context, so a page load only runs the
+queries of the tab on screen.
+"""
+from django.http import Http404
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+
+class DashboardTabs:
+    def __init__(self, url_name, template_dir, default):
+        self.url_name = url_name
+        self.template_dir = template_dir
+        self.default = default
+        self.builders = {}
+
+    def tab(self, name):
+        """Register a function(request) -> context dict for a tab; tabs keep registration order."""
+        def register(builder):
+            self.builders[name] = builder
+            return builder
+        return register
+
+    def template_name(self, name):
+        return f"{self.template_dir}/{name}.html"
+
+    def _context(self, request, name, extra):
+        return {**self.builders[name](request), **extra}
+
+    def render_shell(self, request, template, active=None, **extra):
+        """
+        Render the dashboard page with one tab filled in. `extra` goes to
+        that tab's template, e.g. a bound form with errors.
+        """
+        if active is None:
+            active = request.GET.get('tab')
+        if active not in self.builders:
+            active = self.default
+
+        tabs = []
+        for name in self.builders:
+            html = None
+            if name == active:
+                html = render_to_string(self.template_name(name), self._context(request, name, extra), request=request)
+            tabs.append({
+                'name': name,
+                'url': reverse(self.url_name, args=[name]),
+                'active': name == active,
+                'html': html,
+            })
+        return render(request, template, {'tabs': tabs, 'active_tab': active})
+
+    def render_tab(self, request, name):
+        """The fragment for one tab, as fetched by the shell."""
+        if name not in self.builders:
+            raise Http404("No such dashboard tab.")
+        return render(request, self.template_name(name), self._context(request, name, {}))
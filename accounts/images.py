@@ -0,0 +1,143 @@
+# accounts/images.py
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PICTURE_DIR = 'profile_pics'
+THUMBNAIL_DIR = os.path.join(PROFILE_PICTURE_DIR, 'thumbs')
+
+# Square thumbnails, in pixels; 'medium' covers the 100–150px dashboard avatars on high-DPI screens
+THUMBNAIL_SIZES = {
+    'small': 64,
+    'medium': 192,
+}
+
+# Prefer WebP; fall back to JPEG when Pillow was built without it
+THUMBNAIL_FORMAT, THUMBNAIL_EXT = ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+
+# Thumbnails are rendered off the request path by a small in-process pool
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='thumbnails')
+
+# Pictures with a job already queued; identical uploads share one file, so
+# two saves in quick succession must not render (and save) it twice
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def content_hash(file):
+    """SHA-256 of an uploaded file's content; leaves the file rewound."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks() if hasattr(file, 'chunks') else iter(lambda: file.read(65536), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def hashed_picture_name(file, filename):
+    """Storage name for a profile picture: identical content, identical name."""
+    ext = os.path.splitext(filename)[1].lower() or '.jpg'
+    return os.path.join(PROFILE_PICTURE_DIR, f"{content_hash(file)}{ext}")
+
+
+def thumbnail_name(picture_name, size):
+    stem = os.path.splitext(os.path.basename(picture_name))[0]
+    return os.path.join(THUMBNAIL_DIR, f"{stem}_{size}.{THUMBNAIL_EXT}")
+
+
+def thumbnail_url(picture_name, size='medium'):
+    """URL of a picture's thumbnail; only valid once it has been rendered."""
+    return default_storage.url(thumbnail_name(picture_name, size))
+
+
+def generate_thumbnails(picture_name):
+    """Render every thumbnail size for a stored picture, skipping existing ones."""
+    pending = {
+        label: thumbnail_name(picture_name, label)
+        for label in THUMBNAIL_SIZES
+        if not default_storage.exists(thumbnail_name(picture_name, label))
+    }
+    if not pending:
+        return
+
+    with default_storage.open(picture_name, 'rb') as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGB')
+
+    for label, name in pending.items():
+        size = THUMBNAIL_SIZES[label]
+        thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        thumb.save(buffer, THUMBNAIL_FORMAT, quality=82)
+        saved_name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        if saved_name != name:
+            # Another process rendered it first; keep theirs
+            default_storage.delete(saved_name)
+
+
+def delete_picture(picture_name):
+    """Remove a picture and all of its thumbnails from storage."""
+    for name in [picture_name] + [thumbnail_name(picture_name, label) for label in THUMBNAIL_SIZES]:
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def _run(func, picture_name):
+    try:
+        func(picture_name)
+    except Exception:
+        logger.exception("%s failed for %s", func.__name__, picture_name)
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(picture_name)
+        # Jobs may query the database; don't leave this thread's connection open
+        connections.close_all()
+
+
+def _submit(func, picture_name):
+    with _in_flight_lock:
+        if picture_name in _in_flight:
+            return
+        _in_flight.add(picture_name)
+    _executor.submit(_run, func, picture_name)
+
+
+def schedule_thumbnails(picture_name, mark_ready):
+    """
+    Generate thumbnails in the background once the current transaction
+    commits, then call mark_ready(picture_name) so pages can link to them
+    without asking storage whether they exist.
+    """
+    def generate_and_mark_thumbnails(name):
+        generate_thumbnails(name)
+        mark_ready(name)
+
+    transaction.on_commit(lambda: _submit(generate_and_mark_thumbnails, picture_name))
+
+
+def schedule_cleanup(picture_name, is_referenced):
+    """
+    Delete a superseded picture after commit, unless another row still
+    points at it (identical uploads share one file). The worker checks
+    again right before deleting: an upload of the same content may have
+    been pointed at the file while the job waited in the queue.
+    """
+    def delete_unreferenced_picture(name):
+        if not is_referenced(name):
+            delete_picture(name)
+
+    def cleanup():
+        if not is_referenced(picture_name):
+            _submit(delete_unreferenced_picture, picture_name)
+    transaction.on_commit(cleanup)
@@ -0,0 +1,272 @@
+# accounts/importers.py
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from accounts.counters import count_role
+from accounts.images import content_hash
+from accounts.models import CustomUser
+
+GENDER_CODES = {'M', 'F', 'O'}
+REQUIRED_FIELDS = ('username', 'first_name', 'last_name', 'email')
+DEFAULT_CHUNK_SIZE = 1000
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    errors: list = field(default_factory=list)  # (row_number, message)
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+
+# -----------------------------
+# Checkpoints
+# -----------------------------
+def read_checkpoint(path, source):
+    """
+    Return the last row number committed by a previous run over the file
+    whose content hash is `source`, or 0. Raises ValueError if the
+    checkpoint was written for a different file.
+    """
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('source') != source:
+        raise ValueError(f"checkpoint {path} was written for a different file; remove it to start over")
+    return checkpoint.get('last_row', 0)
+
+
+def write_checkpoint(path, source, last_row):
+    """Atomically record the last committed row number of the file hashed as `source`."""
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'source': source, 'last_row': last_row}, f)
+    os.replace(tmp_path, path)
+
+
+# -----------------------------
+# Validation
+# -----------------------------
+def clean_row(row):
+    """Validate one CSV row in memory. Returns a cleaned dict or raises ValueError."""
+    row = {k.strip(): (v or '').strip() for k, v in row.items() if k}
+    missing = [f for f in REQUIRED_FIELDS if not row.get(f)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    try:
+        validate_email(row['email'])
+    except ValidationError:
+        raise ValueError(f"invalid email '{row['email']}'")
+
+    gender = row.get('gender', '').upper()[:1] or None
+    if gender and gender not in GENDER_CODES:
+        raise ValueError(f"invalid gender '{row['gender']}'")
+
+    date_of_birth = None
+    if row.get('date_of_birth'):
+        try:
+            date_of_birth = datetime.strptime(row['date_of_birth'], '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"invalid date_of_birth '{row['date_of_birth']}' (use YYYY-MM-DD)")
+
+    return {
+        'username': row['username'],
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'email': row['email'],
+        'phone_number': row.get('phone_number') or None,
+        'gender': gender,
+        'date_of_birth': date_of_birth,
+        'address': row.get('address') or None,
+        'password': row.get('password') or None,
+    }
+
+
+# -----------------------------
+# Password Hashing
+# -----------------------------
+def _init_hash_worker():
+    # Workers started with "spawn" need their own app registry
+    import django
+    django.setup()
+
+
+class PasswordHasherPool:
+    """
+    Hashes passwords in worker processes. Hashing is CPU-bound and by far
+    the slowest part of creating a user, so it is spread across cores.
+    With workers=0 hashing happens inline.
+    """
+    def __init__(self, workers=0):
+        self.executor = None
+        if workers:
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker)
+
+    def hash_all(self, passwords):
+        """Hash a list of raw passwords; None gives an unusable password."""
+        if self.executor is None:
+            return [make_password(p) for p in passwords]
+        return list(self.executor.map(make_password, passwords, chunksize=32))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def _load_existing():
+    """Existing usernames and (lower-cased) emails, streamed into sets."""
+    usernames = set()
+    emails = set()
+    for username, email in CustomUser.objects.values_list('username', 'email').iterator(chunk_size=5000):
+        usernames.add(username)
+        if email:
+            emails.add(email.lower())
+    return usernames, emails
+
+
+def _build_users(chunk, hasher):
+    hashes = hasher.hash_all([row['password'] for _, row in chunk])
+    users = []
+    for (_, row), password_hash in zip(chunk, hashes):
+        user = CustomUser(
+            username=row['username'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            email=row['email'],
+            phone_number=row['phone_number'],
+            gender=row['gender'],
+            date_of_birth=row['date_of_birth'],
+            address=row['address'],
+            role='patient',
+            # The addresses come from the hospital's own records, and an
+            # unverified account could neither sign in nor reset its password
+            email_verified=True,
+        )
+        user.password = password_hash
+        users.append(user)
+    return users
+
+
+def _insert(users):
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users)
+        # bulk_create sends no post_save, so count the new patients here
+        count_role('patient', len(users))
+
+
+def _write_chunk(chunk, hasher, result):
+    users = _build_users(chunk, hasher)
+    try:
+        _insert(users)
+        result.created += len(users)
+        return
+    except IntegrityError:
+        pass
+
+    # Someone registered one of these usernames after we loaded the
+    # existing set; drop the clashes and write the rest.
+    taken = set(
+        CustomUser.objects.filter(username__in=[u.username for u in users])
+        .values_list('username', flat=True)
+    )
+    remaining = []
+    for (row_number, row), user in zip(chunk, users):
+        if user.username in taken:
+            result.add_error(row_number, f"username '{user.username}' already exists")
+        else:
+            remaining.append((row_number, user))
+    try:
+        _insert([user for _, user in remaining])
+        result.created += len(remaining)
+    except IntegrityError:
+        # Another registration landed in between: one insert per row, so
+        # only the rows that clash are rejected
+        for row_number, user in remaining:
+            try:
+                _insert([user])
+            except IntegrityError as e:
+                result.add_error(row_number, f"not imported: {e}")
+            else:
+                result.created += 1
+
+
+def import_patients(csv_file, chunk_size=DEFAULT_CHUNK_SIZE, hash_workers=0, checkpoint_path=None):
+    """
+    Stream patients from a CSV file into CustomUser.
+
+    Rows are read and validated a chunk at a time, duplicates are rejected
+    with set lookups against existing and already-seen usernames/emails, and
+    each chunk is written with one bulk_create. After every committed chunk
+    the row number is saved to `checkpoint_path` with the file's content
+    hash, so a rerun over the same file continues where the previous run
+    stopped; a checkpoint from another file raises ValueError.
+
+    Imported emails are marked verified. Rows without a password get an
+    unusable one, and the patient sets a password through "Forgot password".
+    """
+    result = ImportResult()
+    source = content_hash(csv_file) if checkpoint_path else None
+    resume_after = read_checkpoint(checkpoint_path, source)
+    usernames, emails = _load_existing()
+
+    reader = csv.DictReader(io.TextIOWrapper(csv_file, encoding='utf-8-sig', newline=''))
+    # Row 1 is the header
+    rows = enumerate(reader, start=2)
+    if resume_after:
+        rows = islice(rows, resume_after - 1, None)
+
+    with PasswordHasherPool(hash_workers) as hasher:
+        while True:
+            batch = list(islice(rows, chunk_size))
+            if not batch:
+                break
+
+            chunk = []
+            for row_number, row in batch:
+                try:
+                    cleaned = clean_row(row)
+                except ValueError as e:
+                    result.add_error(row_number, str(e))
+                    continue
+
+                email_key = cleaned['email'].lower()
+                if cleaned['username'] in usernames:
+                    result.add_error(row_number, f"username '{cleaned['username']}' already exists")
+                    continue
+                if email_key in emails:
+                    result.add_error(row_number, f"email '{cleaned['email']}' already exists")
+                    continue
+                usernames.add(cleaned['username'])
+                emails.add(email_key)
+                chunk.append((row_number, cleaned))
+
+            if chunk:
+                _write_chunk(chunk, hasher, result)
+            write_checkpoint(checkpoint_path, source, batch[-1][0])
+
+    return result
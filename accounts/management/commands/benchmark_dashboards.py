@@ -0,0 +1,75 @@
+import statistics
+import time
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from accounts.models import CustomUser
+from accounts.panels import PANEL_WORKERS, sequential
+
+# Role -> views module holding that dashboard's tabs
+DASHBOARDS = {
+    'admin': 'admins.views',
+    'doctor': 'doctors.views',
+    'patient': 'patients.views',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every dashboard tab with its panel queries run one after another "
+        "and concurrently, against the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--role',
+            choices=sorted(DASHBOARDS),
+            action='append',
+            help="Dashboard(s) to time (default: all).",
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help="Renders per tab and mode; the median is reported (default: 20).",
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be positive.")
+        if not PANEL_WORKERS:
+            self.stdout.write(self.style.WARNING("DASHBOARD_PANEL_WORKERS is 0; both modes run in order. Set it to compare."))
+
+        factory = RequestFactory()
+        for role in options['role'] or sorted(DASHBOARDS):
+            user = CustomUser.objects.filter(role=role).order_by('id').first()
+            if user is None:
+                self.stdout.write(f"{role}: no user with this role, skipped.")
+                continue
+            tabs = import_module(DASHBOARDS[role]).dashboard_tabs
+
+            self.stdout.write(f"{role} dashboard ({user.username})")
+            for name in tabs.builders:
+                def render():
+                    request = factory.get('/')
+                    request.user = user
+                    tabs.render_tab(request, name)
+
+                with sequential():
+                    in_order = self.time(render, options['repeat'])
+                concurrent = self.time(render, options['repeat'])
+                self.stdout.write(
+                    f"  {name:<18} {in_order * 1000:8.2f} ms in order  "
+                    f"{concurrent * 1000:8.2f} ms concurrent  ({in_order / concurrent:.2f}x)"
+                )
+
+    def time(self, render, repeat):
+        render()  # warm connections and caches
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
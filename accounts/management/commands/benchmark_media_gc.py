@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.media_gc import collect_garbage, iter_files, referenced_names
+from accounts.models import CustomUser
+
+# Files per directory in the synthetic tree
+FILES_PER_DIR = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the media garbage collector over a synthetic tree of old files, half of "
+        "them referenced, against checking each file with its own query. Runs as a dry "
+        "run in a temporary directory, which is removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--files',
+            type=int,
+            default=100000,
+            help="Files in the synthetic tree (default: 100000).",
+        )
+        parser.add_argument(
+            '--baseline-files',
+            type=int,
+            default=1000,
+            help="Files checked with one query each for comparison; 0 skips it (default: 1000).",
+        )
+        parser.add_argument(
+            '--dir',
+            help="Build the tree under this directory instead of the system temp directory.",
+        )
+
+    def handle(self, *args, **options):
+        if options['files'] < 1 or options['baseline_files'] < 0:
+            raise CommandError("--files must be positive and --baseline-files not negative.")
+
+        root = tempfile.mkdtemp(prefix='media-gc-benchmark-', dir=options['dir'])
+        try:
+            referenced = self.build_tree(root, options['files'])
+            self.stdout.write(f"Built {options['files']} files under {root}")
+
+            started = time.perf_counter()
+            in_use = referenced_names()
+            self.stdout.write(
+                f"Referenced names from the database: {len(in_use)} in {time.perf_counter() - started:.2f}s"
+            )
+
+            started = time.perf_counter()
+            result = collect_garbage(root, referenced | in_use, grace_seconds=3600, dry_run=True)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"Collector: scanned {result.scanned} files in {elapsed:.2f}s, "
+                f"{elapsed / result.scanned * 1e6:.1f} us/file, {result.removed} would be removed"
+            )
+
+            if options['baseline_files']:
+                elapsed, checked = self.one_query_per_file(root, options['baseline_files'])
+                self.stdout.write(
+                    f"One query per file: {checked} files in {elapsed:.2f}s, "
+                    f"{elapsed / checked * 1e6:.1f} us/file "
+                    f"(~{elapsed / checked * result.scanned:.0f}s for the tree)"
+                )
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def build_tree(self, root, count):
+        """Empty files two days old, spread over subdirectories; returns the referenced half."""
+        old = time.time() - 2 * 86400
+        referenced = set()
+        for i in range(count):
+            directory = os.path.join('profile_pics', f'{i // FILES_PER_DIR:04d}')
+            os.makedirs(os.path.join(root, directory), exist_ok=True)
+            name = os.path.join(directory, f'{i:07d}.jpg')
+            path = os.path.join(root, name)
+            open(path, 'wb').close()
+            os.utime(path, (old, old))
+            if i % 2:
+                referenced.add(name)
+        return referenced
+
+    def one_query_per_file(self, root, limit):
+        # What checking each file against the users table on its own costs
+        checked = 0
+        started = time.perf_counter()
+        for entry in iter_files(root):
+            name = os.path.relpath(entry.path, root)
+            CustomUser.objects.filter(profile_picture=name).exists()
+            entry.stat(follow_symlinks=False)
+            checked += 1
+            if checked >= limit:
+                break
+        return time.perf_counter() - started, checked
@@ -0,0 +1,68 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.media_gc import DEFAULT_GRACE_HOURS, collect_garbage, referenced_names
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete files under MEDIA_ROOT that no user references any more "
+        "(e.g. pictures of deleted users), keeping anything newer than the grace period."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=DEFAULT_GRACE_HOURS,
+            help=f"Only remove files older than this (default: {DEFAULT_GRACE_HOURS}).",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="List what would be removed without deleting anything.",
+        )
+        parser.add_argument(
+            '--path',
+            help="Only scan this subdirectory of MEDIA_ROOT (e.g. profile_pics).",
+        )
+
+    def handle(self, *args, **options):
+        media_root = os.path.abspath(settings.MEDIA_ROOT)
+        scan_root = media_root
+        if options['path']:
+            scan_root = os.path.abspath(os.path.join(media_root, options['path']))
+            if os.path.commonpath([media_root, scan_root]) != media_root:
+                raise CommandError("--path must be inside MEDIA_ROOT.")
+        if not os.path.isdir(scan_root):
+            raise CommandError(f"{scan_root} is not a directory.")
+        if options['grace_hours'] < 0:
+            raise CommandError("--grace-hours cannot be negative.")
+
+        dry_run = options['dry_run']
+        verbose = dry_run or options['verbosity'] > 1
+
+        def report(name, size):
+            if verbose:
+                self.stdout.write(f"{'Would remove' if dry_run else 'Removing'} {name} ({size} bytes)")
+
+        started = time.perf_counter()
+        referenced = referenced_names()
+        result = collect_garbage(
+            media_root,
+            referenced,
+            grace_seconds=options['grace_hours'] * 3600,
+            dry_run=dry_run,
+            on_remove=report,
+            scan_root=scan_root,
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {result.scanned} file(s) in {elapsed:.2f}s: {result.referenced} referenced, "
+            f"{result.recent} within grace period, "
+            f"{result.removed} {'would be ' if dry_run else ''}removed ({result.removed_bytes} bytes)."
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from accounts.images import generate_thumbnails
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Generate missing profile picture thumbnails (e.g. for pictures uploaded before thumbnails existed)."
+
+    def handle(self, *args, **options):
+        names = (
+            CustomUser.objects.exclude(profile_picture='')
+            .exclude(profile_picture__isnull=True)
+            .values_list('profile_picture', flat=True)
+            .distinct()
+        )
+        generated = 0
+        for name in names.iterator():
+            try:
+                generate_thumbnails(name)
+                CustomUser.objects.filter(profile_picture=name).update(profile_thumbnails_ready=True)
+                generated += 1
+            except (OSError, ValueError) as e:
+                self.stderr.write(f"{name}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Checked thumbnails for {generated} picture(s)."))
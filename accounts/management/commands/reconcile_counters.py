@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.counters import reconcile_role_counts
+from patients.counters import reconcile_doctor_days, reconcile_doctor_patients, reconcile_doctor_totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount users by role and appointments per doctor and day, rebuild the "
+        "doctor-patient links, and correct counter rows that drifted from the "
+        "tables they summarise. Meant to run nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help="Only check doctor days from this date on (YYYY-MM-DD), or 'N' for the last N days. "
+                 "Doctor totals are always checked in full.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report drift without correcting it.",
+        )
+
+    def handle(self, *args, **options):
+        since = self.parse_since(options['since'])
+        dry_run = options['dry_run']
+        verb = "Would correct" if dry_run else "Corrected"
+
+        roles = reconcile_role_counts(dry_run=dry_run)
+        for role, (counted, actual) in sorted(roles.items()):
+            self.stdout.write(f"role {role}: counted {counted}, actually {actual}")
+
+        days = reconcile_doctor_days(since=since, dry_run=dry_run)
+        for (doctor_id, day), (counted, actual) in sorted(days.items(), key=lambda item: (item[0][1], item[0][0])):
+            self.stdout.write(f"doctor {doctor_id} on {day}: counted {counted}, actually {actual}")
+
+        doctors = reconcile_doctor_totals(dry_run=dry_run)
+        for (doctor_id,), (counted, actual) in sorted(doctors.items()):
+            self.stdout.write(f"doctor {doctor_id} in total: counted {counted}, actually {actual}")
+
+        links = reconcile_doctor_patients(dry_run=dry_run)
+        for (doctor_id, patient_id), (stored, actual) in sorted(links.items()):
+            self.stdout.write(f"doctor {doctor_id} and patient {patient_id}: stored {stored}, actually {actual}")
+
+        style = self.style.WARNING if roles or days or doctors or links else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{verb} {len(roles)} role count(s), {len(days)} doctor day(s), {len(doctors)} doctor total(s) "
+            f"and {len(links)} doctor-patient link(s)."
+        ))
+
+    def parse_since(self, value):
+        if not value:
+            return None
+        if value.isdigit():
+            return timezone.localdate() - timedelta(days=int(value))
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError("--since must be a date (YYYY-MM-DD) or a number of days.")
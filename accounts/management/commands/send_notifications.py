@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.notifications import DEFAULT_BATCH_SIZE, send_queued_notifications
+
+
+class Command(BaseCommand):
+    help = "Send the queued notification emails. Meant to run every few minutes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Emails per batch (default: {DEFAULT_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        sent, failed = send_queued_notifications(batch_size=options['batch_size'])
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f"Sent {sent} notification(s); {failed} failed and stay queued."))
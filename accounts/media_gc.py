@@ -0,0 +1,90 @@
+# accounts/media_gc.py
+import os
+import time
+from dataclasses import dataclass
+
+from accounts.images import THUMBNAIL_SIZES, thumbnail_name
+from accounts.models import CustomUser
+
+DEFAULT_GRACE_HOURS = 24
+
+
+@dataclass
+class CollectResult:
+    scanned: int = 0
+    referenced: int = 0
+    recent: int = 0
+    removed: int = 0
+    removed_bytes: int = 0
+
+
+def referenced_names():
+    """
+    Every storage name still in use: stored pictures plus their thumbnails.
+    One values_list query, streamed into a set.
+    """
+    names = set()
+    pictures = (
+        CustomUser.objects.exclude(profile_picture='')
+        .exclude(profile_picture__isnull=True)
+        .values_list('profile_picture', flat=True)
+    )
+    for name in pictures.iterator(chunk_size=5000):
+        names.add(os.path.normpath(name))
+        for label in THUMBNAIL_SIZES:
+            names.add(os.path.normpath(thumbnail_name(name, label)))
+    return names
+
+
+def iter_files(root):
+    """Yield DirEntry objects for every regular file under root, depth first."""
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except FileNotFoundError:
+            # Directory removed while we were walking
+            continue
+
+
+def collect_garbage(media_root, referenced, grace_seconds, dry_run=False, on_remove=None, scan_root=None):
+    """
+    Remove files under `scan_root` (default: media_root) that aren't in
+    `referenced` and haven't been modified within the grace period.
+
+    The grace period keeps uploads whose row hasn't been committed yet, and
+    thumbnails still being rendered, out of reach.
+    """
+    result = CollectResult()
+    cutoff = time.time() - grace_seconds
+
+    for entry in iter_files(scan_root or media_root):
+        result.scanned += 1
+        name = os.path.relpath(entry.path, media_root)
+        if name in referenced:
+            result.referenced += 1
+            continue
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        if stat.st_mtime > cutoff:
+            result.recent += 1
+            continue
+
+        if on_remove:
+            on_remove(name, stat.st_size)
+        if not dry_run:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+        result.removed += 1
+        result.removed_bytes += stat.st_size
+
+    return result
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:23
+
+import accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_customuser_email_verified_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, upload_to=accounts.models.profile_picture_upload_path),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:06
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_roles(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    RoleCount = apps.get_model('accounts', 'RoleCount')
+    db = schema_editor.connection.alias
+    rows = CustomUser.objects.using(db).order_by().values('role').annotate(n=Count('id'))
+    RoleCount.objects.using(db).bulk_create(RoleCount(role=row['role'], count=row['n']) for row in rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_customuser_profile_picture_upload_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoleCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('patient', 'Patient'), ('doctor', 'Doctor'), ('admin', 'Admin')], max_length=10, unique=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_roles, migrations.RunPython.noop),
+    ]
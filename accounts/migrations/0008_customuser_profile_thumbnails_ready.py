@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_thumbnails_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
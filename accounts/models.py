@@ -1,13 +1,14 @@
 from django.db import models
+from django.db.models import DEFERRED
 from django.contrib.auth.models import AbstractUser
 import os
 import uuid
 from django.utils import timezone
+from accounts.images import hashed_picture_name, schedule_cleanup, schedule_thumbnails, thumbnail_url
 
 def profile_picture_upload_path(instance, filename):
-    ext = filename.split('.')[-1]
-    filename = f"{instance.username}_profile.{ext}"
-    return os.path.join('profile_pics', filename)
+    """Name uploads by content hash so re-uploading the same image reuses one file."""
+    return hashed_picture_name(instance.profile_picture.file, filename)
 
 class CustomUser(AbstractUser):
     ROLE_CHOICES = (
@@ -20,7 +21,9 @@ class CustomUser(AbstractUser):
     gender = models.CharField(max_length=1, choices=(('M', 'Male'), ('F', 'Female'), ('O', 'Other')), blank=True, null=True)
     date_of_birth = models.DateField(blank=True, null=True)
     address = models.TextField(blank=True, null=True)
-    profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to=profile_picture_upload_path, blank=True, null=True)
+    # Set once the picture's thumbnails are rendered; until then avatars use the original
+    profile_thumbnails_ready = models.BooleanField(default=False, editable=False)
     
     # Email verification fields
     email_verified = models.BooleanField(default=False)
@@ -34,6 +37,74 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored role so the role counters can follow a change
+        if 'role' in field_names:
+            value = values[field_names.index('role')]
+            if value is not DEFERRED:
+                instance._loaded_role = value
+        # Remember the stored picture so save() can clean up a replaced one
+        if 'profile_picture' in field_names:
+            value = values[field_names.index('profile_picture')]
+            if value is not DEFERRED:
+                instance._loaded_profile_picture = value
+        return instance
+
+    def save(self, *args, **kwargs):
+        previous = getattr(self, '_loaded_profile_picture', None)
+
+        picture = self.profile_picture
+        if picture and not picture._committed:
+            # Same content already stored: point at it instead of writing a copy
+            name = profile_picture_upload_path(self, picture.name)
+            if picture.storage.exists(name):
+                self.profile_picture = name
+
+        if (self.profile_picture.name or None) != previous:
+            self.profile_thumbnails_ready = False
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'profile_thumbnails_ready'}
+
+        super().save(*args, **kwargs)
+
+        current = self.profile_picture.name or None
+        if current and current != previous:
+            schedule_thumbnails(
+                current,
+                lambda name: CustomUser.objects.filter(profile_picture=name).update(profile_thumbnails_ready=True),
+            )
+        if previous and previous != current:
+            schedule_cleanup(
+                previous,
+                lambda name: CustomUser.objects.filter(profile_picture=name).exists(),
+            )
+        self._loaded_profile_picture = current
+
+    def delete(self, *args, **kwargs):
+        picture = self.profile_picture.name or None
+        result = super().delete(*args, **kwargs)
+        # Bulk queryset deletes skip this; the cleanup_media command catches those
+        if picture:
+            schedule_cleanup(
+                picture,
+                lambda name: CustomUser.objects.filter(profile_picture=name).exists(),
+            )
+        return result
+
+    def get_profile_thumbnail_url(self, size='medium'):
+        """Thumbnail URL for avatars; falls back to the original until it is ready."""
+        if not self.profile_picture:
+            return None
+        if self.profile_thumbnails_ready:
+            return thumbnail_url(self.profile_picture.name, size)
+        return self.profile_picture.url
+
+    @property
+    def profile_thumbnail_url(self):
+        return self.get_profile_thumbnail_url('medium')
+
     def generate_verification_token(self):
         """Generate a unique verification token"""
         self.verification_token = str(uuid.uuid4())
@@ -63,3 +134,35 @@ class CustomUser(AbstractUser):
             (timezone.now() - self.password_reset_token_created_at).total_seconds() < 3600):  # 1 hour
             return True
         return False
+
+
+class RoleCount(models.Model):
+    """Number of users per role, for the admin dashboard (see accounts/counters.py)."""
+    role = models.CharField(max_length=10, unique=True, choices=CustomUser.ROLE_CHOICES)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.role}: {self.count}"
+
+
+class Notification(models.Model):
+    """
+    An email waiting to go out (see accounts/notifications.py). Jobs queue
+    these instead of sending inline; `manage.py send_notifications` drains
+    the queue.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='notifications')
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # The sender's queue scan: unsent, oldest first
+            models.Index(fields=['sent_at', 'id'], name='notification_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.user}"
@@ -0,0 +1,78 @@
+# accounts/notifications.py
+"""
+Outgoing email queue. Batch jobs add Notification rows, in the same
+transaction as the change they report, instead of sending mail inline;
+`manage.py send_notifications` sends them over one connection and marks
+each one sent. A message that fails stays queued for the next run, up to
+MAX_ATTEMPTS tries.
+"""
+import logging
+import smtplib
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+DEFAULT_BATCH_SIZE = 100
+
+
+def queue_notifications(notifications, batch_size=1000):
+    """Queue unsaved Notification instances with bulk inserts."""
+    return Notification.objects.bulk_create(notifications, batch_size=batch_size)
+
+
+def _reopen(connection):
+    """Start over on a fresh connection after a failed send, which may have broken it."""
+    try:
+        connection.close()
+        connection.open()
+    except (smtplib.SMTPException, OSError):
+        # The next send tries to open one itself
+        logger.warning("Could not reopen the mail connection", exc_info=True)
+
+
+def send_queued_notifications(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Send the queued notifications, oldest first, one message at a time over
+    one connection; each is marked as soon as it is sent or fails, so a
+    failure only leaves that one queued. Returns (sent, failed).
+    """
+    sent = failed = 0
+    last_id = 0
+    queued = Notification.objects.filter(sent_at__isnull=True, attempts__lt=MAX_ATTEMPTS).select_related('user')
+    with get_connection() as connection:
+        while True:
+            batch = list(queued.filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            # Users without an email address are done; there's nothing to send or retry
+            Notification.objects.filter(
+                id__in=[notification.id for notification in batch if not notification.user.email]
+            ).update(sent_at=timezone.now())
+
+            for notification in batch:
+                if not notification.user.email:
+                    continue
+                email = EmailMessage(
+                    notification.subject, notification.message, settings.DEFAULT_FROM_EMAIL, [notification.user.email]
+                )
+                try:
+                    connection.send_messages([email])
+                except (smtplib.SMTPException, OSError):
+                    logger.exception("Sending notification %d failed", notification.id)
+                    Notification.objects.filter(id=notification.id).update(attempts=F('attempts') + 1)
+                    failed += 1
+                    _reopen(connection)
+                    continue
+                Notification.objects.filter(id=notification.id).update(
+                    attempts=F('attempts') + 1, sent_at=timezone.now()
+                )
+                sent += 1
+    return sent, failed
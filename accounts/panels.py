@@ -0,0 +1,65 @@
+# accounts/panels.py
+"""
+Run a dashboard tab's independent panel queries side by side.
+
+A panel is a zero-argument callable that fully evaluates its queries
+(a count, an aggregate, a list(...)). gather() runs them on a small shared
+thread pool; Django gives each thread its own database connection, which is
+recycled per CONN_MAX_AGE around every panel just as around a request. With
+the default CONN_MAX_AGE of 0 that is a new connection per panel, so the
+pool is off by default (DASHBOARD_PANEL_WORKERS = 0).
+
+Panels run one after another instead when concurrency can't help or would
+be wrong: DASHBOARD_PANEL_WORKERS is 0, there is only one panel, or the
+caller is inside a transaction (other connections can't see its
+uncommitted writes, e.g. under ATOMIC_REQUESTS or in TestCase).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+# Each worker holds a database connection, per process
+PANEL_WORKERS = getattr(settings, 'DASHBOARD_PANEL_WORKERS', 0)
+
+_executor = ThreadPoolExecutor(max_workers=PANEL_WORKERS, thread_name_prefix='panels') if PANEL_WORKERS else None
+
+_local = threading.local()
+
+
+@contextmanager
+def sequential():
+    """Run panels one after another inside the block, e.g. to benchmark."""
+    previous = getattr(_local, 'sequential', False)
+    _local.sequential = True
+    try:
+        yield
+    finally:
+        _local.sequential = previous
+
+
+def can_run_concurrently():
+    return (
+        _executor is not None
+        and not getattr(_local, 'sequential', False)
+        and not connection.in_atomic_block
+        and not (connection.vendor == 'sqlite' and connection.is_in_memory_db())
+    )
+
+
+def _run(panel):
+    close_old_connections()
+    try:
+        return panel()
+    finally:
+        close_old_connections()
+
+
+def gather(panels):
+    """Evaluate {name: panel} and return {name: result}; a panel's exception propagates."""
+    if len(panels) < 2 or not can_run_concurrently():
+        return {name: panel() for name, panel in panels.items()}
+    futures = {name: _executor.submit(_run, panel) for name, panel in panels.items()}
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,20 @@
+# accounts/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import count_role
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+def count_saved_user(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_loaded_role', instance.role)
+    if previous != instance.role:
+        count_role(previous, -1)
+        count_role(instance.role, 1)
+    instance._loaded_role = instance.role
+
+
+@receiver(post_delete, sender=CustomUser)
+def count_deleted_user(sender, instance, **kwargs):
+    count_role(getattr(instance, '_loaded_role', instance.role), -1)
@@ -1,3 +1,99 @@
+import io
+import smtplib
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import IntegrityError
 from django.test import TestCase
 
-# Create your tests here.
+from . import images, importers
+from .models import CustomUser, Notification
+from .notifications import send_queued_notifications
+
+
+class PatientImportTests(TestCase):
+    def csv(self, usernames):
+        lines = ['username,first_name,last_name,email']
+        lines += [f'{name},A,B,{name}@example.com' for name in usernames]
+        return io.BytesIO('\n'.join(lines).encode())
+
+    def test_rows_are_written_one_by_one_when_the_retry_clashes_too(self):
+        # Registered after the importer loaded the existing usernames
+        CustomUser.objects.create_user(username='bob', password='x', role='patient')
+        insert = importers._insert
+        calls = []
+
+        def clash_on_retry(users):
+            calls.append(len(users))
+            if len(calls) == 2:
+                raise IntegrityError('username taken')
+            insert(users)
+
+        with mock.patch.object(importers, '_load_existing', return_value=(set(), set())), \
+                mock.patch.object(importers, '_insert', clash_on_retry):
+            result = importers.import_patients(self.csv(['ann', 'bob', 'cid']))
+
+        self.assertEqual(calls, [3, 2, 1, 1])
+        self.assertEqual(result.created, 2)
+        self.assertEqual([row for row, _ in result.errors], [3])
+        self.assertEqual(CustomUser.objects.filter(username__in=['ann', 'cid']).count(), 2)
+
+
+class NotificationTests(TestCase):
+    def test_each_message_is_marked_on_its_own(self):
+        users = [
+            CustomUser.objects.create_user(username=name, password='x', email=email)
+            for name, email in (('ann', 'ann@example.com'), ('bob', ''), ('cid', 'cid@example.com'), ('dee', 'dee@example.com'))
+        ]
+        for user in users:
+            Notification.objects.create(user=user, subject='Hello', message='Hi')
+        send = EmailBackend.send_messages
+
+        def refuse_cid(backend, messages):
+            if messages[0].to == ['cid@example.com']:
+                raise smtplib.SMTPRecipientsRefused({'cid@example.com': (550, b'No such user')})
+            return send(backend, messages)
+
+        with mock.patch.object(EmailBackend, 'send_messages', refuse_cid):
+            self.assertEqual(send_queued_notifications(), (2, 1))
+
+        self.assertEqual([m.to for m in mail.outbox], [['ann@example.com'], ['dee@example.com']])
+        state = {n.user.username: (n.sent_at is not None, n.attempts) for n in Notification.objects.select_related('user')}
+        self.assertEqual(state, {'ann': (True, 1), 'bob': (True, 0), 'cid': (False, 1), 'dee': (True, 1)})
+
+        # Only the failed one is tried again
+        self.assertEqual(send_queued_notifications(), (1, 0))
+        self.assertEqual(len(mail.outbox), 3)
+
+
+class PictureCleanupTests(TestCase):
+    def test_cleanup_rechecks_references_before_deleting(self):
+        # Unreferenced when the transaction commits, picked up by another
+        # upload of the same content before the worker runs
+        references = iter([False, True])
+        with mock.patch.object(images, '_submit', lambda func, name: func(name)), \
+                mock.patch.object(images, 'delete_picture') as delete_picture, \
+                self.captureOnCommitCallbacks(execute=True):
+            images.schedule_cleanup('profile_pics/shared.jpg', lambda name: next(references))
+        delete_picture.assert_not_called()
+
+    def test_thumbnail_url_follows_ready_flag(self):
+        user = CustomUser.objects.create(username='avatar', role='patient')
+        CustomUser.objects.filter(pk=user.pk).update(profile_picture='profile_pics/avatar.jpg')
+        user = CustomUser.objects.get(pk=user.pk)
+        self.assertEqual(user.profile_thumbnail_url, user.profile_picture.url)
+
+        with mock.patch.object(images, '_submit', lambda func, name: func(name)), \
+                mock.patch.object(images, 'generate_thumbnails') as generate_thumbnails, \
+                mock.patch.object(images, 'delete_picture'), \
+                self.captureOnCommitCallbacks(execute=True):
+            user.profile_picture = 'profile_pics/new.jpg'
+            user.save(update_fields=['profile_picture'])
+        generate_thumbnails.assert_called_once_with('profile_pics/new.jpg')
+
+        user = CustomUser.objects.get(pk=user.pk)
+        self.assertTrue(user.profile_thumbnails_ready)
+        with mock.patch.object(images.default_storage, 'exists') as exists:
+            self.assertEqual(user.profile_thumbnail_url, images.thumbnail_url('profile_pics/new.jpg', 'medium'))
+        exists.assert_not_called()
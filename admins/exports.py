@@ -0,0 +1,228 @@
+# admins/exports.py
+import csv
+import heapq
+import json
+import operator
+from datetime import datetime, time, timedelta
+from functools import reduce
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from patients.models import Appointment, AppointmentHistory, Billing
+from .models import DoctorAllocation
+
+DEFAULT_BATCH_SIZE = 2000
+FORMATS = ('csv', 'ndjson')
+
+
+def _archived_appointment(row, users):
+    """An AppointmentHistory row in the live appointments export's columns."""
+    patient = users.get(row['patient_id'])
+    doctor = users.get(row['doctor_id'])
+    return {
+        'id': row['appointment_id'],
+        'date': row['date'],
+        'start_time': row['start_time'],
+        'status': row['status'],
+        'patient_id': row['patient_id'],
+        'patient__username': patient.username if patient else None,
+        'patient__first_name': patient.first_name if patient else None,
+        'patient__last_name': patient.last_name if patient else None,
+        'doctor_id': row['doctor_id'],
+        'doctor__username': doctor.username if doctor else None,
+        'doctor__first_name': doctor.first_name if doctor else None,
+        'doctor__last_name': doctor.last_name if doctor else None,
+        'symptoms': row['records__symptoms'],
+        'created_at': row['created_at'],
+    }
+
+
+# Export definitions: model, values() columns, and the lookups used by filters
+EXPORTS = {
+    'bills': {
+        'model': Billing,
+        'fields': [
+            'id', 'patient_id', 'patient__username', 'patient__first_name', 'patient__last_name',
+            'appointment_id', 'appointment__doctor_id', 'appointment__doctor__username',
+            'history__appointment_id', 'history__doctor_id',
+            'amount', 'status', 'due_date', 'created_at', 'description',
+        ],
+        # Filtered as a datetime range, not __date, so MySQL can prune partitions
+        'date_field': 'created_at',
+        'date_is_datetime': True,
+        # Archived appointments' bills point at their history row instead
+        'doctor_fields': ('appointment__doctor_id', 'history__doctor_id'),
+    },
+    'appointments': {
+        'model': Appointment,
+        'fields': [
+            'id', 'date', 'start_time', 'status',
+            'patient_id', 'patient__username', 'patient__first_name', 'patient__last_name',
+            'doctor_id', 'doctor__username', 'doctor__first_name', 'doctor__last_name',
+            'symptoms', 'created_at',
+        ],
+        # The appointment's own copy of the slot date and time, so no join to
+        # the time slot table; date is indexed
+        'date_field': 'date',
+        'doctor_fields': ('doctor_id',),
+        # Appointments moved to the history tier, merged back in by id
+        'archive': {
+            'model': AppointmentHistory,
+            'key': 'appointment_id',
+            'fields': [
+                'appointment_id', 'date', 'start_time', 'status', 'patient_id', 'doctor_id',
+                'records__symptoms', 'created_at',
+            ],
+            'date_field': 'date',
+            'doctor_fields': ('doctor_id',),
+            'row': _archived_appointment,
+        },
+    },
+}
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format.")
+
+
+def _parse_id(value, name):
+    if not str(value).isdigit():
+        raise ValueError(f"{name} must be a numeric id.")
+    return int(value)
+
+
+def _day_start(day):
+    """Local midnight of a day, for range filters on datetime columns."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def parse_filters(params):
+    """
+    Read export filters from a dict-like (request.GET or command options).
+    Raises ValueError for malformed values.
+    """
+    filters = {}
+    if params.get('date_from'):
+        filters['date_from'] = _parse_date(params['date_from'], 'date_from')
+    if params.get('date_to'):
+        filters['date_to'] = _parse_date(params['date_to'], 'date_to')
+    if params.get('doctor'):
+        filters['doctor'] = _parse_id(params['doctor'], 'doctor')
+    if params.get('department'):
+        filters['department'] = _parse_id(params['department'], 'department')
+    return filters
+
+
+def _any_of(lookups, value):
+    return reduce(operator.or_, (Q(**{lookup: value}) for lookup in lookups))
+
+
+def _filtered(spec, date_from=None, date_to=None, doctor=None, department=None):
+    queryset = spec['model'].objects.all()
+
+    if spec.get('date_is_datetime'):
+        if date_from:
+            queryset = queryset.filter(**{f"{spec['date_field']}__gte": _day_start(date_from)})
+        if date_to:
+            queryset = queryset.filter(**{f"{spec['date_field']}__lt": _day_start(date_to + timedelta(days=1))})
+    else:
+        if date_from:
+            queryset = queryset.filter(**{f"{spec['date_field']}__gte": date_from})
+        if date_to:
+            queryset = queryset.filter(**{f"{spec['date_field']}__lte": date_to})
+    if doctor:
+        queryset = queryset.filter(_any_of(spec['doctor_fields'], doctor))
+    if department:
+        # Subquery rather than a join, so doctors with several allocations
+        # don't duplicate rows
+        doctor_ids = DoctorAllocation.objects.filter(department_id=department).values('doctor_id')
+        queryset = queryset.filter(_any_of([f"{field}__in" for field in spec['doctor_fields']], doctor_ids))
+    return queryset
+
+
+def build_queryset(kind, **filters):
+    """Return the filtered values() queryset for an export, ordered by id."""
+    spec = EXPORTS[kind]
+    return _filtered(spec, **filters).values(*spec['fields']).order_by('id')
+
+
+def _batches(queryset, batch_size, key='id'):
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(**{f'{key}__gt': last_id})[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1][key]
+
+
+def iter_rows(queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield rows in id order, one bounded batch at a time.
+
+    Keyset pagination instead of QuerySet.iterator(): the MySQL drivers
+    buffer a whole result set client-side, so a single query over millions
+    of rows would not keep memory flat.
+    """
+    for batch in _batches(queryset, batch_size):
+        yield from batch
+
+
+def iter_archived_rows(kind, filters, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield the export's archived rows in id order, shaped like its live rows.
+    History rows keep plain user ids, so names are read once per batch.
+    """
+    spec = EXPORTS[kind]['archive']
+    queryset = _filtered(spec, **filters).values(*spec['fields']).order_by(spec['key'])
+    for batch in _batches(queryset, batch_size, spec['key']):
+        user_ids = {row['patient_id'] for row in batch} | {row['doctor_id'] for row in batch}
+        users = CustomUser.objects.only('username', 'first_name', 'last_name').in_bulk(user_ids)
+        for row in batch:
+            yield spec['row'](row, users)
+
+
+class _Echo:
+    """File-like object whose write() hands back the value, for csv.writer."""
+    def write(self, value):
+        return value
+
+
+# Spreadsheets evaluate a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _cell(value):
+    """Quote free text that a spreadsheet would otherwise run as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(kind, rows):
+    writer = csv.writer(_Echo())
+    fields = EXPORTS[kind]['fields']
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_cell(row[f]) for f in fields])
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_export(kind, file_format, filters, batch_size=DEFAULT_BATCH_SIZE):
+    """Lazily produce the export as a sequence of text chunks."""
+    rows = iter_rows(build_queryset(kind, **filters), batch_size)
+    if 'archive' in EXPORTS[kind]:
+        rows = heapq.merge(rows, iter_archived_rows(kind, filters, batch_size), key=operator.itemgetter('id'))
+    if file_format == 'ndjson':
+        return stream_ndjson(rows)
+    return stream_csv(kind, rows)
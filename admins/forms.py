@@ -338,3 +338,18 @@ class HealthArticleForm(forms.ModelForm):
             }),
         }
 
+
+class DoctorImportForm(forms.Form):
+    """
+    Upload form for bulk doctor onboarding (CSV or JSON).
+    """
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.json'}),
+        help_text='CSV with a header row, or a JSON list of objects.'
+    )
+
+    def clean_file(self):
+        uploaded = self.cleaned_data['file']
+        if not uploaded.name.lower().endswith(('.csv', '.json')):
+            raise forms.ValidationError('Upload a .csv or .json file.')
+        return uploaded
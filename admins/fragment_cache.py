@@ -0,0 +1,48 @@
+# admins/fragment_cache.py
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Shared-content fragments and the data each one renders. A fragment's cache
+# key includes its data version, so bumping the version on save/delete makes
+# every stale copy unreachable without having to find and delete it.
+FRAGMENT_DATA = ('health_articles', 'medications', 'departments')
+
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600)
+
+
+def _version_key(name):
+    return f"fragment-version:{name}"
+
+
+def fragment_versions():
+    """
+    Current version of every fragment data set, in one cache round trip.
+    Missing versions start from the clock, so an evicted counter never
+    falls back to a number that old fragments were cached under.
+    """
+    keys = {_version_key(name): name for name in FRAGMENT_DATA}
+    found = cache.get_many(keys)
+    versions = {keys[key]: value for key, value in found.items()}
+    missing = {key: int(time.time()) for key, name in keys.items() if name not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update({keys[key]: value for key, value in missing.items()})
+    return versions
+
+
+def bump_version(name):
+    """Invalidate every cached fragment built from the given data set."""
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        cache.set(_version_key(name), int(time.time()), None)
+
+
+def fragment_context():
+    """Template context needed by {% cache %} blocks on the dashboards."""
+    return {
+        'fragment_versions': fragment_versions(),
+        'fragment_cache_timeout': FRAGMENT_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,306 @@
+# admins/importers.py
+import csv
+import io
+import json
+import operator
+from datetime import datetime
+from functools import reduce
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from accounts.counters import count_role
+from accounts.importers import ImportResult, PasswordHasherPool
+from accounts.models import CustomUser
+from doctors.models import DoctorAvailability
+from .models import Department, DoctorAllocation
+
+DAY_CODES = [code for code, _ in DoctorAvailability.DAYS_OF_WEEK]
+GENDER_CODES = {'M', 'F', 'O'}
+REQUIRED_FIELDS = ('username', 'first_name', 'last_name', 'email', 'department', 'start_time', 'end_time')
+DEFAULT_CHUNK_SIZE = 500
+
+# The upload page hashes passwords in the request, ~0.15s a row; anything
+# bigger goes through the import_doctors command and its hasher pool
+WEB_MAX_ROWS = getattr(settings, 'DOCTOR_IMPORT_WEB_MAX_ROWS', 50)
+
+
+# -----------------------------
+# Parsing
+# -----------------------------
+def read_rows(uploaded, file_format=None):
+    """
+    Yield (row_number, dict) pairs from a CSV or JSON upload.
+    The format is taken from the file name unless given explicitly.
+    """
+    name = getattr(uploaded, 'name', '') or ''
+    file_format = file_format or ('json' if name.lower().endswith('.json') else 'csv')
+
+    if file_format == 'json':
+        data = json.load(io.TextIOWrapper(uploaded, encoding='utf-8-sig'))
+        if not isinstance(data, list):
+            raise ValueError("JSON import must be a list of doctor objects.")
+        for row_number, row in enumerate(data, start=1):
+            yield row_number, row
+    else:
+        reader = csv.DictReader(io.TextIOWrapper(uploaded, encoding='utf-8-sig', newline=''))
+        # Row 1 is the header
+        for row_number, row in enumerate(reader, start=2):
+            yield row_number, row
+
+
+def _parse_time(value):
+    if not isinstance(value, str):
+        raise ValueError(f"invalid time {value!r}")
+    for fmt in ('%H:%M', '%H:%M:%S', '%I:%M %p'):
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"invalid time '{value}'")
+
+
+def _parse_days(value):
+    if isinstance(value, list):
+        if not all(isinstance(d, str) for d in value):
+            raise ValueError(f"invalid working_days {value!r}")
+        days = value
+    else:
+        days = str(value or '').replace(';', ',').split(',')
+    days = [d.strip().lower()[:3] for d in days if d.strip()]
+    unknown = [d for d in days if d not in DAY_CODES]
+    if unknown:
+        raise ValueError(f"unknown working day(s): {', '.join(unknown)}")
+    return list(dict.fromkeys(days))  # keep order, drop duplicates
+
+
+# -----------------------------
+# Validation
+# -----------------------------
+def clean_row(row, departments):
+    """
+    Validate one row in memory. Returns a cleaned dict or raises ValueError.
+    `departments` maps lower-cased department name to id.
+    """
+    # JSON rows can hold anything; only objects of scalars (and a list of days) are accepted
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object of field values")
+    cleaned = {}
+    for key, value in row.items():
+        if not key:
+            continue
+        key = str(key).strip()
+        if isinstance(value, str):
+            value = value.strip()
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        elif value is not None and not (key == 'working_days' and isinstance(value, list)):
+            raise ValueError(f"invalid {key} {value!r}")
+        cleaned[key] = value
+    row = cleaned
+    missing = [f for f in REQUIRED_FIELDS if not row.get(f)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    try:
+        validate_email(row['email'])
+    except ValidationError:
+        raise ValueError(f"invalid email '{row['email']}'")
+
+    department_id = departments.get(str(row['department']).lower())
+    if department_id is None:
+        raise ValueError(f"unknown department '{row['department']}'")
+
+    start_time = _parse_time(row['start_time'])
+    end_time = _parse_time(row['end_time'])
+    if start_time >= end_time:
+        raise ValueError("start_time must be before end_time")
+
+    gender = (row.get('gender') or '').upper()[:1] or None
+    if gender and gender not in GENDER_CODES:
+        raise ValueError(f"invalid gender '{row['gender']}'")
+
+    date_of_birth = None
+    if row.get('date_of_birth'):
+        try:
+            date_of_birth = datetime.strptime(row['date_of_birth'], '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"invalid date_of_birth '{row['date_of_birth']}' (use YYYY-MM-DD)")
+
+    return {
+        'username': row['username'],
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'email': row['email'],
+        'phone_number': row.get('phone_number') or None,
+        'gender': gender,
+        'date_of_birth': date_of_birth,
+        'password': row.get('password') or None,
+        'department_id': department_id,
+        'working_days': _parse_days(row.get('working_days')),
+        'start_time': start_time,
+        'end_time': end_time,
+    }
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def _write_chunk(chunk, hasher):
+    """
+    Create users, availabilities and allocations for one chunk of cleaned
+    (row_number, row) pairs with three bulk inserts inside a single transaction.
+    """
+    hashes = hasher.hash_all([row['password'] for _, row in chunk])
+    users = []
+    for (_, row), password_hash in zip(chunk, hashes):
+        user = CustomUser(
+            username=row['username'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            email=row['email'],
+            phone_number=row['phone_number'],
+            gender=row['gender'],
+            date_of_birth=row['date_of_birth'],
+            role='doctor',
+            # Listed by an admin; an unverified account could neither sign in
+            # nor reset its password
+            email_verified=True,
+        )
+        # Without a password the doctor sets one through "Forgot password"
+        user.password = password_hash
+        users.append(user)
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users)
+        # bulk_create sends no post_save, so count the new doctors here
+        count_role('doctor', len(users))
+        # Not every backend returns primary keys from bulk_create (MySQL doesn't)
+        ids = dict(
+            CustomUser.objects.filter(username__in=[u.username for u in users])
+            .values_list('username', 'id')
+        )
+
+        availabilities = []
+        allocations = []
+        for _, row in chunk:
+            doctor_id = ids[row['username']]
+            availabilities.extend(
+                DoctorAvailability(
+                    doctor_id=doctor_id,
+                    day_of_week=day,
+                    start_time=row['start_time'],
+                    end_time=row['end_time'],
+                )
+                for day in row['working_days']
+            )
+            allocations.append(
+                DoctorAllocation(doctor_id=doctor_id, department_id=row['department_id'], room=None)
+            )
+        DoctorAvailability.objects.bulk_create(availabilities)
+        DoctorAllocation.objects.bulk_create(allocations)
+
+
+def _username_key(username):
+    # "DrSmith" and "drsmith" are the same login as far as people can tell,
+    # and the same row under MySQL's default collation
+    return username.casefold()
+
+
+def _drop_taken(pending, result):
+    """The rows of `pending` whose username and email are still free; the rest are reported."""
+    usernames = {row['username'] for _, row in pending}
+    emails = {row['email'].lower() for _, row in pending}
+    same_username = reduce(operator.or_, (Q(username__iexact=username) for username in usernames))
+    taken_usernames = {
+        _username_key(u) for u in
+        CustomUser.objects.filter(same_username).values_list('username', flat=True)
+    }
+    taken_emails = {
+        e.lower() for e in
+        CustomUser.objects.filter(email__in=emails).values_list('email', flat=True)
+    }
+
+    chunk = []
+    for row_number, row in pending:
+        if _username_key(row['username']) in taken_usernames:
+            result.add_error(row_number, f"username '{row['username']}' already exists")
+        elif row['email'].lower() in taken_emails:
+            result.add_error(row_number, f"email '{row['email']}' already exists")
+        else:
+            chunk.append((row_number, row))
+    return chunk
+
+
+def _flush(pending, result, hasher):
+    """Drop rows that clash with existing users, then write the rest."""
+    chunk = _drop_taken(pending, result)
+    if not chunk:
+        return
+    try:
+        _write_chunk(chunk, hasher)
+    except IntegrityError:
+        # A user registered with one of these usernames after the check;
+        # drop the new clashes and write the rest once more
+        chunk = _drop_taken(chunk, result)
+        if not chunk:
+            return
+        try:
+            _write_chunk(chunk, hasher)
+        except IntegrityError as e:
+            for row_number, _ in chunk:
+                result.add_error(row_number, f"not imported: {e}")
+            return
+    result.created += len(chunk)
+
+
+def import_doctors(rows, chunk_size=DEFAULT_CHUNK_SIZE, hash_workers=0):
+    """
+    Import doctors from (row_number, dict) pairs.
+
+    Rows are validated in memory and written in chunks, each chunk in its
+    own transaction. Invalid rows are skipped and reported in the result;
+    they never abort the rest of the import.
+
+    Passwords in the file are hashed with PBKDF2, roughly 0.15s each on one
+    core, so they dominate a large import: use `hash_workers` processes for
+    those. Imported emails are marked verified.
+    """
+    result = ImportResult()
+    departments = {
+        name.lower(): pk for pk, name in Department.objects.values_list('id', 'name')
+    }
+    seen_usernames = set()
+    seen_emails = set()
+    pending = []
+
+    with PasswordHasherPool(hash_workers) as hasher:
+        for row_number, row in rows:
+            try:
+                cleaned = clean_row(row, departments)
+            except ValueError as e:
+                result.add_error(row_number, str(e))
+                continue
+
+            username_key = _username_key(cleaned['username'])
+            email_key = cleaned['email'].lower()
+            if username_key in seen_usernames:
+                result.add_error(row_number, f"duplicate username '{cleaned['username']}' in file")
+                continue
+            if email_key in seen_emails:
+                result.add_error(row_number, f"duplicate email '{cleaned['email']}' in file")
+                continue
+            seen_usernames.add(username_key)
+            seen_emails.add(email_key)
+
+            pending.append((row_number, cleaned))
+            if len(pending) >= chunk_size:
+                _flush(pending, result, hasher)
+                pending = []
+
+        if pending:
+            _flush(pending, result, hasher)
+    return result
@@ -0,0 +1,113 @@
+import operator
+import random
+import statistics
+import time
+from functools import reduce
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from admins.models import HealthArticle
+from admins.search import CANDIDATE_LIMIT, index_article, parse_query, search_articles
+
+DEFAULT_QUERIES = ['blood pressure', 'diabetes diet', 'sleep', 'heart exercise', 'vaccination children']
+
+# Vocabulary for synthetic articles: the default queries' words among
+# filler, so each term turns up in a fraction of the articles
+WORDS = (
+    "blood pressure diabetes diet sleep heart exercise vaccination children fever cough "
+    "nutrition vitamin hydration stress anxiety cholesterol kidney liver lungs allergy "
+    "infection immunity screening pregnancy elderly posture walking sugar salt weight"
+).split() + [f"filler{i}" for i in range(3000)]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def contains_search(query):
+    """
+    The search before the token table: every term somewhere in the title or
+    body, newest first, as many hits as search_articles() ranks.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return []
+    condition = reduce(
+        operator.and_, (Q(title__icontains=term) | Q(content__icontains=term) for term in terms)
+    )
+    return list(
+        HealthArticle.objects.filter(condition).defer('content', 'content_html').order_by('-created_at')[:CANDIDATE_LIMIT]
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Time article search through the token table against icontains filters on the "
+        "title and body, against the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', help=f"Queries to time (default: {', '.join(DEFAULT_QUERIES)}).")
+        parser.add_argument(
+            '--articles',
+            type=int,
+            default=0,
+            help="Add this many synthetic articles first, rolled back afterwards (default: 0).",
+        )
+        parser.add_argument(
+            '--words',
+            type=int,
+            default=800,
+            help="Words per synthetic article (default: 800).",
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=10,
+            help="Runs per query and method; the median is reported (default: 10).",
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['articles'] < 0:
+            raise CommandError("--repeat must be positive and --articles not negative.")
+        queries = options['queries'] or DEFAULT_QUERIES
+
+        try:
+            with transaction.atomic():
+                if options['articles']:
+                    self.add_articles(options['articles'], options['words'])
+                self.stdout.write(f"{HealthArticle.objects.count()} article(s)")
+                for query in queries:
+                    indexed, hits = self.time(lambda: search_articles(query)[0], options['repeat'])
+                    scanned, matches = self.time(lambda: contains_search(query), options['repeat'])
+                    self.stdout.write(
+                        f"  {query!r:<24} token table {indexed * 1000:8.2f} ms ({len(hits)} hits)  "
+                        f"icontains {scanned * 1000:8.2f} ms ({len(matches)} hits)  ({scanned / indexed:.1f}x)"
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def add_articles(self, count, words):
+        rng = random.Random(36)
+        articles = HealthArticle.objects.bulk_create(
+            HealthArticle(
+                title=' '.join(rng.choices(WORDS, k=4)).capitalize(),
+                content=' '.join(rng.choices(WORDS, k=words)),
+            )
+            for _ in range(count)
+        )
+        # bulk_create skips the indexing signal; not every backend returns ids
+        for article in HealthArticle.objects.order_by('-id')[:len(articles)]:
+            index_article(article)
+
+    def time(self, search, repeat):
+        result = search()  # warm connections and caches
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            search()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings), result
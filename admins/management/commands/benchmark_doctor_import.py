@@ -0,0 +1,126 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import CustomUser
+from admins.importers import DEFAULT_CHUNK_SIZE, import_doctors
+from admins.models import Department, DoctorAllocation
+from doctors.models import DoctorAvailability
+
+WORKING_DAYS = ['mon', 'tue', 'wed', 'thu', 'fri']
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a bulk doctor import of synthetic rows against creating the same doctors one "
+        "at a time, against the configured database. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help="Doctors in the bulk import (default: 10000).",
+        )
+        parser.add_argument(
+            '--baseline-rows',
+            type=int,
+            default=200,
+            help="Doctors created one at a time for comparison; 0 skips it (default: 200).",
+        )
+        parser.add_argument(
+            '--passwords',
+            action='store_true',
+            help="Give every row a password, so hashing is included in the timings.",
+        )
+        parser.add_argument(
+            '--hash-workers',
+            type=int,
+            action='append',
+            help="Hasher pool size(s) to time the bulk import with (default: 0).",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f"Rows written per transaction (default: {DEFAULT_CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['baseline_rows'] < 0:
+            raise CommandError("--rows must be positive and --baseline-rows not negative.")
+        passwords = options['passwords']
+
+        if options['baseline_rows']:
+            elapsed = self.rolled_back(lambda: self.one_at_a_time(options['baseline_rows'], passwords))
+            self.stdout.write(
+                f"One at a time: {options['baseline_rows']} doctors in {elapsed:.2f}s, "
+                f"{elapsed / options['baseline_rows'] * 1000:.2f} ms/doctor "
+                f"(~{elapsed / options['baseline_rows'] * options['rows']:.0f}s for {options['rows']})"
+            )
+
+        for workers in options['hash_workers'] or [0]:
+            def bulk():
+                result = import_doctors(
+                    self.rows(options['rows'], passwords),
+                    chunk_size=options['chunk_size'],
+                    hash_workers=workers,
+                )
+                if result.errors:
+                    raise CommandError(f"Import rejected {len(result.errors)} row(s): {result.errors[0][1]}")
+
+            elapsed = self.rolled_back(bulk)
+            self.stdout.write(
+                f"Bulk import, {workers} hash worker(s): {options['rows']} doctors in {elapsed:.2f}s, "
+                f"{elapsed / options['rows'] * 1000:.2f} ms/doctor"
+            )
+
+    def rolled_back(self, run):
+        """Time run() inside a transaction that is then rolled back."""
+        try:
+            with transaction.atomic():
+                Department.objects.create(name='Benchmark department')
+                started = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - started
+                raise _Rollback
+        except _Rollback:
+            return elapsed
+
+    def rows(self, count, passwords):
+        for i in range(count):
+            yield i + 2, {
+                'username': f'benchmark-doctor-{i}',
+                'first_name': 'Bench',
+                'last_name': f'Doctor {i}',
+                'email': f'benchmark-doctor-{i}@example.com',
+                'department': 'Benchmark department',
+                'start_time': '09:00',
+                'end_time': '17:00',
+                'working_days': ','.join(WORKING_DAYS),
+                'password': 'benchmark-password' if passwords else '',
+            }
+
+    def one_at_a_time(self, count, passwords):
+        # What adding each doctor through the single-doctor form does
+        department = Department.objects.get(name='Benchmark department')
+        for _, row in self.rows(count, passwords):
+            doctor = CustomUser.objects.create_user(
+                username=row['username'],
+                email=row['email'],
+                password=row['password'] or None,
+                first_name=row['first_name'],
+                last_name=row['last_name'],
+                role='doctor',
+            )
+            for day in WORKING_DAYS:
+                DoctorAvailability.objects.create(
+                    doctor=doctor, day_of_week=day, start_time=row['start_time'], end_time=row['end_time']
+                )
+            DoctorAllocation.objects.create(doctor=doctor, department=department)
@@ -0,0 +1,77 @@
+import statistics
+import time
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import CustomUser
+from admins.fragment_cache import FRAGMENT_DATA, bump_version
+
+# Dashboard tabs with {% cache %} fragments: role -> (views module, tabs)
+CACHED_TABS = {
+    'admin': ('admins.views', ['departments', 'medications', 'health-education']),
+    'patient': ('patients.views', ['overview', 'education']),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the dashboard tabs that hold cached fragments with the fragments cached "
+        "and with every fragment invalidated before each render, against the configured "
+        "database and cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help="Renders per tab and mode; the median is reported (default: 50).",
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be positive.")
+
+        factory = RequestFactory()
+        for role, (module, names) in CACHED_TABS.items():
+            user = CustomUser.objects.filter(role=role).order_by('id').first()
+            if user is None:
+                self.stdout.write(f"{role}: no user with this role, skipped.")
+                continue
+            tabs = import_module(module).dashboard_tabs
+
+            self.stdout.write(f"{role} dashboard ({user.username})")
+            for name in names:
+                def render():
+                    request = factory.get('/')
+                    request.user = user
+                    tabs.render_tab(request, name)
+
+                def render_cold():
+                    for data in FRAGMENT_DATA:
+                        bump_version(data)
+                    render()
+
+                cold, cold_queries = self.time(render_cold, options['repeat'])
+                render()  # cache the fragments again
+                hit, hit_queries = self.time(render, options['repeat'])
+                self.stdout.write(
+                    f"  {name:<18} {cold * 1000:8.2f} ms, {cold_queries:3d} queries invalidated  "
+                    f"{hit * 1000:8.2f} ms, {hit_queries:3d} queries cached  ({cold / hit:.2f}x)"
+                )
+
+    def time(self, render, repeat):
+        """Median seconds per render, and the queries one render runs."""
+        render()  # warm connections and compiled templates
+        with CaptureQueriesContext(connection) as queries:
+            render()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings), len(queries)
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admins.exports import DEFAULT_BATCH_SIZE, EXPORTS, FORMATS, parse_filters, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream bills or appointments to CSV or NDJSON with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS), help="What to export.")
+        parser.add_argument('--format', choices=FORMATS, default='csv', help="Output format (default: csv).")
+        parser.add_argument('--from', dest='date_from', help="Earliest date, YYYY-MM-DD.")
+        parser.add_argument('--to', dest='date_to', help="Latest date, YYYY-MM-DD.")
+        parser.add_argument('--doctor', help="Only rows for this doctor id.")
+        parser.add_argument('--department', help="Only rows for doctors in this department id.")
+        parser.add_argument('--output', '-o', help="Write to this file instead of stdout.")
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Rows fetched per query (default: {DEFAULT_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_filters(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        chunks = stream_export(options['kind'], options['format'], filters, options['batch_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(chunks)
+        else:
+            sys.stdout.writelines(chunks)
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ehospitality.template_warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile every project template and report compile times. "
+        "Exits non-zero on the first deploy-breaking template error."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--slowest',
+            type=int,
+            default=10,
+            help="How many of the slowest templates to list (default: 10).",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        timings, errors = warm_templates()
+        elapsed = time.perf_counter() - started
+
+        for name, seconds in sorted(timings, key=lambda t: t[1], reverse=True)[:options['slowest']]:
+            self.stdout.write(f"{seconds * 1000:8.2f} ms  {name}")
+
+        if errors:
+            for name, error in errors:
+                self.stderr.write(f"{name}: {error}")
+            raise CommandError(f"{len(errors)} template(s) failed to compile.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Compiled {len(timings)} template(s) in {elapsed * 1000:.1f} ms."
+        ))
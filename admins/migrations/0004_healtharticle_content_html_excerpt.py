@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admins', '0003_remove_healtharticle_is_published'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='healtharticle',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='healtharticle',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=400),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+# Frozen copies of the rendering in admins/models.py as of this migration;
+# later changes to it must not change what this migration writes
+EXCERPT_WORDS = 50
+EXCERPT_MAX_LENGTH = 400
+
+
+def render_article_content(content):
+    return linebreaks(content, autoescape=True)
+
+
+def make_article_excerpt(content):
+    excerpt = Truncator(content).words(EXCERPT_WORDS)
+    return Truncator(excerpt).chars(EXCERPT_MAX_LENGTH)
+
+
+def render_articles(apps, schema_editor):
+    """Fill content_html and excerpt for articles written before they existed."""
+    HealthArticle = apps.get_model('admins', 'HealthArticle')
+    articles = HealthArticle.objects.only('id', 'content').order_by('id')
+    batch = []
+    for article in articles.iterator(chunk_size=500):
+        article.content_html = render_article_content(article.content)
+        article.excerpt = make_article_excerpt(article.content)
+        batch.append(article)
+        if len(batch) >= 500:
+            HealthArticle.objects.bulk_update(batch, ['content_html', 'excerpt'])
+            batch = []
+    if batch:
+        HealthArticle.objects.bulk_update(batch, ['content_html', 'excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admins', '0004_healtharticle_content_html_excerpt'),
+    ]
+
+    operations = [
+        migrations.RunPython(render_articles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admins', '0005_render_existing_articles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=40)),
+                ('weight', models.PositiveIntegerField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='admins.healtharticle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'article'], name='articletoken_token_idx')],
+                'unique_together': {('article', 'token')},
+            },
+        ),
+    ]
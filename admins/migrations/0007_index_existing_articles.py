@@ -0,0 +1,63 @@
+import re
+from collections import Counter
+
+from django.db import migrations
+
+# Frozen copy of the tokenizer in admins/search.py as of this migration;
+# later changes to it must not change what this migration writes
+TITLE_WEIGHT = 3
+MAX_TOKEN_LENGTH = 40
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or
+    that the this to was were will with your you can may not
+""".split())
+
+
+def tokenize(text):
+    return [
+        word for word in (w.lower() for w in _WORD_RE.findall(text or ''))
+        if len(word) > 1 and len(word) <= MAX_TOKEN_LENGTH and word not in STOP_WORDS
+    ]
+
+
+def token_weights(title, content):
+    weights = Counter(tokenize(content))
+    for token in tokenize(title):
+        weights[token] += TITLE_WEIGHT
+    return weights
+
+
+def index_articles(apps, schema_editor):
+    """Build token table entries for articles written before search existed."""
+    HealthArticle = apps.get_model('admins', 'HealthArticle')
+    ArticleToken = apps.get_model('admins', 'ArticleToken')
+    batch = []
+    articles = HealthArticle.objects.only('id', 'title', 'content').order_by('id')
+    for article in articles.iterator(chunk_size=500):
+        batch.extend(
+            ArticleToken(article_id=article.id, token=token, weight=weight)
+            for token, weight in token_weights(article.title, article.content).items()
+        )
+        if len(batch) >= 5000:
+            ArticleToken.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ArticleToken.objects.bulk_create(batch)
+
+
+def clear_index(apps, schema_editor):
+    apps.get_model('admins', 'ArticleToken').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admins', '0006_articletoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_articles, clear_index),
+    ]
@@ -0,0 +1,88 @@
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import migrations
+
+# Frozen copy of the tokenizer in admins/search.py as of this migration;
+# later changes to it must not change what this migration writes
+TITLE_WEIGHT = 3
+MAX_TOKEN_LENGTH = 40
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or
+    that the this to was were will with your you can may not
+""".split())
+
+
+def normalize(word):
+    decomposed = unicodedata.normalize('NFKD', word.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return [
+        word for word in (normalize(w) for w in _WORD_RE.findall(text or ''))
+        if len(word) > 1 and len(word) <= MAX_TOKEN_LENGTH and word not in STOP_WORDS
+    ]
+
+
+def token_weights(title, content):
+    weights = Counter(tokenize(content))
+    for token in tokenize(title):
+        weights[token] += TITLE_WEIGHT
+    return weights
+
+
+def binary_collation(apps, schema_editor):
+    """
+    Compare tokens byte for byte on MySQL, so the (article, token) unique
+    key agrees with the tokenizer about which terms are distinct instead of
+    applying the column's accent- and case-insensitive collation.
+    """
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        "ALTER TABLE admins_articletoken MODIFY token VARCHAR(40) "
+        "CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL"
+    )
+
+
+def default_collation(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute("ALTER TABLE admins_articletoken MODIFY token VARCHAR(40) NOT NULL")
+
+
+def reindex_articles(apps, schema_editor):
+    """Rebuild the token table with case- and accent-folded terms."""
+    HealthArticle = apps.get_model('admins', 'HealthArticle')
+    ArticleToken = apps.get_model('admins', 'ArticleToken')
+    ArticleToken.objects.all().delete()
+    batch = []
+    articles = HealthArticle.objects.only('id', 'title', 'content').order_by('id')
+    for article in articles.iterator(chunk_size=500):
+        batch.extend(
+            ArticleToken(article_id=article.id, token=token, weight=weight)
+            for token, weight in token_weights(article.title, article.content).items()
+        )
+        if len(batch) >= 5000:
+            ArticleToken.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ArticleToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admins', '0007_index_existing_articles'),
+    ]
+
+    operations = [
+        migrations.RunPython(binary_collation, default_collation),
+        # Unapplying leaves the folded terms in place
+        migrations.RunPython(reindex_articles, migrations.RunPython.noop),
+    ]
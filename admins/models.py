@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
 
 from accounts.models import CustomUser
 
@@ -41,12 +43,27 @@ class DoctorAllocation(models.Model):
     def __str__(self):
         return f"{self.doctor.username} allocated to {self.department.name} {self.room}"
 
+EXCERPT_WORDS = 50
+EXCERPT_MAX_LENGTH = 400
+
+def render_article_content(content):
+    """Article body as escaped HTML paragraphs, same output as the |linebreaks filter."""
+    return linebreaks(content, autoescape=True)
+
+def make_article_excerpt(content):
+    """Short plain-text summary for article listings."""
+    excerpt = Truncator(content).words(EXCERPT_WORDS)
+    return Truncator(excerpt).chars(EXCERPT_MAX_LENGTH)
+
 class HealthArticle(models.Model):
     """
     A health education article created by an admin.
     """
     title = models.CharField(max_length=200)
     content = models.TextField()
+    # Derived from content on save, so reads never re-render or re-truncate it
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=EXCERPT_MAX_LENGTH, blank=True, editable=False)
     author = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='authored_articles')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -60,3 +77,27 @@ class HealthArticle(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.content_html = render_article_content(self.content)
+        self.excerpt = make_article_excerpt(self.content)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'content_html', 'excerpt'}
+        super().save(*args, **kwargs)
+
+
+class ArticleToken(models.Model):
+    """
+    Inverted index entry: one row per distinct term of an article.
+    Kept current by a post_save signal (see admins/signals.py).
+    """
+    article = models.ForeignKey(HealthArticle, on_delete=models.CASCADE, related_name='tokens')
+    token = models.CharField(max_length=40)
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('article', 'token')
+        indexes = [models.Index(fields=['token', 'article'], name='articletoken_token_idx')]
+
+    def __str__(self):
+        return f"{self.token} in article {self.article_id}"
@@ -0,0 +1,174 @@
+# admins/search.py
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import ArticleToken, HealthArticle
+
+TITLE_WEIGHT = 3
+MAX_TOKEN_LENGTH = 40
+MAX_QUERY_TERMS = 8
+# Relevance ranking happens in the database; only this many top hits are
+# re-ranked for recency
+CANDIDATE_LIMIT = 200
+# An article this many days old scores half as much as a new one
+RECENCY_HALF_LIFE_DAYS = 365
+SNIPPET_WORDS = 30
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or
+    that the this to was were will with your you can may not
+""".split())
+
+
+# -----------------------------
+# Tokenizing
+# -----------------------------
+def normalize(word):
+    """
+    Case- and accent-folded form of a word, so "Naïve" and "naive" are one
+    term, as they are to MySQL's default collation.
+    """
+    decomposed = unicodedata.normalize('NFKD', word.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Normalized index terms in text, without stop words and one-letter words."""
+    return [
+        word for word in (normalize(w) for w in _WORD_RE.findall(text or ''))
+        if len(word) > 1 and len(word) <= MAX_TOKEN_LENGTH and word not in STOP_WORDS
+    ]
+
+
+def token_weights(title, content):
+    """Term -> weight for one article; title words count TITLE_WEIGHT times."""
+    weights = Counter(tokenize(content))
+    for token in tokenize(title):
+        weights[token] += TITLE_WEIGHT
+    return weights
+
+
+def parse_query(query):
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+# -----------------------------
+# Indexing
+# -----------------------------
+def index_article(article):
+    """Replace an article's entries in the token table."""
+    weights = token_weights(article.title, article.content)
+    with transaction.atomic():
+        ArticleToken.objects.filter(article_id=article.id).delete()
+        ArticleToken.objects.bulk_create(
+            ArticleToken(article_id=article.id, token=token, weight=weight)
+            for token, weight in weights.items()
+        )
+
+
+# -----------------------------
+# Searching
+# -----------------------------
+def _idf(terms):
+    """Inverse document frequency per term, from one grouped query."""
+    total = HealthArticle.objects.count() or 1
+    doc_counts = dict(
+        ArticleToken.objects.filter(token__in=terms)
+        .values_list('token')
+        .annotate(n=Count('id'))
+    )
+    return {
+        term: math.log(1 + total / doc_counts[term])
+        for term in terms if doc_counts.get(term)
+    }
+
+
+def search_articles(query, limit=CANDIDATE_LIMIT):
+    """
+    Articles matching every term of the query, best first.
+
+    Relevance is a tf-idf sum over the token table, computed and ordered
+    in one grouped query; the top `limit` hits are then re-ranked with an
+    exponential recency decay. Returns (articles, terms).
+    """
+    terms = parse_query(query)
+    idf = _idf(terms)
+    # A term no article contains means no article contains them all
+    if not terms or len(idf) < len(terms):
+        return [], terms
+
+    score = Sum(
+        Case(
+            *[When(token=term, then=F('weight') * Value(weight)) for term, weight in idf.items()],
+            output_field=FloatField(),
+        )
+    )
+    hits = list(
+        ArticleToken.objects.filter(token__in=terms)
+        .values('article_id')
+        .annotate(matched=Count('id'), score=score)
+        .filter(matched=len(terms))
+        .order_by('-score')
+        .values_list('article_id', 'score')[:limit]
+    )
+    if not hits:
+        return [], terms
+
+    articles = (
+        HealthArticle.objects.select_related('author')
+        .defer('content', 'content_html')
+        .in_bulk([pk for pk, _ in hits])
+    )
+    now = timezone.now()
+
+    def ranked(hit):
+        article_id, relevance = hit
+        age_days = (now - articles[article_id].created_at).total_seconds() / 86400
+        return relevance * 0.5 ** (max(age_days, 0) / RECENCY_HALF_LIFE_DAYS)
+
+    hits.sort(key=ranked, reverse=True)
+    return [articles[pk] for pk, _ in hits if pk in articles], terms
+
+
+def highlight(text, terms, words=SNIPPET_WORDS):
+    """
+    Escaped snippet of text around the first matching term, with every
+    match wrapped in <mark>.
+    """
+    tokens = (text or '').split()
+    wanted = set(terms)
+
+    def matches(word):
+        return any(normalize(t) in wanted for t in _WORD_RE.findall(word))
+
+    first = next((i for i, word in enumerate(tokens) if matches(word)), 0)
+    start = max(first - words // 3, 0)
+    window = tokens[start:start + words]
+
+    parts = [f"<mark>{escape(w)}</mark>" if matches(w) else escape(w) for w in window]
+    snippet = ' '.join(parts)
+    if start > 0:
+        snippet = '… ' + snippet
+    if start + words < len(tokens):
+        snippet += ' …'
+    return mark_safe(snippet)
+
+
+def attach_snippets(articles, terms):
+    """Set article.snippet for one page of results, loading their bodies in one query."""
+    articles = list(articles)
+    contents = dict(
+        HealthArticle.objects.filter(id__in=[a.id for a in articles]).values_list('id', 'content')
+    )
+    for article in articles:
+        article.snippet = highlight(contents.get(article.id, ''), terms)
@@ -0,0 +1,28 @@
+# admins/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from doctors.models import Medication
+from .fragment_cache import bump_version
+from .search import index_article
+from .models import Department, HealthArticle
+
+FRAGMENT_SOURCES = {
+    HealthArticle: 'health_articles',
+    Medication: 'medications',
+    Department: 'departments',
+}
+
+
+@receiver([post_save, post_delete], sender=HealthArticle)
+@receiver([post_save, post_delete], sender=Medication)
+@receiver([post_save, post_delete], sender=Department)
+def invalidate_fragments(sender, **kwargs):
+    bump_version(FRAGMENT_SOURCES[sender])
+
+
+@receiver(post_save, sender=HealthArticle)
+def reindex_article(sender, instance, raw=False, **kwargs):
+    # Fixture loading (raw) saves articles before related rows exist
+    if not raw:
+        index_article(instance)
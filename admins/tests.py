@@ -1,3 +1,103 @@
+from datetime import date, time
+
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import CustomUser
+from patients.archive import archive_closed_appointments
+from patients.models import Appointment, TimeSlot
+
+from .exports import stream_export
+from . import importers
+from .importers import import_doctors
+from .models import ArticleToken, Department, HealthArticle
+from .search import search_articles
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(username='doctor', password='x', role='doctor')
+        self.patient = CustomUser.objects.create_user(username='patient', password='x', role='patient')
+
+    def appointment(self, day, symptoms=''):
+        slot = TimeSlot.objects.create(doctor=self.doctor, date=day, start_time=time(9), end_time=time(9, 30))
+        return Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, schedule=slot, status='completed', symptoms=symptoms
+        )
+
+    def export(self, kind, **filters):
+        return ''.join(stream_export(kind, 'csv', filters)).splitlines()
+
+    def test_appointments_read_their_own_date_columns(self):
+        self.appointment(date(2025, 3, 1))
+        with CaptureQueriesContext(connection) as queries:
+            lines = self.export('appointments')
+        self.assertNotIn('timeslot', ' '.join(q['sql'] for q in queries.captured_queries))
+        self.assertEqual(lines[1].split(',')[1:3], ['2025-03-01', '09:00:00'])
+
+    def test_formulas_are_quoted(self):
+        self.appointment(date(2025, 3, 1), symptoms='=HYPERLINK("http://example.com")')
+        self.appointment(date(2025, 3, 2), symptoms='-2 days of fever')
+        self.appointment(date(2025, 3, 3), symptoms='headache')
+        symptoms = [line.split(',')[-2] for line in self.export('appointments')[1:]]
+        self.assertEqual(symptoms, ['"\'=HYPERLINK(""http://example.com"")"', "'-2 days of fever", 'headache'])
+
+    def test_appointments_include_the_archive_tier(self):
+        old = self.appointment(date(2020, 1, 6), symptoms='cough')
+        recent = self.appointment(date.today())
+        self.assertEqual(archive_closed_appointments(), 1)
+        lines = self.export('appointments')
+        self.assertEqual([int(line.split(',')[0]) for line in lines[1:]], [old.id, recent.id])
+        self.assertIn('2020-01-06,09:00:00,completed', lines[1])
+        self.assertIn(',patient,', lines[1])
+        self.assertIn(',cough,', lines[1])
+        self.assertEqual(len(self.export('appointments', date_to=date(2020, 12, 31))), 2)
+
+
+class DoctorImportTests(TestCase):
+    def row(self, username, email):
+        return {
+            'username': username, 'first_name': 'A', 'last_name': 'B', 'email': email,
+            'department': 'Cardiology', 'start_time': '09:00', 'end_time': '17:00', 'working_days': 'mon',
+        }
+
+    def test_usernames_differing_only_in_case_clash(self):
+        Department.objects.create(name='Cardiology')
+        CustomUser.objects.create_user(username='DrSmith', password='x', role='doctor')
+        rows = [
+            (2, self.row('drsmith', 'a@example.com')),
+            (3, self.row('NewDoc', 'b@example.com')),
+            (4, self.row('newdoc', 'c@example.com')),
+        ]
+        result = import_doctors(rows)
+        self.assertEqual(result.created, 1)
+        self.assertEqual([row for row, _ in result.errors], [4, 2])
+        self.assertTrue(CustomUser.objects.filter(username='NewDoc').exists())
+
+    def test_upload_page_refuses_large_files(self):
+        Department.objects.create(name='Cardiology')
+        admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+        self.client.force_login(admin)
+        header = 'username,first_name,last_name,email,department,start_time,end_time\n'
+        lines = [f'doc{i},A,B,doc{i}@example.com,Cardiology,09:00,17:00\n' for i in range(importers.WEB_MAX_ROWS + 1)]
+
+        upload = SimpleUploadedFile('doctors.csv', (header + ''.join(lines)).encode())
+        self.client.post(reverse('admins:import_doctors'), {'file': upload})
+        self.assertFalse(CustomUser.objects.filter(role='doctor').exists())
+
+        upload = SimpleUploadedFile('doctors.csv', (header + ''.join(lines[1:])).encode())
+        self.client.post(reverse('admins:import_doctors'), {'file': upload})
+        self.assertEqual(CustomUser.objects.filter(role='doctor').count(), importers.WEB_MAX_ROWS)
+
 
-# Create your tests here.
+class ArticleSearchTests(TestCase):
+    def test_accented_and_plain_spellings_are_one_term(self):
+        article = HealthArticle.objects.create(title='Naïve questions', content='NAÏVE, naive or naïve')
+        self.assertEqual(ArticleToken.objects.get(article=article, token='naive').weight, 3 + 3)
+        self.assertFalse(ArticleToken.objects.filter(article=article, token='naïve').exists())
+        for query in ('naive', 'Naïve'):
+            articles, _ = search_articles(query)
+            self.assertEqual(articles, [article])
@@ -5,6 +5,7 @@ app_name = 'admins'
 
 urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/tab/<slug:tab>/', views.dashboard_tab, name='dashboard_tab'),
 
     #profile
     path('profile/update/', views.update_admin_profile, name='update_admin_profile'),
@@ -26,6 +27,7 @@ urlpatterns = [
     # Role-based add user pages
     path('add-patients/', views.add_patient, name='add_patient'),
     path('add-doctors/', views.add_doctor, name='add_doctor'),
+    path('import-doctors/', views.import_doctors, name='import_doctors'),
     path('add-admins/', views.add_admin, name='add_admin'),
 
     # Role-based edit user pages
@@ -43,6 +45,7 @@ urlpatterns = [
     path('create-invoice/<int:patient_id>/select-appointment/', views.select_appointment_for_billing, name='select_appointment_for_billing'),
     path('create-invoice/<int:appointment_id>/finalize/', views.finalize_invoice, name='finalize_invoice'),
     path('all-bills/', views.all_bills, name='all_bills'),
+    path('export/<str:kind>/', views.export_data, name='export_data'),
 
     # medicine
     path('add-medication/', views.add_medication, name='add_medication'),
@@ -1,6 +1,7 @@
+from itertools import islice
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, Http404, StreamingHttpResponse
 from django.contrib import messages
 from django.urls import reverse
 from accounts.models import CustomUser
@@ -8,92 +9,166 @@ from .models import Department, Room, Resource, DoctorAllocation, HealthArticle
 from accounts.utils import role_required
 from django.utils.timezone import now
 from django.db.models import Count, Sum, Q
-from patients.models import Appointment, Billing, MedicalVisit
+from patients.models import Appointment, Billing, EncounterEntry
 from accounts.forms import PatientRegistrationForm, DoctorRegistrationForm, AdminRegistrationForm, PatientProfileForm
-from .forms import PatientEditForm, DoctorEditForm, AdminEditForm, HealthArticleForm
+from .forms import PatientEditForm, DoctorEditForm, AdminEditForm, HealthArticleForm, DoctorImportForm
+from .importers import WEB_MAX_ROWS, import_doctors as bulk_import_doctors, read_rows as read_import_rows
+from .exports import EXPORTS, FORMATS, parse_filters, stream_export
 from doctors.models import Medication, MedicineInventory, DoctorAvailability
 from doctors.forms import MedicationForm
 from django.core.paginator import Paginator
+from django.utils.functional import SimpleLazyObject
 from admins.models import DoctorAllocation
 from django.db import transaction
+from .fragment_cache import fragment_context
+from accounts.dashboard import DashboardTabs
+from accounts.panels import gather
+from accounts.counters import role_counts
+from patients.counters import day_counts
+from .articles import article_conditional
+from django.views.decorators.cache import cache_control
 
 # -----------------------------
 # Dashboard View
 # -----------------------------
-@login_required
-@role_required('admin')
-def dashboard(request):
+dashboard_tabs = DashboardTabs('admins:dashboard_tab', 'admins/dashboard_tabs', default='overview')
+
+
+def _todays_bills():
+    return Billing.objects.filter(due_date=now().date())
+
+
+def _paid_bills():
+    return Billing.objects.filter(status='paid')
+
+
+def _todays_appointments():
+    return Appointment.objects.filter(date=now().date()).select_related('patient', 'doctor').order_by('start_time')
+
+
+def _amount_total(bills):
+    return bills.aggregate(total=Sum('amount'))['total'] or 0
+
+
+# Panels are independent queries, run side by side by gather()
+def _todays_bill_panels():
+    todays_bills = _todays_bills()
+    return {
+        'total_bills_count': todays_bills.count,
+        'total_unpaid_bills': todays_bills.filter(status='pending').count,
+        'total_billed_amount': lambda: _amount_total(todays_bills),
+        'total_paid_amount': lambda: _amount_total(todays_bills.filter(status='paid')),
+    }
+
+
+def _user_counts(counts):
+    return {
+        'total_patients': counts['patient'],
+        'total_doctors': counts['doctor'],
+        'total_admins': counts['admin'],
+    }
+
+
+@dashboard_tabs.tab('overview')
+def _overview_tab(request):
     today = now().date()
-    total_patients = CustomUser.objects.filter(role='patient').count()
-    total_doctors = CustomUser.objects.filter(role='doctor').count()
-    total_admins = CustomUser.objects.filter(role='admin').count()
+    panels = gather({
+        **_todays_bill_panels(),
+        # Users and today's appointments come from the counter tables
+        'role_counts': role_counts,
+        'todays_counts': lambda: day_counts(today),
+        'total_revenue': lambda: _amount_total(_paid_bills()),
+        'todays_total_revenue': lambda: _amount_total(_todays_bills().filter(status='paid')),
+        'todays_financial_overview': lambda: list(
+            _todays_bills().values('status').annotate(count=Count('id'), total_amount=Sum('amount'))
+        ),
+    })
+    todays_counts = panels.pop('todays_counts')
+    user_counts = _user_counts(panels.pop('role_counts'))
+    return {
+        **panels,
+        **user_counts,
+        'todays_appointments': sum(todays_counts.values()),
+        'todays_appointment_status': [
+            {'status': status, 'count': count} for status, count in todays_counts.items() if count
+        ],
+    }
+
+
+@dashboard_tabs.tab('users')
+def _users_tab(request):
+    return _user_counts(role_counts())
+
 
-    total_revenue = Billing.objects.filter(is_paid=True).aggregate(total=Sum('amount'))['total'] or 0
+@dashboard_tabs.tab('appointments')
+def _appointments_tab(request):
+    return {'todays_appointments_list': _todays_appointments()}
 
-    todays_appointments_count = Appointment.objects.filter(schedule__date=today).count()
-    todays_total_revenue = Billing.objects.filter(is_paid=True, due_date=today).aggregate(total=Sum('amount'))['total'] or 0
-    todays_bills = Billing.objects.filter(due_date=today)
-    total_bills_count = todays_bills.count()
-    total_unpaid_bills = todays_bills.filter(is_paid=False).count()
-    total_billed_amount = todays_bills.aggregate(total=Sum('amount'))['total'] or 0
-    total_paid_amount = todays_bills.filter(is_paid=True).aggregate(total=Sum('amount'))['total'] or 0
 
-    todays_appointment_status = Appointment.objects.filter(schedule__date=today).values('status').annotate(count=Count('id'))
-    todays_financial_overview = Billing.objects.filter(due_date=today).values('is_paid').annotate(count=Count('id'), total_amount=Sum('amount'))
+# The departments, medications and articles tabs are fragment-cached;
+# their data is built lazily so a cache hit doesn't run the queries
+@dashboard_tabs.tab('departments')
+def _departments_tab(request):
+    return {'departments': Department.objects.all(), **fragment_context()}
 
-    todays_appointments_list = Appointment.objects.filter(schedule__date=today).select_related('patient', 'doctor', 'schedule')
-    departments = Department.objects.all()
-    billings = Billing.objects.all()
 
+@dashboard_tabs.tab('medications')
+def _medications_tab(request):
     medications_list = Medication.objects.all().order_by('name')
-    paginator = Paginator(medications_list, 10)
-    page_number = request.GET.get('page')
-    medications = paginator.get_page(page_number)
+    return {
+        'medications': SimpleLazyObject(
+            lambda: Paginator(medications_list, 10).get_page(request.GET.get('page'))
+        ),
+        **fragment_context(),
+    }
 
-    # --- Profile Form Handling ---
-    profile_form = None
-    if request.method == 'POST':
-        if 'update_profile' in request.POST:
-            profile_form = PatientProfileForm(request.POST, request.FILES, instance=request.user)
-            if profile_form.is_valid():
-                profile_form.save()
-                messages.success(request, 'Your profile has been updated successfully.')
-                return redirect('admins:dashboard') 
-            else:
-                messages.error(request, 'Please correct the errors below.')
-    if not profile_form: 
-        profile_form = PatientProfileForm(instance=request.user)
 
-    # --- Health Articles for the Dashboard Tab ---
-    # Get all articles
-    health_articles_list = HealthArticle.objects.all()
-    # Paginate: 9 articles per page (for a 3x3 grid)
-    paginator = Paginator(health_articles_list, 9)
-    page_number = request.GET.get('health_page') # Use a unique parameter to avoid conflict
-    health_articles = paginator.get_page(page_number)
+@dashboard_tabs.tab('billing')
+def _billing_tab(request):
+    return gather({
+        **_todays_bill_panels(),
+        'todays_bills': lambda: list(_todays_bills().select_related('patient').order_by('-created_at')),
+    })
 
 
-    context = {
-        'total_patients': total_patients,
-        'total_doctors': total_doctors,
-        'total_admins': total_admins,
-        'todays_appointments': todays_appointments_count,
-        'total_revenue': total_revenue,
-        'todays_appointment_status': todays_appointment_status,
-        'todays_financial_overview': todays_financial_overview,
-        'todays_appointments_list': todays_appointments_list,
-        'total_bills_count': total_bills_count,
-        'total_unpaid_bills': total_unpaid_bills,
-        'total_billed_amount': total_billed_amount,
-        'total_paid_amount': total_paid_amount,
-        'todays_total_revenue': todays_total_revenue, 
-        'departments': departments,
-        'billings': billings,
-        'medications': medications,
-        'profile_form': profile_form,
-        'health_articles': health_articles,
+@dashboard_tabs.tab('health-education')
+def _health_education_tab(request):
+    # Paginate: 9 articles per page (for a 3x3 grid)
+    health_articles_list = HealthArticle.objects.select_related('author').defer('content', 'content_html')
+    return {
+        'health_articles': SimpleLazyObject(
+            lambda: Paginator(health_articles_list, 9).get_page(request.GET.get('health_page'))
+        ),
+        **fragment_context(),
     }
-    return render(request, 'admins/dashboard.html', context)
+
+
+@dashboard_tabs.tab('profile')
+def _profile_tab(request):
+    return {}
+
+
+@login_required
+@role_required('admin')
+def dashboard(request):
+    # --- Profile Form Handling ---
+    if request.method == 'POST' and 'update_profile' in request.POST:
+        profile_form = PatientProfileForm(request.POST, request.FILES, instance=request.user)
+        if profile_form.is_valid():
+            profile_form.save()
+            messages.success(request, 'Your profile has been updated successfully.')
+            return redirect('admins:dashboard')
+        messages.error(request, 'Please correct the errors below.')
+        return dashboard_tabs.render_shell(request, 'admins/dashboard.html', active='profile', profile_form=profile_form)
+
+    return dashboard_tabs.render_shell(request, 'admins/dashboard.html')
+
+
+@login_required
+@role_required('admin')
+def dashboard_tab(request, tab):
+    """One dashboard tab, fetched by the dashboard page when it is first shown."""
+    return dashboard_tabs.render_tab(request, tab)
 
 # -----------------------------
 # Profile View
@@ -110,7 +185,7 @@ def update_admin_profile(request):
         if form.is_valid():
             form.save()
             messages.success(request, 'Your profile has been updated successfully.')
-            url = reverse('admins:dashboard') + '#profile'
+            url = reverse('admins:dashboard') + '?tab=profile#profile'
             return redirect(url)
         else:
             messages.error(request, 'Please correct the errors below.')
@@ -269,44 +344,36 @@ def add_doctor(request):
         if form.is_valid():
             user = form.save(commit=False)
             user.role = 'doctor'
-            user.save()
 
             # Save doctor-specific schedule and allocation
             department = form.cleaned_data.get('department')
-            work_monday = form.cleaned_data.get('work_monday')
-            work_tuesday = form.cleaned_data.get('work_tuesday')
-            work_wednesday = form.cleaned_data.get('work_wednesday')
-            work_thursday = form.cleaned_data.get('work_thursday')
-            work_friday = form.cleaned_data.get('work_friday')
-            work_saturday = form.cleaned_data.get('work_saturday')
-            work_sunday = form.cleaned_data.get('work_sunday')
             start_time = form.cleaned_data.get('start_time')
             end_time = form.cleaned_data.get('end_time')
-
-            from doctors.models import DoctorAvailability
-            from admins.models import DoctorAllocation
-
-            # Create DoctorAvailability entries for each day the doctor works
-            if work_monday:
-                DoctorAvailability.objects.create(doctor=user, day_of_week='mon', start_time=start_time, end_time=end_time)
-            if work_tuesday:
-                DoctorAvailability.objects.create(doctor=user, day_of_week='tue', start_time=start_time, end_time=end_time)
-            if work_wednesday:
-                DoctorAvailability.objects.create(doctor=user, day_of_week='wed', start_time=start_time, end_time=end_time)
-            if work_thursday:
-                DoctorAvailability.objects.create(doctor=user, day_of_week='thu', start_time=start_time, end_time=end_time)
-            if work_friday:
-                DoctorAvailability.objects.create(doctor=user, day_of_week='fri', start_time=start_time, end_time=end_time)
-            if work_saturday:
-                DoctorAvailability.objects.create(doctor=user, day_of_week='sat', start_time=start_time, end_time=end_time)
-            if work_sunday:
-                DoctorAvailability.objects.create(doctor=user, day_of_week='sun', start_time=start_time, end_time=end_time)
-
-            DoctorAllocation.objects.create(
-                doctor=user,
-                department=department,
-                room=None
-            )
+            day_fields = {
+                'mon': 'work_monday',
+                'tue': 'work_tuesday',
+                'wed': 'work_wednesday',
+                'thu': 'work_thursday',
+                'fri': 'work_friday',
+                'sat': 'work_saturday',
+                'sun': 'work_sunday',
+            }
+
+            with transaction.atomic():
+                user.save()
+
+                # Create DoctorAvailability entries for each day the doctor works
+                DoctorAvailability.objects.bulk_create([
+                    DoctorAvailability(doctor=user, day_of_week=day, start_time=start_time, end_time=end_time)
+                    for day, field_name in day_fields.items()
+                    if form.cleaned_data.get(field_name)
+                ])
+
+                DoctorAllocation.objects.create(
+                    doctor=user,
+                    department=department,
+                    room=None
+                )
 
             messages.success(request, 'Doctor created successfully.')
             return redirect('admins:list_doctors')
@@ -314,6 +381,39 @@ def add_doctor(request):
         form = DoctorRegistrationForm()
     return render(request, 'admins/add_doctor.html', {'form': form})
 
+@login_required
+@role_required('admin')
+def import_doctors(request):
+    """
+    Bulk-onboard doctors from an uploaded CSV or JSON file of at most
+    WEB_MAX_ROWS rows. Shows per-row errors for anything that was skipped.
+    """
+    result = None
+    if request.method == 'POST':
+        form = DoctorImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                rows = list(islice(read_import_rows(form.cleaned_data['file']), WEB_MAX_ROWS + 1))
+            except (ValueError, UnicodeDecodeError) as e:
+                messages.error(request, f"Could not read the file: {e}")
+            else:
+                if len(rows) > WEB_MAX_ROWS:
+                    messages.error(
+                        request,
+                        f"Files of more than {WEB_MAX_ROWS} doctors are imported with the "
+                        f"import_doctors management command.",
+                    )
+                else:
+                    result = bulk_import_doctors(rows)
+                    if result.created:
+                        messages.success(request, f"{result.created} doctor(s) imported successfully.")
+                    if result.errors:
+                        messages.warning(request, f"{len(result.errors)} row(s) were skipped.")
+    else:
+        form = DoctorImportForm()
+
+    return render(request, 'admins/import_doctors.html', {'form': form, 'result': result, 'max_rows': WEB_MAX_ROWS})
+
 @login_required
 @role_required('admin')
 def add_admin(request):
@@ -449,7 +549,9 @@ def appointment_detail(request, appointment_id):
     )
 
     # Optionally, get the associated medical visit if it exists
-    medical_visit = MedicalVisit.objects.filter(appointment=appointment).first()
+    medical_visit = EncounterEntry.objects.filter(
+        appointment=appointment, kind='visit'
+    ).select_related('doctor').first()
 
     # Context for the template
     context = {
@@ -468,9 +570,8 @@ def all_appointments(request):
     # Start with all appointments, ordered by date (newest first)
     appointments_list = Appointment.objects.select_related(
         'patient', 
-        'doctor', 
-        'schedule'
-    ).order_by('-schedule__date', '-schedule__start_time')
+        'doctor'
+    ).order_by('-date', '-start_time')
 
     # Handle Search
     search_query = request.GET.get('search', '')
@@ -482,8 +583,8 @@ def all_appointments(request):
             Q(doctor__first_name__icontains=search_query) |
             Q(doctor__last_name__icontains=search_query) |
             Q(doctor__username__icontains=search_query) |
-            Q(schedule__date__icontains=search_query) |
-            Q(status__icontains=search_query)
+            Q(date__icontains=search_query) |
+            Appointment._meta.get_field('status').search(search_query)
         )
 
     # Apply Pagination
@@ -495,6 +596,7 @@ def all_appointments(request):
     context = {
         'appointments': appointments,
         'search_query': search_query, # So the search term stays in the input
+        'departments': Department.objects.order_by('name'),
     }
 
     return render(request, 'admins/all_appointments.html', context)
@@ -511,7 +613,7 @@ def add_department(request):
         if name:
             Department.objects.create(name=name, description=description)
             messages.success(request, 'Department added successfully.')
-            url = reverse('admins:dashboard') + '#departments'
+            url = reverse('admins:dashboard') + '?tab=departments#departments'
             return redirect(url)
         else:
             messages.error(request, 'Name is required.')
@@ -529,7 +631,7 @@ def edit_department(request, department_id):
             department.description = description
             department.save()
             messages.success(request, 'Department updated successfully.')
-            url = reverse('admins:dashboard') + '#departments'
+            url = reverse('admins:dashboard') + '?tab=departments#departments'
             return redirect(url)
         else:
             messages.error(request, 'Name is required.')
@@ -542,7 +644,7 @@ def delete_department(request, department_id):
     if request.method == 'POST':
         department.delete()
         messages.success(request, 'Department deleted successfully.')
-        url = reverse('admins:dashboard') + '#departments'
+        url = reverse('admins:dashboard') + '?tab=departments#departments'
         return redirect(url)
     return render(request, 'admins/delete_department.html', {'department': department})
 
@@ -606,7 +708,7 @@ def add_medication(request):
 
         messages.success(request, f"Medicine '{name}' added with {quantity} units in stock.")
         # Redirect back to the main dashboard
-        url = reverse('admins:dashboard') + '#medications'
+        url = reverse('admins:dashboard') + '?tab=medications#medications'
         return redirect(url)
 
     # If it's a GET request, show the dedicated add page
@@ -666,7 +768,7 @@ def edit_medication(request, med_id):
 
         messages.success(request, f"Medication '{medication.name}' updated.")
         # Redirect back to the main dashboard
-        url = reverse('admins:dashboard') + '#medications'
+        url = reverse('admins:dashboard') + '?tab=medications#medications'
         return redirect(url)
 
     # If it's a GET request, show the dedicated edit page
@@ -689,7 +791,7 @@ def delete_medication(request, med_id):
         medication.delete()
         messages.success(request, f"Medicine '{med_name}' deleted successfully.")
         # Redirect back to the dashboard
-        url = reverse('admins:dashboard') + '#medications'
+        url = reverse('admins:dashboard') + '?tab=medications#medications'
         return redirect(url)
     
     # If it's a GET request, show the confirmation page
@@ -735,7 +837,7 @@ def select_appointment_for_billing(request, patient_id):
     appointments = Appointment.objects.filter(
         patient=patient, 
         status='completed'
-    ).select_related('doctor', 'schedule').order_by('-schedule__date')
+    ).select_related('doctor').order_by('-date', '-start_time')
 
     return render(request, 'admins/select_appointment.html', {
         'patient': patient,
@@ -754,14 +856,15 @@ def finalize_invoice(request, appointment_id):
     )
 
     # Fetch prescriptions and diagnosis notes for this appointment
-    from doctors.models import Prescription, DiagnosisNote
+    from doctors.models import Prescription
     
     prescriptions = Prescription.objects.filter(
         appointment=appointment
     ).select_related('medication')
     
-    diagnosis_notes = DiagnosisNote.objects.filter(
-        appointment=appointment
+    diagnosis_notes = EncounterEntry.objects.filter(
+        appointment=appointment,
+        kind__in=['visit', 'diagnosis']
     )
     
     # Calculate total prescription cost
@@ -791,7 +894,6 @@ def finalize_invoice(request, appointment_id):
                         'amount': amount,
                         'description': description,
                         'due_date': due_date,
-                        'is_paid': False,
                         'status': 'pending'
                     }
                 )
@@ -809,7 +911,7 @@ def finalize_invoice(request, appointment_id):
     initial_description = existing_bill.description if existing_bill else ""
     initial_due_date = existing_bill.due_date if existing_bill else ""
 
-    suggested_description = f"Consultation fee for {appointment.doctor.get_full_name()} on {appointment.schedule.date}"
+    suggested_description = f"Consultation fee for {appointment.doctor.get_full_name()} on {appointment.date}"
     if prescriptions.exists():
         med_names = ", ".join([p.medication.name for p in prescriptions])
         suggested_description += f" + Medications: {med_names}"
@@ -842,7 +944,7 @@ def all_bills(request):
             Q(patient__last_name__icontains=search_query) |
             Q(patient__username__icontains=search_query) |
             Q(description__icontains=search_query) |
-            Q(status__icontains=search_query)
+            Billing._meta.get_field('status').search(search_query)
         )
 
     # Apply Pagination
@@ -854,20 +956,49 @@ def all_bills(request):
     context = {
         'bills': bills,
         'search_query': search_query,
+        'departments': Department.objects.order_by('name'),
     }
 
     return render(request, 'admins/all_bills.html', context)
 
+# -----------------------------
+# Data Exports
+# -----------------------------
+@login_required
+@role_required('admin')
+def export_data(request, kind):
+    """
+    Stream bills or appointments as CSV or NDJSON for accounting.
+    Filters: date_from, date_to (YYYY-MM-DD), doctor and department ids.
+    """
+    if kind not in EXPORTS:
+        raise Http404("Unknown export.")
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in FORMATS:
+        return HttpResponseBadRequest("format must be csv or ndjson.")
+    try:
+        filters = parse_filters(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    content_type = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(stream_export(kind, file_format, filters), content_type=content_type)
+    filename = f"{kind}_{now().strftime('%Y%m%d_%H%M%S')}.{file_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 # -----------------------------
 # Health Education Views
 # -----------------------------
 @login_required
 @role_required('admin')
+@cache_control(private=True, no_cache=True)
+@article_conditional
 def view_health_article(request, article_id):
     """
     Admin view to view a single health article.
     """
-    article = get_object_or_404(HealthArticle, id=article_id)
+    article = get_object_or_404(HealthArticle.objects.select_related('author').defer('content'), id=article_id)
     
     return render(request, 'admins/view_health_article.html', {'article': article})
 
@@ -885,7 +1016,7 @@ def add_health_article(request):
             article.save()
             messages.success(request, f"Article '{article.title}' created successfully.")
             # Redirect back to the Health Education tab in the dashboard
-            url = reverse('admins:dashboard') + '#health-education'
+            url = reverse('admins:dashboard') + '?tab=health-education#health-education'
             return redirect(url)
         else:
             messages.error(request, "Please correct the errors below.")
@@ -907,7 +1038,7 @@ def edit_health_article(request, article_id):
         if form.is_valid():
             form.save()
             messages.success(request, f"Article '{article.title}' updated.")
-            url = reverse('admins:dashboard') + '#health-education'
+            url = reverse('admins:dashboard') + '?tab=health-education#health-education'
             return redirect(url)
         else:
             messages.error(request, "Please correct the errors below.")
@@ -931,7 +1062,7 @@ def delete_health_article(request, article_id):
         article_title = article.title
         article.delete()
         messages.success(request, f"Article '{article_title}' deleted.")
-        url = reverse('admins:dashboard') + '#health-education'
+        url = reverse('admins:dashboard') + '?tab=health-education#health-education'
         return redirect(url)
 
     return render(request, 'admins/delete_health_article.html', {
@@ -1,9 +1,9 @@
 # doctors/admin.py
 from django.contrib import admin
+from patients.calendar import invalidate_doctor
 from .models import (
     DoctorAvailability,
-    DiagnosisNote,
-    Treatment,
+    DoctorLeave,
     Medication,
     Prescription
 )
@@ -36,22 +36,28 @@ class DoctorAvailabilityAdmin(admin.ModelAdmin):
         return obj.get_day_of_week_display()
 
 
-# -----------------------------
-# Other Admins
-# -----------------------------
-@admin.register(DiagnosisNote)
-class DiagnosisNoteAdmin(admin.ModelAdmin):
-    list_display = ['patient', 'doctor', 'created_at']
-    list_filter = ['created_at', 'doctor']
-    search_fields = ['patient__username', 'doctor__username']
-
+@admin.register(DoctorLeave)
+class DoctorLeaveAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'start_date', 'end_date', 'on_conflict', 'resolved_at')
+    list_filter = ('on_conflict', 'start_date')
+    search_fields = ('doctor__username', 'doctor__first_name', 'doctor__last_name', 'reason')
+    readonly_fields = ('resolved_at', 'created_at')
+    autocomplete_fields = ('doctor',)
 
-@admin.register(Treatment)
-class TreatmentAdmin(admin.ModelAdmin):
-    list_display = ['patient', 'doctor', 'created_at']
-    list_filter = ['created_at', 'doctor']
+    def save_model(self, request, obj, form, change):
+        # Changed days are settled again by the next resolve_leaves run
+        if change and {'doctor', 'start_date', 'end_date'} & set(form.changed_data):
+            obj.resolved_at = None
+        super().save_model(request, obj, form, change)
+        # The save signal only refreshes the new doctor's calendar
+        previous = form.initial.get('doctor')
+        if change and 'doctor' in form.changed_data and previous:
+            invalidate_doctor(previous)
 
 
+# -----------------------------
+# Other Admins
+# -----------------------------
 @admin.register(Medication)
 class MedicationAdmin(admin.ModelAdmin):
     list_display = ('name', 'price', 'unit', 'is_active')
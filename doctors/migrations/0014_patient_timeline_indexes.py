@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0013_alter_diagnosisnote_appointment_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='diagnosisnote',
+            index=models.Index(fields=['patient', 'created_at'], name='diagnosis_patient_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prescription',
+            index=models.Index(fields=['patient', 'created_at'], name='prescription_patient_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(fields=['patient', 'created_at'], name='treatment_patient_time_idx'),
+        ),
+    ]
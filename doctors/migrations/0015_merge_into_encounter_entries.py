@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0014_patient_timeline_indexes'),
+        # Copies notes and treatments into EncounterEntry first
+        ('patients', '0019_copy_encounter_entries'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='DiagnosisNote',
+        ),
+        migrations.DeleteModel(
+            name='Treatment',
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('doctors', '0015_merge_into_encounter_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorLeave',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(help_text='Last day off, inclusive')),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('on_conflict', models.CharField(choices=[('cancel', 'Cancel affected appointments'), ('reschedule', 'Move them to the next free slot')], default='cancel', max_length=10)),
+                ('resolved_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('doctor', models.ForeignKey(blank=True, help_text='Leave empty for a hospital holiday', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leaves', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Doctor Leave',
+                'verbose_name_plural': 'Doctor Leave & Holidays',
+                'ordering': ['-start_date'],
+                'indexes': [models.Index(fields=['end_date', 'start_date'], name='doctorleave_dates_idx'), models.Index(fields=['doctor', 'end_date'], name='doctorleave_doctor_idx')],
+            },
+        ),
+    ]
@@ -1,53 +1,11 @@
 from django.db import models
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from accounts.models import CustomUser
 
 from patients.models import Appointment
 
 
-class DiagnosisNote(models.Model):
-    patient = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        limit_choices_to={'role': 'patient'}
-    )
-    doctor = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        limit_choices_to={'role': 'doctor'},
-        related_name='diagnosis_notes'
-    )
-    appointment = models.ForeignKey(
-        'patients.Appointment',
-        on_delete=models.CASCADE,
-        null=True,
-        blank=True  
-    )
-    note = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self):
-        return f"Diagnosis for {self.patient.get_full_name()} on {self.created_at.strftime('%Y-%m-%d')}"
-
-
-class Treatment(models.Model):
-    patient = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        related_name='treatments'
-    )
-    doctor = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        related_name='doctor_treatments'
-    )
-    treatment_details = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self):
-        return f"Treatment for {self.patient.get_full_name()} by Dr. {self.doctor.get_full_name()} on {self.created_at.strftime('%Y-%m-%d')}"
-
-
 class Medication(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -101,6 +59,11 @@ class Prescription(models.Model):
     status = models.CharField(max_length=50, default='Pending')
     line_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'created_at'], name='prescription_patient_time_idx'),
+        ]
+
     def __str__(self):
         return f"Rx: {self.medication.name} for {self.patient.get_full_name()}"
 
@@ -170,6 +133,50 @@ class DoctorAvailability(models.Model):
         display_day = self.get_day_of_week_display()
         return f"{self.doctor.get_full_name()} available on {display_day} from {self.start_time.strftime('%H:%M')} to {self.end_time.strftime('%H:%M')}"
     
+class DoctorLeave(models.Model):
+    """
+    Whole days a doctor is off (leave), or every doctor is (a hospital
+    holiday, with no doctor set). Booked appointments on those days are
+    cancelled or moved by `manage.py resolve_leaves`.
+    """
+    ON_CONFLICT_CHOICES = [
+        ('cancel', 'Cancel affected appointments'),
+        ('reschedule', 'Move them to the next free slot'),
+    ]
+
+    doctor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='leaves',
+        null=True,
+        blank=True,
+        help_text="Leave empty for a hospital holiday",
+    )
+    start_date = models.DateField()
+    end_date = models.DateField(help_text="Last day off, inclusive")
+    reason = models.CharField(max_length=255, blank=True)
+    on_conflict = models.CharField(max_length=10, choices=ON_CONFLICT_CHOICES, default='cancel')
+    resolved_at = models.DateTimeField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Doctor Leave"
+        verbose_name_plural = "Doctor Leave & Holidays"
+        ordering = ['-start_date']
+        indexes = [
+            # Leave overlapping a date range: end_date >= start, start_date <= end
+            models.Index(fields=['end_date', 'start_date'], name='doctorleave_dates_idx'),
+            models.Index(fields=['doctor', 'end_date'], name='doctorleave_doctor_idx'),
+        ]
+
+    def __str__(self):
+        who = self.doctor.get_full_name() if self.doctor_id else "Hospital holiday"
+        return f"{who}: {self.start_date} to {self.end_date}"
+
+    def clean(self):
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValidationError("Leave can't end before it starts.")
+
 class MedicineInventory(models.Model):
     medicine = models.ForeignKey(Medication, on_delete=models.CASCADE, related_name='inventory')
     quantity = models.PositiveIntegerField(default=0, help_text="Number of units in stock")
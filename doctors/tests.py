@@ -1,3 +1,56 @@
+from datetime import date, time, timedelta
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import CustomUser
+from patients.archive import archive_closed_appointments
+from patients.models import Appointment, EncounterEntry, TimeSlot
+
+from .timeline import patient_timeline
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(username='doctor', password='x', role='doctor')
+        self.patient = CustomUser.objects.create_user(username='patient', password='x', role='patient')
+
+    def appointment(self, days_ago, notes=0):
+        day = date.today() - timedelta(days=days_ago)
+        slot = TimeSlot.objects.create(doctor=self.doctor, date=day, start_time=time(9), end_time=time(9, 30))
+        appointment = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, schedule=slot, status='completed'
+        )
+        for i in range(notes):
+            EncounterEntry.objects.create(
+                patient=self.patient, doctor=self.doctor, appointment=appointment, kind='diagnosis', notes=f"note {i}"
+            )
+        return appointment
+
+    def test_archived_records_page_like_live_ones(self):
+        self.appointment(days_ago=3, notes=1)
+        self.appointment(days_ago=400, notes=3)
+        self.appointment(days_ago=500, notes=2)
+        self.assertEqual(archive_closed_appointments(), 2)
+
+        everything, cursor = patient_timeline(self.patient, page_size=100)
+        self.assertIsNone(cursor)
+        # The live appointment and its note, then each archived appointment with its notes
+        self.assertEqual(
+            [e.kind for e in everything],
+            ['diagnosis', 'appointment', 'appointment', 'diagnosis', 'diagnosis', 'diagnosis', 'appointment', 'diagnosis', 'diagnosis'],
+        )
+        self.assertEqual([e.source for e in everything[2:]], ['archive'] * 7)
 
-# Create your tests here.
+        # Pages of 2 end part way through the archived groups
+        paged, cursor = [], None
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                events, cursor = patient_timeline(self.patient, before=cursor, page_size=2)
+            # One per source, plus the archived rows' bills
+            self.assertLessEqual(len(queries), 5)
+            paged += events
+            if not cursor:
+                break
+        self.assertEqual([e.cursor for e in paged], [e.cursor for e in everything])
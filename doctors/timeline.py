@@ -0,0 +1,194 @@
+# doctors/timeline.py
+"""
+A patient's clinical timeline: appointments, encounter entries (visits,
+diagnosis notes, treatments) and prescriptions merged newest first, one
+page at a time, followed into the archive (AppointmentHistory) for
+appointments moved there with their records.
+
+Each source is read with a keyset query (rows older than the cursor, newest
+first, LIMIT page size + 1) on its (patient, timestamp) index, and the sorted
+streams are merged with heapq. A page therefore costs one query per source
+however long the patient's history is (plus one for archived bills), with
+the doctor and medication joined in by select_related.
+"""
+import heapq
+import operator
+from dataclasses import dataclass
+from datetime import datetime
+from functools import reduce
+from itertools import islice
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from patients.archive import restore_rows
+from patients.models import Appointment, AppointmentHistory, EncounterEntry
+
+from .models import Prescription
+
+PAGE_SIZE = 20
+
+
+@dataclass
+class TimelineEvent:
+    kind: str
+    rank: int
+    timestamp: datetime
+    obj: object
+    source: str
+    pk: int
+
+    def sort_key(self):
+        # Ties on the timestamp are broken by source, then id, so the order is total
+        return (self.timestamp, self.rank, self.pk)
+
+    @property
+    def cursor(self):
+        return f"{self.timestamp.isoformat()}~{self.source}~{self.pk}"
+
+
+class Source:
+    """One stream of the timeline, ordered by `fields` then id, newest first."""
+
+    def __init__(self, kind, model, fields=('created_at',), related=('doctor',)):
+        self.kind = kind
+        self.model = model
+        self.fields = fields
+        self.related = related
+
+    def kind_of(self, obj):
+        return self.kind
+
+    def timestamp(self, obj):
+        return obj.created_at
+
+    def values(self, timestamp):
+        """The `fields` values of a row at `timestamp`."""
+        return (timestamp,)
+
+    def older_than(self, position, rank):
+        """Q for the rows that come after `position` = (timestamp, rank, id) on the timeline."""
+        timestamp, cursor_rank, pk = position
+        values = self.values(timestamp)
+        # (f1, f2, ...) < (v1, v2, ...), spelled out so each branch is an index range
+        branches = [
+            Q(**dict(zip(self.fields[:i], values[:i])), **{f"{field}__lt": values[i]})
+            for i, field in enumerate(self.fields)
+        ]
+        same_time = Q(**dict(zip(self.fields, values)))
+        if rank < cursor_rank:
+            branches.append(same_time)
+        elif rank == cursor_rank:
+            branches.append(same_time & Q(pk__lt=pk))
+        return reduce(operator.or_, branches)
+
+    def events(self, patient, position, rank, limit):
+        rows = self.model.objects.filter(patient=patient).select_related(*self.related)
+        if position:
+            rows = rows.filter(self.older_than(position, rank))
+        rows = rows.order_by(*(f"-{field}" for field in self.fields), '-pk')[:limit]
+        return [TimelineEvent(self.kind_of(obj), rank, self.timestamp(obj), obj, self.kind, obj.pk) for obj in rows]
+
+
+class AppointmentSource(Source):
+    """Appointments sit on the timeline at their slot's date and start time."""
+
+    def timestamp(self, obj):
+        return timezone.make_aware(datetime.combine(obj.date, obj.start_time))
+
+    def values(self, timestamp):
+        local = timezone.localtime(timestamp)
+        return (local.date(), local.time())
+
+
+class EncounterSource(Source):
+    """Visits, diagnosis notes and treatments, read from one table; the event kind is the entry's."""
+
+    def kind_of(self, obj):
+        return obj.kind
+
+
+class ArchiveSource(AppointmentSource):
+    """
+    Archived appointments, each expanded into the appointment and the
+    visits, notes, treatments and prescriptions in its snapshot. A group
+    sits at its appointment's date and start time, so the keyset stays on
+    the row's (date, start_time, id); an event's place in its group is
+    folded into its pk, letting a page end part way through a group.
+    """
+    GROUP_SIZE = 10000  # most events one archived appointment can expand to
+
+    def older_than(self, position, rank):
+        timestamp, cursor_rank, pk = position
+        if rank == cursor_rank:
+            # Keep the cursor's own row; events of it already shown are dropped in events()
+            position = (timestamp, cursor_rank, pk // self.GROUP_SIZE + 1)
+        return super().older_than(position, rank)
+
+    def group(self, appointment):
+        records = [
+            *(('visit', v) for v in appointment.medical_visits),
+            *(('diagnosis', n) for n in appointment.diagnosis_notes),
+            *(('treatment', t) for t in appointment.treatments),
+            *(('prescription', p) for p in appointment.prescriptions),
+        ]
+        records.sort(key=lambda record: (record[1].created_at is not None, record[1].created_at), reverse=True)
+        return [('appointment', appointment), *records]
+
+    def events(self, patient, position, rank, limit):
+        rows = self.model.objects.filter(patient_id=patient.id)
+        if position:
+            rows = rows.filter(self.older_than(position, rank))
+        # Every row gives at least one event, except perhaps the cursor's own
+        rows = list(rows.order_by(*(f"-{field}" for field in self.fields), '-pk')[:limit + 1])
+        events = []
+        for row, appointment in zip(rows, restore_rows(rows, patient)):
+            timestamp = self.timestamp(row)
+            for index, (kind, obj) in enumerate(self.group(appointment)[:self.GROUP_SIZE]):
+                pk = row.pk * self.GROUP_SIZE + self.GROUP_SIZE - 1 - index
+                event = TimelineEvent(kind, rank, timestamp, obj, self.kind, pk)
+                if position is None or event.sort_key() < position:
+                    events.append(event)
+        return events[:limit]
+
+
+SOURCES = (
+    AppointmentSource('appointment', Appointment, fields=('date', 'start_time')),
+    EncounterSource('encounter', EncounterEntry),
+    Source('prescription', Prescription, related=('doctor', 'medication')),
+    ArchiveSource('archive', AppointmentHistory, fields=('date', 'start_time'), related=()),
+)
+
+RANKS = {source.kind: rank for rank, source in enumerate(SOURCES)}
+
+
+def parse_cursor(cursor):
+    """(timestamp, rank, id) from an event's cursor, or None if it isn't one."""
+    try:
+        stamp, kind, pk = (cursor or '').split('~')
+        timestamp = parse_datetime(stamp)
+        position = (timestamp, RANKS[kind], int(pk))
+    except (KeyError, ValueError):
+        return None
+    if timestamp is None or timezone.is_naive(timestamp):
+        return None
+    return position
+
+
+def patient_timeline(patient, before=None, page_size=PAGE_SIZE):
+    """
+    One page of the patient's timeline, newest first, continuing after the
+    event whose cursor is `before`. Returns (events, cursor of the next page
+    or None on the last one).
+    """
+    position = parse_cursor(before)
+    streams = [
+        source.events(patient, position, rank, page_size + 1)
+        for rank, source in enumerate(SOURCES)
+    ]
+    merged = heapq.merge(*streams, key=TimelineEvent.sort_key, reverse=True)
+    events = list(islice(merged, page_size + 1))
+    if len(events) > page_size:
+        return events[:page_size], events[page_size - 1].cursor
+    return events, None
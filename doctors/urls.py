@@ -5,6 +5,7 @@ app_name = 'doctors'
 
 urlpatterns = [
     path('dashboard/', views.doctor_dashboard, name='dashboard'),
+    path('dashboard/tab/<slug:tab>/', views.dashboard_tab, name='dashboard_tab'),
     path('profile/', views.profile, name='profile'),
     path('profile/update/', views.profile_update, name='profile_update'),
     path('patient_detail/<int:patient_id>/', views.patient_detail, name='patient_detail'),
@@ -7,52 +7,58 @@ from django.utils import timezone
 from datetime import date, time, timedelta
 from accounts.utils import role_required
 from accounts.models import CustomUser 
-from .models import DiagnosisNote, Treatment, Medication, Prescription, DoctorAvailability
+from accounts.dashboard import DashboardTabs
+from .models import Medication, Prescription, DoctorAvailability
 from .forms import DoctorAvailabilityForm, DoctorProfileUpdateForm
+from .timeline import patient_timeline
 from admins.models import DoctorAllocation, Department
 from django.core.paginator import Paginator
 from django.http import HttpResponseRedirect, JsonResponse
 from .models import  Medication, Prescription
-from patients.models import Appointment, Billing, MedicalVisit
+from patients.models import Appointment, Billing, DoctorPatient, EncounterEntry
+from patients.counters import doctor_counts
+from django.db import transaction
 from django.db.models import Q, Case, When, Value, IntegerField
 import logging
 
 # -----------------------------
 # Doctor Dashboard
 # -----------------------------
-@login_required
-@role_required('doctor')
-def doctor_dashboard(request):
-    today = timezone.now().date()
-    doctor = request.user
+dashboard_tabs = DashboardTabs('doctors:dashboard_tab', 'doctors/dashboard_tabs', default='appointments')
 
-    try:
-        doctor_allocation = DoctorAllocation.objects.get(doctor=doctor)
-    except DoctorAllocation.DoesNotExist:
-        doctor_allocation = None
 
-    try:
-        availability = DoctorAvailability.objects.filter(doctor=doctor)
-    except DoctorAvailability.DoesNotExist:
-        availability = None
+@dashboard_tabs.tab('appointments')
+def _appointments_tab(request):
+    # One read of the day counters instead of three COUNTs over appointments
+    return doctor_counts(request.user, timezone.now().date())
 
-    # Appointments
-    appointments = Appointment.objects.filter(doctor=doctor).order_by('schedule__date', 'schedule__start_time')
-    todays_appointments = Appointment.objects.filter(doctor=doctor, schedule__date=today).order_by('schedule__start_time')
-    upcoming_appointments = Appointment.objects.filter(doctor=doctor, schedule__date__gt=today).order_by('schedule__date', 'schedule__start_time')
-    
-    todays_count = todays_appointments.count()
-    upcoming_count = upcoming_appointments.count()
-    appointments_count = appointments.count()
 
-    # Patients
-    patient_ids = appointments.values_list('patient_id', flat=True).distinct()
-    patients = CustomUser.objects.filter(id__in=patient_ids)
+@dashboard_tabs.tab('patients')
+def _patients_tab(request):
+    # One indexed read of the doctor's patient links, most recently seen first
+    links = DoctorPatient.objects.filter(doctor=request.user).select_related('patient').order_by('-last_visit', '-id')
+
+    search_query = request.GET.get('search', '')
+    if search_query:
+        links = links.filter(
+            Q(patient__first_name__icontains=search_query) |
+            Q(patient__last_name__icontains=search_query) |
+            Q(patient__email__icontains=search_query)
+        )
+
+    # Paginate patients
+    paginator = Paginator(links, 12)
+    return {
+        'patients': paginator.get_page(request.GET.get('page')),
+        'search_query': search_query,
+    }
+
 
-    # Bills
+@dashboard_tabs.tab('bills')
+def _bills_tab(request):
     today = timezone.now().date()
     bills_list = Billing.objects.filter(
-        appointment__doctor=doctor,
+        appointment__doctor=request.user,
         created_at__date=today
     ).order_by('-created_at')
 
@@ -61,29 +67,38 @@ def doctor_dashboard(request):
     if search_query:
         bills_list = bills_list.filter(
             Q(description__icontains=search_query) |
-            Q(status__icontains=search_query)
+            Billing._meta.get_field('status').search(search_query)
         )
 
     # Paginate bills
     paginator = Paginator(bills_list, 10)
-    page_number = request.GET.get('page')
-    todays_bills = paginator.get_page(page_number)
+    return {
+        'todays_bills': paginator.get_page(request.GET.get('page')),
+        'search_query': search_query,
+    }
 
-    context = {
-        'appointments': appointments,
-        'todays_appointments': todays_appointments,
-        'upcoming_appointments': upcoming_appointments,
-        'todays_count': todays_count,
-        'upcoming_count': upcoming_count,
-        'appointments_count': appointments_count,
-        'patients': patients,
+
+@dashboard_tabs.tab('profile')
+def _profile_tab(request):
+    doctor = request.user
+    return {
         'doctor': doctor,
-        'doctor_allocation': doctor_allocation,
-        'availability': availability,
-        'todays_bills': todays_bills,
-        'search_query': search_query,
+        'doctor_allocation': DoctorAllocation.objects.filter(doctor=doctor).select_related('department').first(),
+        'availability': DoctorAvailability.objects.filter(doctor=doctor),
     }
-    return render(request, 'doctors/doctor_dashboard.html', context)
+
+
+@login_required
+@role_required('doctor')
+def doctor_dashboard(request):
+    return dashboard_tabs.render_shell(request, 'doctors/doctor_dashboard.html')
+
+
+@login_required
+@role_required('doctor')
+def dashboard_tab(request, tab):
+    """One dashboard tab, fetched by the dashboard page when it is first shown."""
+    return dashboard_tabs.render_tab(request, tab)
 
 # -----------------------------
 # Today's Appointments
@@ -97,8 +112,8 @@ def todays_appointments(request):
     # Fetch all today's appointments
     appointments_list = Appointment.objects.filter(
         doctor=request.user,
-        schedule__date=today
-    ).select_related('patient', 'schedule')
+        date=today
+    ).select_related('patient').order_by('start_time')
 
     # Define doctor's working hours end (e.g., 6:00 PM) in timezone-aware form
     doctor_end_time = timezone.make_aware(
@@ -115,7 +130,7 @@ def todays_appointments(request):
             is_after_shift = now > doctor_end_time
             # Compare full datetimes instead of time-only to avoid naive/aware mix
             appointment_start_dt = timezone.make_aware(
-                timezone.datetime.combine(today, appt.schedule.start_time),
+                timezone.datetime.combine(today, appt.start_time),
                 timezone.get_current_timezone()
             )
             is_time_passed = now > appointment_start_dt
@@ -159,8 +174,8 @@ def upcoming_appointments(request):
     # Base queryset
     appointments = Appointment.objects.filter(
         doctor=doctor,
-        schedule__date__gt=today
-    ).order_by('schedule__date', 'schedule__start_time')
+        date__gt=today
+    ).order_by('date', 'start_time')
     
     # Apply search filters
     if search_query:
@@ -169,7 +184,7 @@ def upcoming_appointments(request):
         ) | appointments.filter(
             patient__last_name__icontains=search_query
         ) | appointments.filter(
-            schedule__date__icontains=search_query
+            date__icontains=search_query
         )
     
     context = {
@@ -185,11 +200,10 @@ def upcoming_appointments(request):
 @role_required('doctor')
 def patient_detail(request, patient_id):
     patient = get_object_or_404(CustomUser, id=patient_id, role='patient')
-    diagnosis_notes = DiagnosisNote.objects.filter(patient=patient)
-    treatments = Treatment.objects.filter(patient=patient)
-    medical_history = MedicalVisit.objects.filter(patient=patient)
-    prescriptions = Prescription.objects.filter(patient=patient)
-    appointments = Appointment.objects.filter(patient=patient).order_by('-schedule__date')
+    # One page of appointments, notes, treatments, visits and prescriptions,
+    # a query per source however long the history is
+    before = request.GET.get('before')
+    events, next_cursor = patient_timeline(patient, before=before)
 
     # Calculate age if date_of_birth is available
     age = None
@@ -199,11 +213,9 @@ def patient_detail(request, patient_id):
 
     context = {
         'patient': patient,
-        'diagnosis_notes': diagnosis_notes,
-        'treatments': treatments,
-        'medical_history': medical_history,
-        'prescriptions': prescriptions,
-        'appointments': appointments,
+        'events': events,
+        'next_cursor': next_cursor,
+        'is_first_page': not before,
         'age': age,
     }
     return render(request, 'doctors/patient_detail.html', context)
@@ -220,7 +232,7 @@ def appointment_schedule(request):
     search_query = request.GET.get('search', '')
     
     # Base queryset
-    appointments = Appointment.objects.filter(doctor=doctor).order_by('schedule__date', 'schedule__start_time')
+    appointments = Appointment.objects.filter(doctor=doctor).order_by('date', 'start_time')
     
     # Apply search filters
     if search_query:
@@ -229,7 +241,7 @@ def appointment_schedule(request):
         ) | appointments.filter(
             patient__last_name__icontains=search_query
         ) | appointments.filter(
-            schedule__date__icontains=search_query
+            date__icontains=search_query
         )
     
     context = {
@@ -320,7 +332,7 @@ def profile_update(request):
                 )
 
             messages.success(request, 'Profile and availability updated successfully.')
-            url = reverse('doctors:dashboard') + '#profile'
+            url = reverse('doctors:dashboard') + '?tab=profile#profile'
             return redirect(url)
         else:
             messages.error(request, 'Please correct the errors below.')
@@ -365,10 +377,11 @@ def appointment_details(request, appointment_id):
     appointment = get_object_or_404(Appointment, id=appointment_id, doctor=request.user)
 
     # ✅ Fetch notes and prescriptions for this specific appointment
-    diagnosis_notes = DiagnosisNote.objects.filter(
+    diagnosis_notes = EncounterEntry.objects.filter(
         patient=appointment.patient,
         doctor=request.user,
-        appointment=appointment
+        appointment=appointment,
+        kind='diagnosis'
     ).order_by('-created_at')
 
     prescriptions = Prescription.objects.filter(
@@ -381,7 +394,7 @@ def appointment_details(request, appointment_id):
     today = date.today()
     can_prescribe = (
         appointment.status == 'booked' and
-        appointment.schedule.date == today
+        appointment.date == today
     )
 
     context = {
@@ -403,7 +416,7 @@ def appointment_details_update(request, appointment_id):
     
     # Check if appointment is scheduled for today
     today = date.today()
-    appointment_date = appointment.schedule.date
+    appointment_date = appointment.date
     
     if appointment_date != today:
         messages.error(request, 'You can only add diagnosis and prescription for appointments scheduled for today.')
@@ -421,11 +434,12 @@ def appointment_details_update(request, appointment_id):
             if diagnosis_note:
                 try:
                     # ✅ Create diagnosis note linked to the appointment
-                    diagnosis = DiagnosisNote.objects.create(
+                    diagnosis = EncounterEntry.objects.create(
                         patient=appointment.patient,
                         doctor=request.user,
                         appointment=appointment,
-                        note=diagnosis_note
+                        kind='diagnosis',
+                        notes=diagnosis_note
                     )
                     
                     # ✅ Process multiple prescriptions
@@ -484,8 +498,7 @@ def appointment_details_update(request, appointment_id):
                             amount=total_amount,
                             description=f"Consultation + Medicines for {appointment.patient.get_full_name()}",
                             due_date=today + timedelta(days=7),
-                            status='pending',
-                            is_paid=False
+                            status='pending'
                         )
 
                         # Optional: Log for debugging
@@ -539,7 +552,9 @@ def search_medicine(request):
 @login_required
 @role_required('doctor')
 def bill_detail(request, bill_id):
-    bill = get_object_or_404(Billing, id=bill_id, appointment__doctor=request.user)
+    bill = get_object_or_404(
+        Billing, Q(appointment__doctor=request.user) | Q(history__doctor_id=request.user.id), id=bill_id
+    )
     context = {
         'bill': bill,
     }
@@ -553,9 +568,9 @@ def bill_detail(request, bill_id):
 def all_bills(request):
     doctor = request.user
     
-    # Get all bills for this doctor
+    # Get all bills for this doctor, archived appointments' ones included
     bills_list = Billing.objects.filter(
-        appointment__doctor=doctor
+        Q(appointment__doctor=doctor) | Q(history__doctor_id=doctor.id)
     ).order_by('-created_at')
     
     # Handle search
@@ -563,7 +578,7 @@ def all_bills(request):
     if search_query:
         bills_list = bills_list.filter(
             Q(description__icontains=search_query) |
-            Q(status__icontains=search_query) |
+            Billing._meta.get_field('status').search(search_query) |
             Q(patient__first_name__icontains=search_query) |
             Q(patient__last_name__icontains=search_query)
         )
@@ -585,7 +600,9 @@ def all_bills(request):
 @login_required
 @role_required('doctor')
 def bill_edit(request, bill_id):
-    bill = get_object_or_404(Billing, id=bill_id, appointment__doctor=request.user)
+    bill = get_object_or_404(
+        Billing, Q(appointment__doctor=request.user) | Q(history__doctor_id=request.user.id), id=bill_id
+    )
     
     if request.method == 'POST':
         # Handle bill editing logic here
@@ -594,10 +611,19 @@ def bill_edit(request, bill_id):
         status = request.POST.get('status')
         
         if amount and description and status:
-            bill.amount = amount
-            bill.description = description
-            bill.status = status
-            bill.save()
+            if status != bill.status and not bill.can_transition_to(status):
+                messages.error(request, f"A {bill.get_status_display().lower()} bill cannot be marked as {status}.")
+                return render(request, 'doctors/bill_edit.html', {'bill': bill})
+
+            with transaction.atomic():
+                # Conditional on the status shown on the form, so a payment or
+                # edit that landed meanwhile isn't overwritten
+                if status != bill.status and not bill.transition_to(status):
+                    messages.error(request, "The bill was changed while you were editing it. Please review it and try again.")
+                    return redirect('doctors:bill_edit', bill_id=bill.id)
+                bill.amount = amount
+                bill.description = description
+                bill.save(update_fields=['amount', 'description'])
             messages.success(request, 'Bill updated successfully.')
             return redirect(f"{reverse('doctors:dashboard')}#bills")
         else:
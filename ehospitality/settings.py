@@ -62,17 +62,26 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compile each template once per process and reuse it across requests
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Compile all project templates when a WSGI worker starts (see ehospitality/wsgi.py)
+WARM_TEMPLATES_ON_STARTUP = True
+
 WSGI_APPLICATION = 'ehospitality.wsgi.application'
 
 
@@ -94,6 +103,26 @@ DATABASES = {
     }
 }
 
+# Cache
+# Fragment-cache invalidation bumps a version key in this cache, so with
+# several worker processes use a shared backend (e.g. memcached or redis)
+# rather than the per-process default.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='ehospitality'),
+    }
+}
+
+# Upper bound on how long a cached dashboard fragment can live, in seconds
+FRAGMENT_CACHE_TIMEOUT = 600
+
+# Threads running a dashboard tab's independent queries concurrently; 0 runs
+# them in order. Off until benchmark_dashboards shows a gain on MySQL: each
+# thread opens its own database connection
+DASHBOARD_PANEL_WORKERS = config('DASHBOARD_PANEL_WORKERS', default=0, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -162,3 +191,8 @@ PASSWORD_RESET_TIMEOUT = 3600  # 1 hour in seconds
 # Payment Gateway
 STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY", "")
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE", "")  # e.g. a local stripe-mock for tests
+STRIPE_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+STRIPE_MAX_NETWORK_RETRIES = 2
+CHECKOUT_SESSION_TTL = 3600  # 1 hour in seconds
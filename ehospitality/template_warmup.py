@@ -0,0 +1,60 @@
+# ehospitality/template_warmup.py
+import os
+import time
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+
+# Our own apps; templates shipped by django.contrib are left to load lazily
+LOCAL_APPS = ('accounts', 'patients', 'doctors', 'admins')
+
+
+def template_dirs():
+    """Project-level template dirs followed by each local app's templates/."""
+    engine = engines['django'].engine
+    dirs = [str(d) for d in engine.dirs]
+    for label in LOCAL_APPS:
+        path = os.path.join(apps.get_app_config(label).path, 'templates')
+        if os.path.isdir(path):
+            dirs.append(path)
+    return dirs
+
+
+def iter_template_names():
+    """Yield every template name once, in loader lookup order."""
+    seen = set()
+    for root in template_dirs():
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                name = os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, '/')
+                if name not in seen:
+                    seen.add(name)
+                    yield name
+
+
+def warm_templates():
+    """
+    Compile every template through the configured loaders, filling the
+    cached loader of this process. Returns ([(name, seconds)], [(name, error)]).
+    """
+    engine = engines['django'].engine
+    timings = []
+    errors = []
+    for name in iter_template_names():
+        started = time.perf_counter()
+        try:
+            engine.get_template(name)
+        except (TemplateSyntaxError, TemplateDoesNotExist) as e:
+            errors.append((name, str(e)))
+            continue
+        timings.append((name, time.perf_counter() - started))
+    return timings, errors
+
+
+def warm_templates_or_fail():
+    """Warm the template cache at startup; refuse to start on a broken template."""
+    _, errors = warm_templates()
+    if errors:
+        details = '; '.join(f"{name}: {error}" for name, error in errors)
+        raise ImproperlyConfigured(f"Template errors found during warm-up: {details}")
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ehospitality.settings')
 
 application = get_wsgi_application()
+
+# Pre-compile templates so the first requests after a deploy don't pay for it
+if getattr(settings, 'WARM_TEMPLATES_ON_STARTUP', False):
+    from ehospitality.template_warmup import warm_templates_or_fail
+    warm_templates_or_fail()
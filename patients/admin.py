@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import EncounterEntry
+
+
+@admin.register(EncounterEntry)
+class EncounterEntryAdmin(admin.ModelAdmin):
+    list_display = ['patient', 'doctor', 'kind', 'appointment', 'created_at']
+    list_filter = ['kind', 'created_at', 'doctor']
+    search_fields = ['patient__username', 'doctor__username', 'diagnosis']
+    raw_id_fields = ['patient', 'doctor', 'appointment']
@@ -0,0 +1,339 @@
+# patients/archive.py
+"""
+Cold storage for closed appointments.
+
+Completed or cancelled appointments past a configurable age are moved,
+together with their encounter entries (visit records, diagnosis notes,
+treatments) and prescriptions, into one AppointmentHistory row each. The row keeps the
+indexed columns needed for listing and a JSON snapshot of everything
+else. Settled bills stay in the billing table, so revenue and bill lists
+still count them; they are re-pointed from the appointment to its
+history row. History views read both tiers through the helpers at the
+bottom, which rebuild read-only objects with the same attributes the
+templates and PDFs use for live rows.
+"""
+import heapq
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery, prefetch_related_objects
+from django.utils import timezone
+
+from admins.models import DoctorAllocation
+from doctors.models import Prescription
+from .models import Appointment, AppointmentHistory, Billing, EncounterEntry
+
+CLOSED_STATUSES = ('completed', 'cancelled')
+ARCHIVE_AFTER_DAYS = getattr(settings, 'APPOINTMENT_ARCHIVE_AFTER_DAYS', 365)
+DEFAULT_BATCH_SIZE = 500
+
+
+# -----------------------------
+# Snapshots
+# -----------------------------
+def _person(user):
+    if user is None:
+        return None
+    return {
+        'id': user.id,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email,
+    }
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _snapshot(appointment, entries, prescriptions, departments):
+    notes = [e for e in entries if e.kind == 'diagnosis']
+    visits = [e for e in entries if e.kind == 'visit']
+    treatments = [e for e in entries if e.kind == 'treatment']
+    return {
+        'symptoms': appointment.symptoms,
+        'doctor': _person(appointment.doctor),
+        'department': departments.get(appointment.doctor_id),
+        'diagnosis_notes': [
+            {'id': n.id, 'doctor': _person(n.doctor), 'note': n.notes, 'created_at': _iso(n.created_at)}
+            for n in notes
+        ],
+        'prescriptions': [
+            {
+                'id': p.id,
+                'medication': {'id': p.medication_id, 'name': p.medication.name, 'price': str(p.medication.price)},
+                'doctor': _person(p.doctor),
+                'dosage': p.dosage,
+                'frequency': p.frequency,
+                'duration_days': p.duration_days,
+                'quantity': p.quantity,
+                'instructions': p.instructions,
+                'status': p.status,
+                'line_total': str(p.line_total),
+                'created_at': _iso(p.created_at),
+            }
+            for p in prescriptions
+        ],
+        'medical_visits': [
+            {
+                'id': v.id,
+                'doctor': _person(v.doctor),
+                'diagnosis': v.diagnosis,
+                'symptoms': v.symptoms,
+                'medications_prescribed': v.medications_prescribed,
+                'notes': v.notes,
+                'created_at': _iso(v.created_at),
+            }
+            for v in visits
+        ],
+        'treatments': [
+            {'id': t.id, 'doctor': _person(t.doctor), 'notes': t.notes, 'created_at': _iso(t.created_at)}
+            for t in treatments
+        ],
+    }
+
+
+def _group(queryset, key='appointment_id'):
+    grouped = {}
+    for obj in queryset:
+        grouped.setdefault(getattr(obj, key), []).append(obj)
+    return grouped
+
+
+# -----------------------------
+# Archiving
+# -----------------------------
+def archivable_appointments(older_than_days=ARCHIVE_AFTER_DAYS):
+    """Closed appointments older than the cutoff with no bill still pending."""
+    cutoff = timezone.localdate() - timedelta(days=older_than_days)
+    return (
+        Appointment.objects.filter(status__in=CLOSED_STATUSES, date__lt=cutoff)
+        .exclude(Exists(Billing.objects.filter(appointment_id=OuterRef('pk'), status='pending')))
+        .order_by('id')
+    )
+
+
+def _archive_batch(appointment_ids, older_than_days=ARCHIVE_AFTER_DAYS):
+    with transaction.atomic():
+        # Lock the batch and its bills, then re-check it: since the candidates
+        # were listed a bill may have gone back to pending or an appointment
+        # may have been reopened. The snapshot is read under the same locks.
+        locked = list(
+            Appointment.objects.filter(id__in=appointment_ids).select_for_update().values_list('id', flat=True)
+        )
+        list(Billing.objects.filter(appointment_id__in=locked).select_for_update().values_list('id', flat=True))
+        appointment_ids = list(
+            archivable_appointments(older_than_days).filter(id__in=locked).values_list('id', flat=True)
+        )
+        if not appointment_ids:
+            return 0
+
+        appointments = list(
+            Appointment.objects.filter(id__in=appointment_ids).select_related('doctor', 'schedule')
+        )
+        entries = _group(
+            EncounterEntry.objects.filter(appointment_id__in=appointment_ids)
+            .select_related('doctor').order_by('-created_at')
+        )
+        prescriptions = _group(
+            Prescription.objects.filter(appointment_id__in=appointment_ids)
+            .select_related('medication', 'doctor').order_by('-created_at')
+        )
+        departments = dict(
+            DoctorAllocation.objects.filter(doctor_id__in={a.doctor_id for a in appointments})
+            .values_list('doctor_id', 'department__name')
+        )
+
+        AppointmentHistory.objects.bulk_create([
+            AppointmentHistory(
+                appointment_id=a.id,
+                patient_id=a.patient_id,
+                doctor_id=a.doctor_id,
+                date=a.schedule.date,
+                start_time=a.schedule.start_time,
+                end_time=a.schedule.end_time,
+                status=a.status,
+                created_at=a.created_at,
+                records=_snapshot(a, entries.get(a.id, []), prescriptions.get(a.id, []), departments),
+            )
+            for a in appointments
+        ], ignore_conflicts=True)
+        # Bills stay, moved onto the history row. Two statements, since MySQL
+        # applies SET clauses in order and would see the cleared appointment
+        bills = Billing.objects.filter(appointment_id__in=appointment_ids)
+        bills.update(history=Subquery(
+            AppointmentHistory.objects.filter(appointment_id=OuterRef('appointment_id')).values('id')[:1]
+        ))
+        bills.update(appointment=None)
+        # Encounter entries only SET_NULL on appointment delete
+        EncounterEntry.objects.filter(appointment_id__in=appointment_ids).delete()
+        # Prescriptions cascade
+        Appointment.objects.filter(id__in=appointment_ids).delete()
+    return len(appointments)
+
+
+def archive_closed_appointments(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=DEFAULT_BATCH_SIZE, limit=None):
+    """
+    Move archivable appointments and their records to AppointmentHistory,
+    one batch per transaction. Returns the number archived. Their time
+    slots are left for maintain_time_slots to collect.
+    """
+    candidates = archivable_appointments(older_than_days)
+    archived = 0
+    while limit is None or archived < limit:
+        size = batch_size if limit is None else min(batch_size, limit - archived)
+        ids = list(candidates.values_list('id', flat=True)[:size])
+        if not ids:
+            break
+        archived += _archive_batch(ids, older_than_days)
+    return archived
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+class ArchivedPerson(SimpleNamespace):
+    def get_full_name(self):
+        return f"{self.first_name} {self.last_name}".strip()
+
+
+def _restore_person(data):
+    if not data:
+        return ArchivedPerson(id=None, username='', first_name='', last_name='', email='')
+    return ArchivedPerson(**data)
+
+
+def _dt(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _restore(history, patient):
+    """
+    Rebuild an appointment-like object, with its records, from one history
+    row. Its bills are the live Billing rows; prefetch `bills` for a list.
+    """
+    records = history.records or {}
+    doctor = _restore_person(records.get('doctor'))
+    appointment = SimpleNamespace(
+        id=history.appointment_id,
+        pk=history.appointment_id,
+        is_archived=True,
+        patient=patient,
+        patient_id=history.patient_id,
+        doctor=doctor,
+        doctor_id=history.doctor_id,
+        department=records.get('department'),
+        date=history.date,
+        start_time=history.start_time,
+        schedule=SimpleNamespace(date=history.date, start_time=history.start_time, end_time=history.end_time),
+        status=history.status,
+        symptoms=records.get('symptoms'),
+        created_at=history.created_at,
+    )
+    # Shaped like EncounterEntry rows; snapshots from before the merge carry no note doctor
+    appointment.diagnosis_notes = [
+        SimpleNamespace(
+            id=n['id'], kind='diagnosis', notes=n['note'], created_at=_dt(n['created_at']),
+            doctor=_restore_person(n.get('doctor')) if n.get('doctor') else doctor, appointment=appointment,
+        )
+        for n in records.get('diagnosis_notes', [])
+    ]
+    appointment.prescriptions = [
+        SimpleNamespace(**{
+            **p,
+            'created_at': _dt(p['created_at']),
+            'line_total': Decimal(p['line_total']),
+            'medication': SimpleNamespace(**{**p['medication'], 'price': Decimal(p['medication']['price'])}),
+            'doctor': _restore_person(p['doctor']),
+            'appointment': appointment,
+        })
+        for p in records.get('prescriptions', [])
+    ]
+    appointment.medical_visits = [
+        SimpleNamespace(**{
+            **v,
+            'kind': 'visit',
+            'created_at': _dt(v['created_at']),
+            'doctor': _restore_person(v['doctor']),
+            'appointment': appointment,
+        })
+        for v in records.get('medical_visits', [])
+    ]
+    appointment.treatments = [
+        SimpleNamespace(**{
+            **t,
+            'kind': 'treatment',
+            'created_at': _dt(t['created_at']),
+            'doctor': _restore_person(t['doctor']),
+            'appointment': appointment,
+        })
+        for t in records.get('treatments', [])
+    ]
+    appointment.bills = list(history.bills.all())
+    return appointment
+
+
+def _history(patient, **filters):
+    return AppointmentHistory.objects.filter(patient_id=patient.id, **filters).order_by(
+        '-date', '-start_time', '-appointment_id'
+    )
+
+
+def restore_rows(rows, patient):
+    """Appointment-like objects for a patient's history rows, their bills read in one query."""
+    prefetch_related_objects(rows, 'bills')
+    return [_restore(row, patient) for row in rows]
+
+
+def archived_appointments(patient, **filters):
+    """Every archived appointment of a patient, newest first, as appointment-like objects."""
+    return restore_rows(list(_history(patient, **filters)), patient)
+
+
+def count_archived(patient, **filters):
+    return _history(patient, **filters).count()
+
+
+class AppointmentPages:
+    """
+    A patient's live appointments (`live`, a queryset) and archived ones
+    as one newest-first sequence for Paginator. A slice reads at most its
+    stop rows from each tier, ordered and limited in SQL, and restores
+    only the archived rows that fall inside it.
+    """
+
+    def __init__(self, live, patient, **filters):
+        self.live = live.order_by('-date', '-start_time', '-id')
+        self.archived = _history(patient, **filters)
+        self.patient = patient
+
+    def count(self):
+        return self.live.count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        merged = heapq.merge(
+            self.live[:stop], self.archived[:stop], key=lambda a: (a.date, a.start_time), reverse=True
+        )
+        shown = list(islice(merged, start, stop))
+        restored = iter(restore_rows([row for row in shown if isinstance(row, AppointmentHistory)], self.patient))
+        return [next(restored) if isinstance(row, AppointmentHistory) else row for row in shown]
+
+
+def archived_appointment(patient, appointment_id, **filters):
+    """One archived appointment of a patient, or None."""
+    row = AppointmentHistory.objects.filter(
+        patient_id=patient.id, appointment_id=appointment_id, **filters
+    ).first()
+    return _restore(row, patient) if row else None
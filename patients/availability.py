@@ -0,0 +1,142 @@
+# patients/availability.py
+"""
+Interval arithmetic for a doctor's bookable time on one day.
+
+A day's availability is the union of its DoctorAvailability windows (a
+split shift is several windows; a lunch break is the gap between them),
+minus blocked periods such as booked appointments or time already past.
+Days on leave (DoctorLeave) have no windows at all.
+Intervals are half-open (start, end) pairs of datetimes. Lists are kept
+sorted and non-overlapping, so a merge is one sort plus one pass and a
+subtraction a single sweep over both lists.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+
+from doctors.models import DoctorAvailability, DoctorLeave
+
+# Length of one bookable slot, for the booking views and slot pre-generation
+SLOT_LENGTH = timedelta(minutes=30)
+
+
+def day_code(day):
+    """DoctorAvailability.day_of_week code of a date, e.g. 'mon'."""
+    return day.strftime('%a').lower()
+
+
+# -----------------------------
+# Intervals
+# -----------------------------
+def merge(intervals):
+    """Sorted, non-overlapping union of (start, end) intervals; touching ones are joined."""
+    merged = []
+    for start, end in sorted(intervals):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract(intervals, removed):
+    """`intervals` minus `removed`, both merged lists; the result is merged too."""
+    result = []
+    first = 0
+    for start, end in intervals:
+        # Removed intervals ending before this one can't touch later ones either
+        while first < len(removed) and removed[first][1] <= start:
+            first += 1
+        i = first
+        while i < len(removed) and removed[i][0] < end:
+            if removed[i][0] > start:
+                result.append((start, removed[i][0]))
+            start = max(start, removed[i][1])
+            i += 1
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def covers(intervals, start, length=SLOT_LENGTH):
+    """Whether [start, start + length) lies inside one of the merged `intervals`."""
+    return any(low <= start and start + length <= high for low, high in intervals)
+
+
+def slot_starts(windows, free, length=SLOT_LENGTH):
+    """
+    Starts of the `length` slots on each window's grid (from the window's
+    start, every `length`) that lie wholly inside a `free` interval. Both
+    lists are merged, so one sweep over them does.
+    """
+    starts = []
+    i = 0
+    for window_start, window_end in windows:
+        current = window_start
+        while current + length <= window_end:
+            # Free intervals ending before this slot can't hold a later one either
+            while i < len(free) and free[i][1] < current + length:
+                i += 1
+            if i == len(free):
+                return starts
+            if free[i][0] <= current:
+                starts.append(current)
+            current += length
+    return starts
+
+
+# -----------------------------
+# Leave
+# -----------------------------
+def leave_calendar(start_date, end_date, doctor_ids=None):
+    """
+    {date: ids of the doctors off that day} for start_date..end_date, from
+    the leave overlapping it, in one query. None in a day's set is a
+    hospital holiday.
+    """
+    leaves = DoctorLeave.objects.filter(start_date__lte=end_date, end_date__gte=start_date)
+    if doctor_ids is not None:
+        leaves = leaves.filter(Q(doctor_id__in=doctor_ids) | Q(doctor__isnull=True))
+    calendar = defaultdict(set)
+    for doctor_id, first, last in leaves.values_list('doctor_id', 'start_date', 'end_date'):
+        day = max(first, start_date)
+        while day <= min(last, end_date):
+            calendar[day].add(doctor_id)
+            day += timedelta(days=1)
+    return calendar
+
+
+def on_leave(calendar, doctor_id, day):
+    """Whether the doctor is off on `day`, by a leave_calendar() lookup."""
+    off = calendar.get(day, ())
+    return None in off or doctor_id in off
+
+
+# -----------------------------
+# Doctors
+# -----------------------------
+def windows_on(day, times):
+    """Merged datetime windows on `day` from (start time, end time) pairs."""
+    return merge((datetime.combine(day, start), datetime.combine(day, end)) for start, end in times)
+
+
+def day_windows(doctor, day):
+    """The doctor's merged availability windows on one date; none on leave."""
+    doctor_id = getattr(doctor, 'pk', doctor)
+    if on_leave(leave_calendar(day, day, [doctor_id]), doctor_id, day):
+        return []
+    times = DoctorAvailability.objects.filter(doctor=doctor, day_of_week=day_code(day)).values_list(
+        'start_time', 'end_time'
+    )
+    return windows_on(day, times)
+
+
+def free_slots(doctor, day, blocked=(), length=SLOT_LENGTH):
+    """Start times of the doctor's bookable slots on `day`, leaving out the `blocked` intervals."""
+    windows = day_windows(doctor, day)
+    free = subtract(windows, merge(blocked))
+    return [start.time() for start in slot_starts(windows, free, length)]
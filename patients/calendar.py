@@ -0,0 +1,163 @@
+# patients/calendar.py
+"""
+Doctor x weekday grid of free and booked slot counts.
+
+Free counts come from the doctors' availability windows less leave,
+occupied appointments and time already past, the same arithmetic the
+booking view uses, so they don't depend on which TimeSlot rows happen to
+exist. Weeks are cached per doctor behind a version number.
+
+Invalidation hangs off post_save/post_delete of Appointment, TimeSlot,
+DoctorAvailability and DoctorLeave (patients/signals.py). Queryset
+.delete() sends those signals too, but .update(), bulk_create() and
+bulk_update() don't: code writing those models in bulk must call
+invalidate_doctor() (or invalidate_all()) itself, as slots.py and
+leave.py do.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from doctors.models import DoctorAvailability
+
+from .availability import SLOT_LENGTH, day_code, leave_calendar, merge, on_leave, slot_starts, subtract, windows_on
+from .models import Appointment
+
+CALENDAR_CACHE_TIMEOUT = getattr(settings, 'CALENDAR_CACHE_TIMEOUT', 300)
+DOCTORS_PER_PAGE = 20
+
+
+# -----------------------------
+# Weeks
+# -----------------------------
+def week_start(value=None):
+    """Monday of the week containing `value` (a date or YYYY-MM-DD string), default this week."""
+    if isinstance(value, str):
+        try:
+            value = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            value = None
+    if not isinstance(value, date):
+        value = timezone.localdate()
+    return value - timedelta(days=value.weekday())
+
+
+def week_days(start):
+    return [start + timedelta(days=i) for i in range(7)]
+
+
+# -----------------------------
+# Cache
+# -----------------------------
+# Version shared by every doctor, bumped for hospital holidays
+ALL_DOCTORS = 'all'
+
+
+def _version_key(doctor_id):
+    return f"calendar-version:{doctor_id}"
+
+
+def _week_key(doctor_id, version, start):
+    return f"calendar:{doctor_id}:{version}:{start.isoformat()}"
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate_doctor(doctor_id):
+    """
+    Drop every cached week of a doctor's calendar. A version bump rather
+    than a delete, since a change can touch any week (e.g. a rescheduled
+    appointment moving between weeks).
+    """
+    _bump(_version_key(doctor_id))
+
+
+def invalidate_all():
+    """Drop every cached week of every doctor, e.g. for a hospital holiday."""
+    _bump(_version_key(ALL_DOCTORS))
+
+
+# -----------------------------
+# Aggregation
+# -----------------------------
+def _count_slots(doctor_ids, start):
+    """
+    Free/booked counts per doctor per day for one week: one query each for
+    the weekly windows, the leave and the occupied appointments.
+    """
+    end = start + timedelta(days=6)
+    weekly = defaultdict(list)  # (doctor_id, day_of_week) -> [(start, end)]
+    availabilities = DoctorAvailability.objects.filter(doctor_id__in=doctor_ids).values_list(
+        'doctor_id', 'day_of_week', 'start_time', 'end_time'
+    )
+    for doctor_id, day_of_week, start_time, end_time in availabilities:
+        weekly[(doctor_id, day_of_week)].append((start_time, end_time))
+
+    occupied = defaultdict(set)  # (doctor_id, date) -> {start_time}
+    taken = Appointment.objects.filter(
+        doctor_id__in=doctor_ids, status__in=Appointment.OCCUPYING_STATUSES, date__range=(start, end)
+    ).values_list('doctor_id', 'date', 'start_time')
+    for doctor_id, day, start_time in taken:
+        occupied[(doctor_id, day)].add(start_time)
+
+    off = leave_calendar(start, end, doctor_ids)
+    now = timezone.localtime().replace(tzinfo=None)
+    weeks = {doctor_id: {} for doctor_id in doctor_ids}
+    for day in week_days(start):
+        for doctor_id in doctor_ids:
+            booked = occupied.get((doctor_id, day), ())
+            windows = [] if on_leave(off, doctor_id, day) else windows_on(day, weekly.get((doctor_id, day_code(day)), ()))
+            if not windows and not booked:
+                continue
+            blocked = [(datetime.combine(day, t), datetime.combine(day, t) + SLOT_LENGTH) for t in booked]
+            if windows and windows[0][0] < now:
+                blocked.append((windows[0][0], now))
+            free = slot_starts(windows, subtract(windows, merge(blocked)))
+            weeks[doctor_id][day.isoformat()] = {'booked': len(booked), 'free': len(free)}
+    return weeks
+
+
+def doctor_weeks(doctor_ids, start):
+    """
+    {doctor_id: {'YYYY-MM-DD': {'free': n, 'booked': n}}} for one week.
+    Days with neither working hours nor bookings are omitted. Cached per
+    doctor-week; only doctors missing from the cache are counted.
+    """
+    doctor_ids = list(doctor_ids)
+    versions = cache.get_many([_version_key(d) for d in doctor_ids + [ALL_DOCTORS]])
+    shared = versions.get(_version_key(ALL_DOCTORS), 0)
+    keys = {
+        d: _week_key(d, f"{shared}.{versions.get(_version_key(d), 0)}", start)
+        for d in doctor_ids
+    }
+    found = cache.get_many(keys.values())
+    weeks = {d: found[key] for d, key in keys.items() if key in found}
+
+    missing = [d for d in doctor_ids if d not in weeks]
+    if missing:
+        counted = _count_slots(missing, start)
+        cache.set_many({keys[d]: counted[d] for d in missing}, CALENDAR_CACHE_TIMEOUT)
+        weeks.update(counted)
+    return weeks
+
+
+def build_calendar(doctors, start):
+    """Rows for a doctor x weekday grid; `doctors` is one page of CustomUser."""
+    days = week_days(start)
+    weeks = doctor_weeks([d.id for d in doctors], start)
+    empty = {'free': 0, 'booked': 0}
+    return [
+        {
+            'doctor': doctor,
+            'days': [weeks[doctor.id].get(day.isoformat(), empty) for day in days],
+        }
+        for doctor in doctors
+    ]
@@ -0,0 +1,216 @@
+# patients/counters.py
+"""
+Per-doctor appointment counters: by day (DoctorDayStats) and all-time
+(DoctorStats), plus the doctor-patient links (DoctorPatient).
+
+Booking, moving, cancelling, completing and deleting an appointment each
+move one count between (doctor, day, status) cells with F() updates; see
+patients/signals.py. The dashboards read a handful of these rows instead of
+counting appointments. `manage.py reconcile_counters` recounts them nightly.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from accounts.counters import bump
+
+from accounts.models import CustomUser
+
+from .models import (
+    APPOINTMENT_STATUS_CODES, Appointment, AppointmentHistory, DoctorDayStats, DoctorPatient, DoctorStats,
+)
+
+STATUS_COLUMNS = tuple(APPOINTMENT_STATUS_CODES)
+
+RECONCILE_BATCH_SIZE = 1000
+
+_TOTAL = sum((F(column) for column in STATUS_COLUMNS[1:]), F(STATUS_COLUMNS[0]))
+
+
+def count_appointment(key, delta):
+    """Add `delta` to the counter cell for key = (doctor_id, date, status)."""
+    doctor_id, day, status = key
+    if doctor_id and day and status in STATUS_COLUMNS:
+        bump(DoctorDayStats, {'doctor_id': doctor_id, 'date': day}, **{status: delta})
+        bump(DoctorStats, {'doctor_id': doctor_id}, **{status: delta})
+
+
+def move_appointment(previous, current):
+    """Move one count from the `previous` key to `current` (either may be None)."""
+    if previous == current:
+        return
+    if previous:
+        count_appointment(previous, -1)
+    if current:
+        count_appointment(current, 1)
+
+
+def link_patient(doctor_id, patient_id):
+    """Make sure the doctor-patient link exists."""
+    DoctorPatient.objects.bulk_create(
+        [DoctorPatient(doctor_id=doctor_id, patient_id=patient_id)], ignore_conflicts=True
+    )
+
+
+def count_visit(doctor_id, patient_id, day):
+    """Add one completed visit on `day` to the doctor-patient link."""
+    day = Value(day)
+    changes = {
+        'visit_count': F('visit_count') + 1,
+        'first_visit': Least(Coalesce('first_visit', day), day),
+        'last_visit': Greatest(Coalesce('last_visit', day), day),
+    }
+    link = DoctorPatient.objects.filter(doctor_id=doctor_id, patient_id=patient_id)
+    if not link.update(**changes):
+        link_patient(doctor_id, patient_id)
+        link.update(**changes)
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def doctor_counts(doctor, today):
+    """Today's, upcoming and all appointments of one doctor."""
+    # Only the days from today to the booking horizon are summed
+    counts = DoctorDayStats.objects.filter(doctor=doctor, date__gte=today).aggregate(
+        todays_count=Sum(_TOTAL, filter=Q(date=today)),
+        upcoming_count=Sum(_TOTAL, filter=Q(date__gt=today)),
+    )
+    counts['appointments_count'] = (
+        DoctorStats.objects.filter(doctor=doctor).values_list(_TOTAL, flat=True).first()
+    )
+    return {name: value or 0 for name, value in counts.items()}
+
+
+def day_counts(day):
+    """{status: count} over all doctors for one day."""
+    totals = DoctorDayStats.objects.filter(date=day).aggregate(
+        **{column: Sum(column) for column in STATUS_COLUMNS}
+    )
+    return {column: totals[column] or 0 for column in STATUS_COLUMNS}
+
+
+# -----------------------------
+# Reconciliation
+# -----------------------------
+def _reconcile(model, key_fields, appointments, counters, dry_run):
+    actual = defaultdict(lambda: dict.fromkeys(STATUS_COLUMNS, 0))
+    for row in appointments.order_by().values(*key_fields, 'status').annotate(n=Count('id')).iterator():
+        actual[tuple(row[field] for field in key_fields)][row['status']] = row['n']
+
+    stored = {
+        tuple(row[field] for field in key_fields): {column: row[column] for column in STATUS_COLUMNS}
+        for row in counters.values(*key_fields, *STATUS_COLUMNS).iterator()
+    }
+
+    zero = dict.fromkeys(STATUS_COLUMNS, 0)
+    drift = {}
+    for key in actual.keys() | stored.keys():
+        counted, real = stored.get(key, zero), actual.get(key, zero)
+        if counted != real:
+            drift[key] = (counted, real)
+
+    if not dry_run:
+        missing = [model(**dict(zip(key_fields, key))) for key in drift.keys() - stored.keys()]
+        model.objects.bulk_create(missing, batch_size=RECONCILE_BATCH_SIZE, ignore_conflicts=True)
+        items = list(drift.items())
+        for start in range(0, len(items), RECONCILE_BATCH_SIZE):
+            with transaction.atomic():
+                for key, (counted, real) in items[start:start + RECONCILE_BATCH_SIZE]:
+                    # Apply the difference, so increments made meanwhile are kept
+                    bump(
+                        model,
+                        dict(zip(key_fields, key)),
+                        **{column: real[column] - counted[column] for column in STATUS_COLUMNS},
+                    )
+    return drift
+
+
+def reconcile_doctor_days(since=None, dry_run=False):
+    """
+    Recount appointments per doctor, day and status and correct the day
+    rows that drifted. Only days from `since` on are checked if given.
+    Returns {(doctor_id, date): (counted, actual)} for the rows that were off,
+    each a {status: n} dict.
+    """
+    appointments = Appointment.objects.all()
+    counters = DoctorDayStats.objects.all()
+    if since:
+        appointments = appointments.filter(date__gte=since)
+        counters = counters.filter(date__gte=since)
+    return _reconcile(DoctorDayStats, ('doctor_id', 'date'), appointments, counters, dry_run)
+
+
+def reconcile_doctor_totals(dry_run=False):
+    """As reconcile_doctor_days, for the all-time rows; keys are (doctor_id,)."""
+    return _reconcile(DoctorStats, ('doctor_id',), Appointment.objects.all(), DoctorStats.objects.all(), dry_run)
+
+
+def _visits(appointments):
+    """{(doctor_id, patient_id): (first_visit, last_visit, visit_count)} from a queryset of appointments."""
+    completed = Q(status='completed')
+    rows = appointments.order_by().values('doctor_id', 'patient_id').annotate(
+        first=Min('date', filter=completed),
+        last=Max('date', filter=completed),
+        n=Count('id', filter=completed),
+    )
+    return {(row['doctor_id'], row['patient_id']): (row['first'], row['last'], row['n']) for row in rows.iterator()}
+
+
+def reconcile_doctor_patients(dry_run=False):
+    """
+    Rebuild the doctor-patient links from the live and archived appointments
+    and correct the ones that drifted. Returns {(doctor_id, patient_id):
+    (stored, actual)} for the links that were off, each a (first_visit,
+    last_visit, visit_count) tuple or None if the link is missing or stale.
+    """
+    # Links are read first, so one made by a booking during the recount is never taken for stale
+    stored = {
+        (row[0], row[1]): row[2:]
+        for row in DoctorPatient.objects.values_list(
+            'doctor_id', 'patient_id', 'first_visit', 'last_visit', 'visit_count'
+        ).iterator()
+    }
+
+    actual = _visits(Appointment.objects.all())
+    users = CustomUser.objects.values('id')
+    archived = AppointmentHistory.objects.filter(doctor_id__in=users, patient_id__in=users)
+    for key, (first, last, n) in _visits(archived).items():
+        if key not in actual:
+            actual[key] = (first, last, n)
+            continue
+        live_first, live_last, live_n = actual[key]
+        firsts = [day for day in (first, live_first) if day]
+        lasts = [day for day in (last, live_last) if day]
+        actual[key] = (min(firsts, default=None), max(lasts, default=None), n + live_n)
+
+    drift = {
+        key: (stored.get(key), actual.get(key))
+        for key in actual.keys() | stored.keys()
+        if stored.get(key) != actual.get(key)
+    }
+
+    if not dry_run:
+        missing = [
+            DoctorPatient(doctor_id=key[0], patient_id=key[1], first_visit=real[0], last_visit=real[1], visit_count=real[2])
+            for key, (counted, real) in drift.items() if counted is None
+        ]
+        DoctorPatient.objects.bulk_create(missing, batch_size=RECONCILE_BATCH_SIZE, ignore_conflicts=True)
+        items = [(key, counted, real) for key, (counted, real) in drift.items() if counted is not None]
+        for start in range(0, len(items), RECONCILE_BATCH_SIZE):
+            with transaction.atomic():
+                for (doctor_id, patient_id), counted, real in items[start:start + RECONCILE_BATCH_SIZE]:
+                    link = DoctorPatient.objects.filter(doctor_id=doctor_id, patient_id=patient_id)
+                    if real is None:
+                        # No appointment between them is left, live or archived
+                        link.delete()
+                    else:
+                        # The count moves by the difference, so visits completed meanwhile are kept
+                        link.update(
+                            first_visit=real[0],
+                            last_visit=real[1],
+                            visit_count=F('visit_count') + (real[2] - counted[2]),
+                        )
+    return drift
@@ -0,0 +1,73 @@
+# patients/fields.py
+"""
+Status columns on the largest tables are stored as small integers rather
+than strings. CodedStatusField keeps the string codes ('booked', 'paid',
+...) everywhere in Python, so filters, forms, admin and templates compare
+against the same values as before; only the column holds the integer.
+"""
+from django.core import checks
+from django.db import models
+from django.db.models import Q
+
+
+class CodedStatusField(models.PositiveSmallIntegerField):
+    description = "Status code stored as a small integer"
+
+    def __init__(self, *args, codes=None, **kwargs):
+        # codes: {'booked': 1, ...}; numbers are stored, so never renumber one
+        self.codes = dict(codes or {})
+        self.names = {number: code for code, number in self.codes.items()}
+        super().__init__(*args, **kwargs)
+
+    def check(self, **kwargs):
+        errors = super().check(**kwargs)
+        if not self.codes or len(self.names) != len(self.codes):
+            errors.append(checks.Error(
+                "CodedStatusField needs codes mapping each status to a distinct number.",
+                obj=self,
+                id='patients.E001',
+            ))
+        return errors
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['codes'] = self.codes
+        return name, path, args, kwargs
+
+    @property
+    def validators(self):
+        # The integer range validators don't apply to the string codes
+        return list(self._validators)
+
+    def to_python(self, value):
+        if value is None or value in self.codes:
+            return value
+        if value in self.names:
+            return self.names[value]
+        if isinstance(value, str) and value.isdigit() and int(value) in self.names:
+            return self.names[int(value)]
+        return value
+
+    def from_db_value(self, value, expression, connection):
+        return self.names.get(value, value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        value = self.to_python(value)
+        if value not in self.codes:
+            raise ValueError(f"{value!r} is not a valid {self.name} code.")
+        return self.codes[value]
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+    def search(self, text):
+        """Q matching the codes whose name or label contains `text`, in place of __icontains."""
+        text = text.lower()
+        labels = dict(self.flatchoices)
+        matching = [
+            code for code in self.codes
+            if text in code.lower() or text in str(labels.get(code, '')).lower()
+        ]
+        return Q(**{f"{self.name}__in": matching})
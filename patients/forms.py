@@ -4,9 +4,9 @@ from .models import Appointment
 from django.contrib.auth import get_user_model
 from admins.models import Department
 from patients.models import TimeSlot, Appointment
-from doctors.models import DoctorAvailability
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
+from .availability import covers, day_windows
 
 User = get_user_model()
 
@@ -17,9 +17,12 @@ class AppointmentBookingForm(forms.ModelForm):
     time = forms.TimeField(widget=forms.TimeInput(attrs={'type': 'time'}), required=True)
     symptoms = forms.CharField(widget=forms.Textarea(attrs={'rows': 3}), required=False)
 
+    field_order = ['department', 'doctor', 'date', 'time', 'symptoms']
+
     class Meta:
         model = Appointment
-        fields = ['department', 'doctor', 'date', 'time', 'symptoms']
+        # date/time are the slot's, copied onto the model on save
+        fields = ['doctor', 'symptoms']
 
     def __init__(self, *args, **kwargs):
         self.instance = kwargs.get('instance')
@@ -53,19 +56,15 @@ class AppointmentBookingForm(forms.ModelForm):
         time_obj = cleaned_data.get('time')
 
         if doctor and date and time_obj:
-            
-            # Get the day of week for the selected date
-            day_of_week_short = date.strftime('%a').lower()  # e.g., 'mon', 'tue'
-            
-            try:
-                availability = DoctorAvailability.objects.get(doctor=doctor, day_of_week=day_of_week_short)
-            except DoctorAvailability.DoesNotExist:
+            # Merged windows, so split shifts and several windows a day are fine
+            windows = day_windows(doctor, date)
+            if not windows:
                 raise forms.ValidationError("Doctor is not available on the selected date.")
-            
-            # Check if the time is within the doctor's working hours
-            if time_obj < availability.start_time or time_obj >= availability.end_time:
+
+            # The whole slot has to fit in the doctor's working hours
+            if not covers(windows, datetime.combine(date, time_obj)):
                 raise forms.ValidationError("Selected time is outside the doctor's working hours.")
-            
+
             # Check if there's already an appointment at this time
             try:
                 time_slot = TimeSlot.objects.get(
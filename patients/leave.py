@@ -0,0 +1,207 @@
+# patients/leave.py
+"""
+Settling the booked appointments that fall on leave (DoctorLeave).
+
+resolve_leave() reads every booked appointment in the leave's date range
+with one range query, then cancels them all, or moves each to the
+doctor's next free slot after the leave (cancelling those that find none
+within the booking horizon), with bulk updates. Bulk updates send no
+signals, so the day counters are moved by the grouped difference and the
+calendar cache is dropped per doctor. Each patient gets a queued
+notification rather than an email sent inline.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from accounts.models import CustomUser, Notification
+from accounts.notifications import queue_notifications
+from doctors.models import DoctorAvailability, DoctorLeave
+
+from .availability import SLOT_LENGTH, day_code, leave_calendar, merge, on_leave, slot_starts, subtract, windows_on
+from .calendar import invalidate_doctor
+from .counters import count_appointment
+from .models import Appointment, TimeSlot
+from .slots import BOOKING_HORIZON_DAYS, DEFAULT_BATCH_SIZE
+
+RESCHEDULED_SUBJECT = 'Appointment Rescheduled - E-Hospitality'
+CANCELLED_SUBJECT = 'Appointment Cancelled - E-Hospitality'
+
+
+def affected_appointments(leave):
+    """Booked appointments on the leave's days from today on, in one range query."""
+    start_date = max(leave.start_date, timezone.localdate())
+    appointments = Appointment.objects.filter(status='booked', date__range=(start_date, leave.end_date))
+    if leave.doctor_id:
+        appointments = appointments.filter(doctor_id=leave.doctor_id)
+    return appointments.order_by('date', 'start_time', 'id')
+
+
+def _free_slots(doctor_ids, start_date, end_date):
+    """
+    {doctor_id: free slot starts from start_date to end_date, in order}:
+    each doctor's windows less booked appointments, skipping days off.
+    Three queries however long the range.
+    """
+    weekly = defaultdict(list)  # (doctor_id, day_of_week) -> [(start, end)]
+    availabilities = DoctorAvailability.objects.filter(doctor_id__in=doctor_ids).values_list(
+        'doctor_id', 'day_of_week', 'start_time', 'end_time'
+    )
+    for doctor_id, day_of_week, start_time, end_time in availabilities:
+        weekly[(doctor_id, day_of_week)].append((start_time, end_time))
+
+    booked = defaultdict(list)  # (doctor_id, date) -> [(start, end)]
+    taken = Appointment.objects.filter(
+        doctor_id__in=doctor_ids, status__in=Appointment.OCCUPYING_STATUSES, date__range=(start_date, end_date)
+    ).values_list('doctor_id', 'date', 'start_time')
+    for doctor_id, day, start_time in taken:
+        start = datetime.combine(day, start_time)
+        booked[(doctor_id, day)].append((start, start + SLOT_LENGTH))
+
+    off = leave_calendar(start_date, end_date, doctor_ids)
+    now = timezone.localtime().replace(tzinfo=None)
+    free = defaultdict(list)
+    day = start_date
+    while day <= end_date:
+        for doctor_id in doctor_ids:
+            windows = windows_on(day, weekly.get((doctor_id, day_code(day)), ()))
+            if not windows or on_leave(off, doctor_id, day):
+                continue
+            open_time = subtract(windows, merge(booked.get((doctor_id, day), ())))
+            free[doctor_id].extend(start for start in slot_starts(windows, open_time) if start >= now)
+        day += timedelta(days=1)
+    return free
+
+
+def _plan_moves(leave, appointments):
+    """{appointment id: new start} for the ones that find a free slot after the leave."""
+    first = max(leave.end_date + timedelta(days=1), timezone.localdate())
+    doctor_ids = sorted({appointment.doctor_id for appointment in appointments})
+    free = _free_slots(doctor_ids, first, first + timedelta(days=BOOKING_HORIZON_DAYS - 1))
+    moves = {}
+    used = Counter()
+    # Appointments come in date order, so the earliest booked get the earliest slots
+    for appointment in appointments:
+        slots = free[appointment.doctor_id]
+        if used[appointment.doctor_id] < len(slots):
+            moves[appointment.id] = slots[used[appointment.doctor_id]]
+            used[appointment.doctor_id] += 1
+    return moves
+
+
+def _notification(appointment, doctor_name, leave, new_start):
+    when = f"{appointment.date:%d %b %Y} at {appointment.start_time:%H:%M}"
+    why = "the doctor's leave" if leave.doctor_id else "a hospital holiday"
+    if new_start:
+        subject = RESCHEDULED_SUBJECT
+        message = (
+            f"Your appointment with Dr. {doctor_name} on {when} falls on {why}. "
+            f"It has been moved to {new_start:%d %b %Y} at {new_start:%H:%M}."
+        )
+    else:
+        subject = CANCELLED_SUBJECT
+        message = (
+            f"Your appointment with Dr. {doctor_name} on {when} falls on {why} and has been cancelled. "
+            f"Please book another time."
+        )
+    return Notification(user_id=appointment.patient_id, subject=subject, message=message)
+
+
+def _cancel(appointments, batch_size):
+    ids = [appointment.id for appointment in appointments]
+    for start in range(0, len(ids), batch_size):
+        Appointment.objects.filter(id__in=ids[start:start + batch_size]).update(status='cancelled')
+    for (doctor_id, day), n in Counter((a.doctor_id, a.date) for a in appointments).items():
+        count_appointment((doctor_id, day, 'booked'), -n)
+        count_appointment((doctor_id, day, 'cancelled'), n)
+
+
+def _move(appointments, moves, batch_size):
+    """Point each appointment at a slot for its new time, creating the slots in bulk."""
+    if not appointments:
+        return
+    starts = [moves[appointment.id] for appointment in appointments]
+    TimeSlot.objects.bulk_create(
+        [
+            TimeSlot(doctor_id=a.doctor_id, date=start.date(), start_time=start.time(), end_time=(start + SLOT_LENGTH).time())
+            for a, start in zip(appointments, starts)
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    slots = {
+        (doctor_id, day, start_time): pk
+        for pk, doctor_id, day, start_time in TimeSlot.objects.filter(
+            doctor_id__in={a.doctor_id for a in appointments},
+            date__range=(min(starts).date(), max(starts).date()),
+        ).values_list('id', 'doctor_id', 'date', 'start_time')
+    }
+
+    moved = Counter()
+    for appointment, start in zip(appointments, starts):
+        moved[(appointment.doctor_id, appointment.date)] -= 1
+        moved[(appointment.doctor_id, start.date())] += 1
+        appointment.schedule_id = slots[(appointment.doctor_id, start.date(), start.time())]
+        appointment.date = start.date()
+        appointment.start_time = start.time()
+    Appointment.objects.bulk_update(appointments, ['schedule', 'date', 'start_time'], batch_size=batch_size)
+    for (doctor_id, day), delta in moved.items():
+        count_appointment((doctor_id, day, 'booked'), delta)
+
+
+def _drop_unused_slots(leave, batch_size):
+    """Delete the slots nobody booked on the days off, so they stop showing as free."""
+    unused = TimeSlot.objects.filter(date__range=(leave.start_date, leave.end_date)).exclude(
+        Exists(Appointment.objects.filter(schedule_id=OuterRef('pk')))
+    )
+    if leave.doctor_id:
+        unused = unused.filter(doctor_id=leave.doctor_id)
+    doctor_ids = set()
+    while True:
+        batch = list(unused.values_list('id', 'doctor_id')[:batch_size])
+        if not batch:
+            return doctor_ids
+        TimeSlot.objects.filter(id__in=[pk for pk, _ in batch]).delete()
+        doctor_ids.update(doctor_id for _, doctor_id in batch)
+
+
+def resolve_leave(leave, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Cancel or move the booked appointments on `leave`'s days, queue a
+    notification for each patient and mark the leave resolved. Returns
+    (moved, cancelled).
+    """
+    with transaction.atomic():
+        # Locked, so a patient cancelling meanwhile can't be counted twice
+        appointments = list(affected_appointments(leave).select_for_update().only(
+            'id', 'patient_id', 'doctor_id', 'schedule_id', 'date', 'start_time', 'status'
+        ))
+        moves = _plan_moves(leave, appointments) if leave.on_conflict == 'reschedule' and appointments else {}
+        names = {
+            user.id: user.get_full_name() or user.username
+            for user in CustomUser.objects.filter(id__in={a.doctor_id for a in appointments})
+        }
+        queue_notifications(
+            [_notification(a, names[a.doctor_id], leave, moves.get(a.id)) for a in appointments],
+            batch_size=batch_size,
+        )
+
+        _cancel([a for a in appointments if a.id not in moves], batch_size)
+        _move([a for a in appointments if a.id in moves], moves, batch_size)
+        touched = _drop_unused_slots(leave, batch_size) | set(names)
+
+        leave.resolved_at = timezone.now()
+        leave.save(update_fields=['resolved_at'])
+
+    for doctor_id in touched:
+        invalidate_doctor(doctor_id)
+    return len(moves), len(appointments) - len(moves)
+
+
+def resolve_pending_leaves(batch_size=DEFAULT_BATCH_SIZE):
+    """Resolve every leave not resolved yet, oldest first. Returns {leave: (moved, cancelled)}."""
+    pending = DoctorLeave.objects.filter(resolved_at__isnull=True).select_related('doctor').order_by('created_at', 'id')
+    return {leave: resolve_leave(leave, batch_size=batch_size) for leave in pending}
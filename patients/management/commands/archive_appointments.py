@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from patients.archive import ARCHIVE_AFTER_DAYS, DEFAULT_BATCH_SIZE, archivable_appointments, archive_closed_appointments
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed/cancelled appointments older than the cutoff, with their "
+        "diagnosis notes, prescriptions, visits and settled bills, into appointment history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=ARCHIVE_AFTER_DAYS,
+            help=f"Archive appointments dated more than this many days ago (default: {ARCHIVE_AFTER_DAYS}).",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Appointments moved per transaction (default: {DEFAULT_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help="Stop after archiving this many appointments.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only count what would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        if options['older_than_days'] < 0:
+            raise CommandError("--older-than-days cannot be negative.")
+
+        if options['dry_run']:
+            count = archivable_appointments(options['older_than_days']).count()
+            self.stdout.write(f"{count} appointment(s) would be archived.")
+            return
+
+        started = time.perf_counter()
+        archived = archive_closed_appointments(
+            options['older_than_days'],
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} appointment(s) in {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,148 @@
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from patients.models import Appointment, TimeSlot
+
+SLOTS_PER_DAY = 16
+SLOT_MINUTES = 30
+BATCH_SIZE = 2000
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _lists(doctor_id, patient_id, day):
+    """
+    The hot appointment lists, each as (read through the appointment's own
+    date columns, read through its time slot), first page only.
+    """
+    return {
+        "Admin: all appointments, newest first": (
+            Appointment.objects.select_related('patient', 'doctor').order_by('-date', '-start_time')[:10],
+            Appointment.objects.select_related('patient', 'doctor')
+            .order_by('-schedule__date', '-schedule__start_time')[:10],
+        ),
+        "Doctor: one day's appointments": (
+            Appointment.objects.filter(doctor_id=doctor_id, date=day)
+            .select_related('patient').order_by('start_time'),
+            Appointment.objects.filter(doctor_id=doctor_id, schedule__date=day)
+            .select_related('patient').order_by('schedule__start_time'),
+        ),
+        "Patient: upcoming appointments": (
+            Appointment.objects.filter(patient_id=patient_id, date__gte=day, status='booked')
+            .select_related('doctor').order_by('date', 'start_time')[:10],
+            Appointment.objects.filter(patient_id=patient_id, schedule__date__gte=day, status='booked')
+            .select_related('doctor').order_by('schedule__date', 'schedule__start_time')[:10],
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the appointment lists read through the appointment's own date and time "
+        "columns against the same lists joined to the time slot table, over synthetic "
+        "appointments that are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--appointments',
+            type=int,
+            default=100000,
+            help="Synthetic appointments to add (default: 100000).",
+        )
+        parser.add_argument(
+            '--doctors',
+            type=int,
+            default=50,
+            help="Synthetic doctors they are spread over (default: 50).",
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help="Runs per list and method; the median is reported (default: 20).",
+        )
+
+    def handle(self, *args, **options):
+        if options['appointments'] < 1 or options['doctors'] < 1 or options['repeat'] < 1:
+            raise CommandError("--appointments, --doctors and --repeat must be positive.")
+
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                doctor_id, patient_id, day = self.add_appointments(options['appointments'], options['doctors'])
+                self.stdout.write(
+                    f"Added {options['appointments']} appointments in {time.perf_counter() - started:.1f}s"
+                )
+                for description, (own, joined) in _lists(doctor_id, patient_id, day).items():
+                    own_time = self.time(own, options['repeat'])
+                    joined_time = self.time(joined, options['repeat'])
+                    self.stdout.write(
+                        f"  {description:<38} {own_time * 1000:8.2f} ms own columns  "
+                        f"{joined_time * 1000:8.2f} ms via time slot  ({joined_time / own_time:.1f}x)"
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def add_appointments(self, count, doctor_count):
+        """Synthetic doctors, patients, slots and appointments; returns one doctor, patient and busy day."""
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f'benchmark-doctor-{i}', role='doctor', password='!') for i in range(doctor_count)]
+            + [CustomUser(username=f'benchmark-patient-{i}', role='patient', password='!') for i in range(count // 20 + 1)]
+        )
+        doctors = list(
+            CustomUser.objects.filter(username__startswith='benchmark-doctor-').order_by('id').values_list('id', flat=True)
+        )
+        patients = list(
+            CustomUser.objects.filter(username__startswith='benchmark-patient-').order_by('id').values_list('id', flat=True)
+        )
+
+        # Spread evenly over days around today, SLOTS_PER_DAY per doctor
+        days = -(-count // (doctor_count * SLOTS_PER_DAY))
+        first_day = timezone.localdate() - timedelta(days=days // 2)
+        for offset in range(0, count, BATCH_SIZE):
+            slots = []
+            for i in range(offset, min(offset + BATCH_SIZE, count)):
+                day = first_day + timedelta(days=i // (doctor_count * SLOTS_PER_DAY))
+                start = datetime(2000, 1, 1, 9) + timedelta(minutes=SLOT_MINUTES * (i // doctor_count % SLOTS_PER_DAY))
+                slots.append(TimeSlot(
+                    doctor_id=doctors[i % doctor_count],
+                    date=day,
+                    start_time=start.time(),
+                    end_time=(start + timedelta(minutes=SLOT_MINUTES)).time(),
+                ))
+            TimeSlot.objects.bulk_create(slots)
+            # Not every backend returns primary keys from bulk_create
+            slots = TimeSlot.objects.filter(
+                doctor_id__in=doctors, date__range=(slots[0].date, slots[-1].date)
+            ).exclude(appointment__isnull=False).order_by('date', 'start_time', 'doctor_id')[:len(slots)]
+            Appointment.objects.bulk_create(
+                Appointment(
+                    patient_id=patients[(offset + n) % len(patients)],
+                    doctor_id=slot.doctor_id,
+                    schedule_id=slot.id,
+                    date=slot.date,
+                    start_time=slot.start_time,
+                    status='booked' if slot.date >= timezone.localdate() else 'completed',
+                )
+                for n, slot in enumerate(slots)
+            )
+        return doctors[0], patients[0], timezone.localdate()
+
+    def time(self, queryset, repeat):
+        list(queryset.all())  # warm connections and caches
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from patients.slots import BOOKING_HORIZON_DAYS, DEFAULT_BATCH_SIZE, collect_unused_slots, generate_slots
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-generate bookable time slots for the booking horizon and delete "
+        "past slots nobody booked. Meant to run nightly, after archive_appointments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horizon-days',
+            type=int,
+            default=BOOKING_HORIZON_DAYS,
+            help=f"Days ahead to generate slots for; 0 skips generation (default: {BOOKING_HORIZON_DAYS}).",
+        )
+        parser.add_argument(
+            '--no-gc',
+            action='store_true',
+            help="Don't delete unused past slots.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Rows per insert/delete batch (default: {DEFAULT_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        if options['horizon_days'] > 0:
+            started = time.perf_counter()
+            created = generate_slots(days=options['horizon_days'], batch_size=batch_size)
+            self.stdout.write(f"Generated {created} slot(s) in {time.perf_counter() - started:.2f}s.")
+
+        if not options['no_gc']:
+            started = time.perf_counter()
+            deleted = collect_unused_slots(batch_size=batch_size)
+            self.stdout.write(f"Deleted {deleted} unused past slot(s) in {time.perf_counter() - started:.2f}s.")
+
+        self.stdout.write(self.style.SUCCESS("Time slot maintenance complete."))
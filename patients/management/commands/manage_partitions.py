@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from patients.partitions import (
+    MONTHS_AHEAD,
+    PARTITIONED_TABLES,
+    RETENTION_MONTHS,
+    existing_partitions,
+    explain_partitions,
+    hot_queries,
+    is_supported,
+    roll_partitions,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Add upcoming monthly partitions to the time slot and billing tables and drop "
+        "expired ones. Meant to run nightly, after archive_appointments: a time slot month "
+        "is only dropped once no appointment points into it. MySQL only; a no-op on other databases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=MONTHS_AHEAD,
+            help=f"Months of partitions to keep ready past the current one (default: {MONTHS_AHEAD}).",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Print the ALTER TABLE statements without running them.",
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help="EXPLAIN the hot dashboard, booking and export queries and report the partitions each reads.",
+        )
+
+    def handle(self, *args, **options):
+        if not is_supported(connection):
+            self.stdout.write(f"Partitioning is MySQL only; nothing to do on {connection.vendor}.")
+            return
+        if options['months_ahead'] < 0:
+            raise CommandError("--months-ahead cannot be negative.")
+
+        statements = roll_partitions(
+            connection,
+            months_ahead=options['months_ahead'],
+            retention=RETENTION_MONTHS,
+            dry_run=options['dry_run'],
+        )
+        for sql in statements:
+            self.stdout.write(sql)
+        verb = "Would run" if options['dry_run'] else "Ran"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(statements)} partition change(s)."))
+
+        if options['explain']:
+            self.check_pruning()
+
+    def check_pruning(self):
+        """
+        EXPLAIN each hot query and report the partitions it reads. Fails if
+        one that filters on the partition column still reads all of them.
+        """
+        totals = {table: len(existing_partitions(table, connection)) for table in PARTITIONED_TABLES}
+        failures = 0
+        for description, (queryset, table, prunable) in hot_queries().items():
+            tables = explain_partitions(queryset, connection)
+            if table not in tables:
+                self.stdout.write(f"{description}: doesn't read {table}")
+                continue
+            read = tables[table]
+            if read is None:
+                self.stdout.write(self.style.WARNING(f"{description}: {table} is not partitioned"))
+                failures += 1
+            elif len(read) < totals[table]:
+                self.stdout.write(f"{description}: {len(read)}/{totals[table]} partitions ({', '.join(read)})")
+            elif prunable:
+                self.stdout.write(self.style.WARNING(f"{description}: no pruning, all {totals[table]} partitions read"))
+                failures += 1
+            else:
+                self.stdout.write(f"{description}: reads all {totals[table]} partitions (no partition column filter)")
+        if failures:
+            raise CommandError(f"{failures} hot quer{'y' if failures == 1 else 'ies'} not pruned.")
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from patients.payments import PaymentGatewayError
+from patients.reconciliation import reconcile_pending_bills, retry_unapplied_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify pending bills against the payment gateway and mark paid ones, "
+        "and retry recorded payments that didn't reach their bill. Run periodically (e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help="How far back to look for completed checkout sessions and unapplied payments (default: 2).",
+        )
+
+    def handle(self, *args, **options):
+        lookback = timedelta(days=options['days'])
+        # Local retries first; they need no gateway round trip
+        retried = retry_unapplied_events(since=timezone.now() - lookback)
+        try:
+            reconciled = reconcile_pending_bills(lookback=lookback)
+        except PaymentGatewayError as e:
+            raise CommandError(f"Payment gateway error: {e}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {reconciled} bill(s); applied {retried} earlier payment event(s)."
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from patients.leave import resolve_pending_leaves
+from patients.slots import DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancel or reschedule the booked appointments that fall on newly entered "
+        "leave and holidays, and queue a notification for each patient. Meant to "
+        "run every few minutes, before send_notifications."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Rows per update/insert batch (default: {DEFAULT_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        resolved = resolve_pending_leaves(batch_size=options['batch_size'])
+        for leave, (moved, cancelled) in resolved.items():
+            self.stdout.write(f"{leave}: moved {moved}, cancelled {cancelled} appointment(s)")
+        self.stdout.write(self.style.SUCCESS(f"Resolved {len(resolved)} leave period(s)."))
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0006_medicalvisit_delete_medicalhistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billing',
+            name='checkout_session_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='billing',
+            name='checkout_session_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='billing',
+            name='checkout_session_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='billing',
+            name='checkout_session_url',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
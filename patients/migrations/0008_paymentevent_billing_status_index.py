@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0007_billing_checkout_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('event_type', models.CharField(max_length=100)),
+                ('session_id', models.CharField(blank=True, max_length=255)),
+                ('applied', models.BooleanField(default=False)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Payment Event',
+                'verbose_name_plural': 'Payment Events',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(fields=['applied', 'received_at'], name='paymentevent_unapplied_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(fields=['status', 'due_date'], name='billing_status_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='paymentevent',
+            name='billing',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_events', to='patients.billing'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+from django.db.models import Q
+
+
+def sync_payment_state(apps, schema_editor):
+    """
+    Bills were marked paid either through is_paid (online payment) or
+    status (doctor edit). Treat either as paid and make both agree.
+    """
+    Billing = apps.get_model('patients', 'Billing')
+    Billing.objects.filter(Q(is_paid=True) | Q(status='paid')).update(is_paid=True, status='paid')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0008_paymentevent_billing_status_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(sync_payment_state, migrations.RunPython.noop),
+    ]
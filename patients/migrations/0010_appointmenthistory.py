@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0009_sync_billing_payment_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointment_id', models.PositiveBigIntegerField(unique=True)),
+                ('patient_id', models.PositiveBigIntegerField(db_index=True)),
+                ('doctor_id', models.PositiveBigIntegerField()),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('status', models.CharField(max_length=10)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Appointment History',
+                'verbose_name_plural': 'Appointment History',
+                'ordering': ['-date', '-start_time'],
+                'indexes': [models.Index(fields=['doctor_id', 'date'], name='apphistory_doctor_date_idx')],
+            },
+        ),
+    ]
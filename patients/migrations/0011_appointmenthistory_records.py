@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0010_appointmenthistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointmenthistory',
+            name='records',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='appointmenthistory',
+            name='patient_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name='appointmenthistory',
+            index=models.Index(fields=['patient_id', 'date'], name='apphistory_patient_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='billing',
+            name='history',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bills', to='patients.appointmenthistory'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:46
+
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Frozen copy of the DDL helpers in patients/partitions.py as of this
+# migration, which imports the live models; later changes there must not
+# change what this migration runs
+PARTITIONED_TABLES = {
+    'patients_timeslot': 'date',
+    'patients_billing': 'created_at',
+}
+MONTHS_AHEAD = 3
+
+
+def is_supported(connection):
+    return connection.vendor == 'mysql'
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _definition(month):
+    # Datetimes are stored in UTC, so month boundaries are UTC midnights
+    bound = add_months(month, 1)
+    return f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{bound.isoformat()}')"
+
+
+def partition_table(table, column, connection):
+    """Repartition an existing table by month, from its oldest row to MONTHS_AHEAD."""
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({qn(column)}) FROM {qn(table)}")
+        oldest = cursor.fetchone()[0]
+        today = datetime.now(dt_timezone.utc).date()
+        month = (oldest.date() if isinstance(oldest, datetime) else oldest or today).replace(day=1)
+        last = add_months(today.replace(day=1), MONTHS_AHEAD)
+        definitions = []
+        while month <= last:
+            definitions.append(_definition(month))
+            month = add_months(month, 1)
+        definitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} DROP PRIMARY KEY, ADD PRIMARY KEY ({qn('id')}, {qn(column)})"
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} PARTITION BY RANGE COLUMNS({qn(column)}) ({', '.join(definitions)})"
+        )
+
+
+def unpartition_table(table, column, connection):
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} REMOVE PARTITIONING")
+        cursor.execute(f"ALTER TABLE {qn(table)} DROP PRIMARY KEY, ADD PRIMARY KEY ({qn('id')})")
+
+
+def partition_tables(apps, schema_editor):
+    """Split the time slot and billing tables into monthly partitions (MySQL only)."""
+    if not is_supported(schema_editor.connection):
+        return
+    for table, column in PARTITIONED_TABLES.items():
+        partition_table(table, column, schema_editor.connection)
+
+
+def unpartition_tables(apps, schema_editor):
+    if not is_supported(schema_editor.connection):
+        return
+    for table, column in PARTITIONED_TABLES.items():
+        unpartition_table(table, column, schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('patients', '0011_appointmenthistory_records'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='schedule',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='patients.timeslot'),
+        ),
+        migrations.AlterField(
+            model_name='billing',
+            name='appointment',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='patients.appointment'),
+        ),
+        migrations.AlterField(
+            model_name='billing',
+            name='patient',
+            field=models.ForeignKey(db_constraint=False, limit_choices_to={'role': 'patient'}, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='paymentevent',
+            name='billing',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_events', to='patients.billing'),
+        ),
+        migrations.AlterField(
+            model_name='timeslot',
+            name='doctor',
+            field=models.ForeignKey(db_constraint=False, limit_choices_to={'role': 'doctor'}, on_delete=django.db.models.deletion.CASCADE, related_name='time_slots', to=settings.AUTH_USER_MODEL),
+        ),
+        # After the foreign keys are gone: MySQL can't partition tables that have any
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:02
+
+from django.db import migrations, models, transaction
+from django.db.models import OuterRef, Subquery
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def backfill_appointment_times(apps, schema_editor):
+    """
+    Copy each appointment's slot date and start time onto it, one id range
+    per transaction so a large table isn't locked for the whole backfill.
+    """
+    Appointment = apps.get_model('patients', 'Appointment')
+    TimeSlot = apps.get_model('patients', 'TimeSlot')
+    db = schema_editor.connection.alias
+
+    pending = Appointment.objects.using(db).filter(date__isnull=True)
+    bounds = pending.aggregate(low=models.Min('id'), high=models.Max('id'))
+    if bounds['low'] is None:
+        return
+    slot = TimeSlot.objects.using(db).filter(id=OuterRef('schedule_id'))
+    for start in range(bounds['low'], bounds['high'] + 1, BACKFILL_CHUNK_SIZE):
+        with transaction.atomic(using=db):
+            pending.filter(id__gte=start, id__lt=start + BACKFILL_CHUNK_SIZE).update(
+                date=Subquery(slot.values('date')[:1]),
+                start_time=Subquery(slot.values('start_time')[:1]),
+            )
+
+
+class Migration(migrations.Migration):
+    # Each backfill chunk commits on its own
+    atomic = False
+
+    dependencies = [
+        ('patients', '0012_partition_timeslot_billing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='start_time',
+            field=models.TimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_appointment_times, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointment',
+            name='date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='start_time',
+            field=models.TimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'date', 'start_time'], name='appointment_doctor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'date', 'start_time'], name='appointment_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'start_time'], name='appointment_date_idx'),
+        ),
+    ]
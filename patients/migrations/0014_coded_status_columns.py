@@ -0,0 +1,152 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:10
+
+from django.db import migrations, models, transaction
+from django.db.models import Q
+
+import patients.fields
+
+BACKFILL_CHUNK_SIZE = 5000
+
+APPOINTMENT_STATUS_CODES = {'booked': 1, 'cancelled': 2, 'completed': 3}
+BILLING_STATUS_CODES = {'pending': 1, 'paid': 2, 'cancelled': 3}
+APPOINTMENT_STATUS_CHOICES = [('booked', 'Booked'), ('cancelled', 'Cancelled'), ('completed', 'Completed')]
+BILLING_STATUS_CHOICES = [('pending', 'Pending'), ('paid', 'Paid'), ('cancelled', 'Cancelled')]
+
+# (model, codes, default for rows whose old status is not a known code)
+TABLES = [
+    ('Appointment', APPOINTMENT_STATUS_CODES, 'booked'),
+    ('AppointmentHistory', APPOINTMENT_STATUS_CODES, 'booked'),
+    ('Billing', BILLING_STATUS_CODES, 'pending'),
+]
+
+
+def _chunks(queryset):
+    bounds = queryset.aggregate(low=models.Min('id'), high=models.Max('id'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, BACKFILL_CHUNK_SIZE):
+        yield queryset.filter(id__gte=start, id__lt=start + BACKFILL_CHUNK_SIZE)
+
+
+def copy_status_codes(apps, schema_editor):
+    """
+    Copy each string status into the new integer column, one id range per
+    transaction. A bill is paid if either the old status or is_paid said so,
+    as in 0009.
+    """
+    db = schema_editor.connection.alias
+    for model_name, codes, default in TABLES:
+        model = apps.get_model('patients', model_name)
+        for chunk in _chunks(model.objects.using(db).all()):
+            with transaction.atomic(using=db):
+                for code in codes:
+                    chunk.filter(status=code).update(status_code=code)
+                if model_name == 'Billing':
+                    chunk.filter(Q(is_paid=True) | Q(status='paid')).update(status_code='paid')
+                chunk.filter(status_code__isnull=True).update(status_code=default)
+
+
+def copy_status_names(apps, schema_editor):
+    db = schema_editor.connection.alias
+    for model_name, codes, default in TABLES:
+        model = apps.get_model('patients', model_name)
+        for chunk in _chunks(model.objects.using(db).all()):
+            with transaction.atomic(using=db):
+                for code in codes:
+                    chunk.filter(status_code=code).update(status=code)
+                if model_name == 'Billing':
+                    chunk.filter(status_code='paid').update(is_paid=True)
+
+
+class Migration(migrations.Migration):
+    # Each backfill chunk commits on its own
+    atomic = False
+
+    dependencies = [
+        ('patients', '0013_appointment_date_start_time'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='billing',
+            name='billing_status_due_idx',
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='status_code',
+            field=patients.fields.CodedStatusField(choices=APPOINTMENT_STATUS_CHOICES, codes=APPOINTMENT_STATUS_CODES, null=True),
+        ),
+        migrations.AddField(
+            model_name='appointmenthistory',
+            name='status_code',
+            field=patients.fields.CodedStatusField(choices=APPOINTMENT_STATUS_CHOICES, codes=APPOINTMENT_STATUS_CODES, null=True),
+        ),
+        migrations.AddField(
+            model_name='billing',
+            name='status_code',
+            field=patients.fields.CodedStatusField(choices=BILLING_STATUS_CHOICES, codes=BILLING_STATUS_CODES, null=True),
+        ),
+        migrations.RunPython(copy_status_codes, copy_status_names),
+        migrations.RemoveField(
+            model_name='appointment',
+            name='status',
+        ),
+        migrations.RemoveField(
+            model_name='appointmenthistory',
+            name='status',
+        ),
+        migrations.RemoveField(
+            model_name='billing',
+            name='status',
+        ),
+        migrations.RemoveField(
+            model_name='billing',
+            name='is_paid',
+        ),
+        migrations.RenameField(
+            model_name='appointment',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.RenameField(
+            model_name='appointmenthistory',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.RenameField(
+            model_name='billing',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='status',
+            field=patients.fields.CodedStatusField(choices=APPOINTMENT_STATUS_CHOICES, codes=APPOINTMENT_STATUS_CODES, default='booked'),
+        ),
+        migrations.AlterField(
+            model_name='appointmenthistory',
+            name='status',
+            field=patients.fields.CodedStatusField(choices=APPOINTMENT_STATUS_CHOICES, codes=APPOINTMENT_STATUS_CODES),
+        ),
+        migrations.AlterField(
+            model_name='billing',
+            name='status',
+            field=patients.fields.CodedStatusField(choices=BILLING_STATUS_CHOICES, codes=BILLING_STATUS_CODES, default='pending'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'status'], name='appointment_patient_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'date'], name='appointment_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(fields=['status', 'due_date'], name='billing_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(fields=['patient', 'status'], name='billing_patient_status_idx'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def count_appointments(apps, schema_editor):
+    """Fill both counter tables from one grouped pass over the appointments."""
+    Appointment = apps.get_model('patients', 'Appointment')
+    DoctorDayStats = apps.get_model('patients', 'DoctorDayStats')
+    DoctorStats = apps.get_model('patients', 'DoctorStats')
+    db = schema_editor.connection.alias
+
+    rows = (
+        Appointment.objects.using(db).order_by('doctor_id', 'date')
+        .values('doctor_id', 'date', 'status').annotate(n=Count('id'))
+    )
+    doctors = {}
+    batch, current = [], None
+    for row in rows.iterator():
+        key = (row['doctor_id'], row['date'])
+        if current is None or (current.doctor_id, current.date) != key:
+            current = DoctorDayStats(doctor_id=key[0], date=key[1])
+            batch.append(current)
+            if len(batch) > BATCH_SIZE:
+                DoctorDayStats.objects.using(db).bulk_create(batch[:-1])
+                batch = batch[-1:]
+        setattr(current, row['status'], row['n'])
+        totals = doctors.setdefault(row['doctor_id'], DoctorStats(doctor_id=row['doctor_id']))
+        setattr(totals, row['status'], getattr(totals, row['status']) + row['n'])
+    DoctorDayStats.objects.using(db).bulk_create(batch)
+    DoctorStats.objects.using(db).bulk_create(doctors.values(), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_rolecount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('patients', '0014_coded_status_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorStats',
+            fields=[
+                ('doctor', models.OneToOneField(limit_choices_to={'role': 'doctor'}, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='appointment_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('booked', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Doctor Stats',
+                'verbose_name_plural': 'Doctor Stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='DoctorDayStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booked', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('doctor', models.ForeignKey(limit_choices_to={'role': 'doctor'}, on_delete=django.db.models.deletion.CASCADE, related_name='day_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Doctor Day Stats',
+                'verbose_name_plural': 'Doctor Day Stats',
+                'indexes': [models.Index(fields=['date'], name='doctordaystats_date_idx')],
+                'unique_together': {('doctor', 'date')},
+            },
+        ),
+        migrations.RunPython(count_appointments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:21
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def link_doctors_and_patients(apps, schema_editor):
+    """One link per doctor and patient with an appointment, live or archived, counting completed visits."""
+    Appointment = apps.get_model('patients', 'Appointment')
+    AppointmentHistory = apps.get_model('patients', 'AppointmentHistory')
+    DoctorPatient = apps.get_model('patients', 'DoctorPatient')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    db = schema_editor.connection.alias
+
+    users = User.objects.using(db).values('id')
+    sources = [
+        Appointment.objects.using(db).all(),
+        AppointmentHistory.objects.using(db).filter(doctor_id__in=users, patient_id__in=users),
+    ]
+    completed = Q(status='completed')
+    links = {}
+    for appointments in sources:
+        rows = appointments.order_by().values('doctor_id', 'patient_id').annotate(
+            first=Min('date', filter=completed),
+            last=Max('date', filter=completed),
+            n=Count('id', filter=completed),
+        )
+        for row in rows.iterator():
+            key = (row['doctor_id'], row['patient_id'])
+            link = links.setdefault(key, DoctorPatient(doctor_id=key[0], patient_id=key[1]))
+            link.visit_count += row['n']
+            if row['first'] and (link.first_visit is None or row['first'] < link.first_visit):
+                link.first_visit = row['first']
+            if row['last'] and (link.last_visit is None or row['last'] > link.last_visit):
+                link.last_visit = row['last']
+    DoctorPatient.objects.using(db).bulk_create(links.values(), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('patients', '0015_doctor_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorPatient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_visit', models.DateField(blank=True, null=True)),
+                ('last_visit', models.DateField(blank=True, null=True)),
+                ('visit_count', models.IntegerField(default=0)),
+                ('doctor', models.ForeignKey(limit_choices_to={'role': 'doctor'}, on_delete=django.db.models.deletion.CASCADE, related_name='patient_links', to=settings.AUTH_USER_MODEL)),
+                ('patient', models.ForeignKey(limit_choices_to={'role': 'patient'}, on_delete=django.db.models.deletion.CASCADE, related_name='doctor_links', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Doctor Patient',
+                'verbose_name_plural': 'Doctor Patients',
+                'indexes': [models.Index(fields=['doctor', 'last_visit'], name='doctorpatient_recent_idx')],
+                'unique_together': {('doctor', 'patient')},
+            },
+        ),
+        migrations.RunPython(link_doctors_and_patients, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0016_doctorpatient'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicalvisit',
+            index=models.Index(fields=['patient', 'created_at'], name='medicalvisit_patient_time_idx'),
+        ),
+    ]
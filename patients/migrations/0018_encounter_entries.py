@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import patients.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('doctors', '0014_patient_timeline_indexes'),
+        ('patients', '0017_patient_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EncounterEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', patients.fields.CodedStatusField(choices=[('visit', 'Visit'), ('diagnosis', 'Diagnosis Note'), ('treatment', 'Treatment')], codes={'diagnosis': 2, 'treatment': 3, 'visit': 1})),
+                ('diagnosis', models.CharField(blank=True, max_length=255)),
+                ('notes', models.TextField(blank=True)),
+                ('symptoms', models.TextField(blank=True, null=True)),
+                ('medications_prescribed', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='encounter_entries', to='patients.appointment')),
+                ('doctor', models.ForeignKey(limit_choices_to={'role': 'doctor'}, on_delete=django.db.models.deletion.CASCADE, related_name='recorded_entries', to=settings.AUTH_USER_MODEL)),
+                ('patient', models.ForeignKey(limit_choices_to={'role': 'patient'}, on_delete=django.db.models.deletion.CASCADE, related_name='encounter_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Encounter Entry',
+                'verbose_name_plural': 'Encounter Entries',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['patient', 'created_at'], name='encounter_patient_time_idx')],
+            },
+        ),
+    ]
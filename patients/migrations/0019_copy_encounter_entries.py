@@ -0,0 +1,99 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:20
+
+from django.db import migrations, models, transaction
+
+CHUNK_SIZE = 5000
+
+# (app, model, kind, {entry field: source field})
+SOURCES = [
+    ('patients', 'MedicalVisit', 'visit', {
+        'appointment_id': 'appointment_id',
+        'diagnosis': 'diagnosis',
+        'notes': 'notes',
+        'symptoms': 'symptoms',
+        'medications_prescribed': 'medications_prescribed',
+    }),
+    ('doctors', 'DiagnosisNote', 'diagnosis', {'appointment_id': 'appointment_id', 'notes': 'note'}),
+    ('doctors', 'Treatment', 'treatment', {'notes': 'treatment_details'}),
+]
+
+
+def _chunks(queryset):
+    bounds = queryset.aggregate(low=models.Min('id'), high=models.Max('id'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, CHUNK_SIZE):
+        yield queryset.filter(id__gte=start, id__lt=start + CHUNK_SIZE)
+
+
+def _uncopied(model, EncounterEntry, kind, db):
+    """
+    Source rows not yet in EncounterEntry. Chunks commit in id order, so a
+    run that stopped part way copied the lowest ids; skip that many.
+    """
+    queryset = model.objects.using(db).all()
+    copied = EncounterEntry.objects.using(db).filter(kind=kind).count()
+    if copied:
+        last_id = queryset.order_by('id').values_list('id', flat=True)[copied - 1]
+        queryset = queryset.filter(id__gt=last_id)
+    return queryset
+
+
+def merge_entries(apps, schema_editor):
+    """
+    Copy visits, diagnosis notes and treatments into EncounterEntry, one id
+    range per transaction. Safe to re-run after an interrupted copy.
+    """
+    EncounterEntry = apps.get_model('patients', 'EncounterEntry')
+    db = schema_editor.connection.alias
+    for app_label, model_name, kind, fields in SOURCES:
+        model = apps.get_model(app_label, model_name)
+        for chunk in _chunks(_uncopied(model, EncounterEntry, kind, db)):
+            with transaction.atomic(using=db):
+                EncounterEntry.objects.using(db).bulk_create([
+                    EncounterEntry(
+                        patient_id=row.patient_id,
+                        doctor_id=row.doctor_id,
+                        kind=kind,
+                        created_at=row.created_at,
+                        **{entry_field: getattr(row, field) for entry_field, field in fields.items()},
+                    )
+                    for row in chunk.order_by('id')
+                ])
+
+
+def split_entries(apps, schema_editor):
+    EncounterEntry = apps.get_model('patients', 'EncounterEntry')
+    db = schema_editor.connection.alias
+    for app_label, model_name, kind, fields in SOURCES:
+        model = apps.get_model(app_label, model_name)
+        # Keep the entries' timestamps rather than stamping the copies now
+        model._meta.get_field('created_at').auto_now_add = False
+        for chunk in _chunks(EncounterEntry.objects.using(db).filter(kind=kind)):
+            with transaction.atomic(using=db):
+                model.objects.using(db).bulk_create([
+                    model(
+                        patient_id=entry.patient_id,
+                        doctor_id=entry.doctor_id,
+                        created_at=entry.created_at,
+                        **{field: getattr(entry, entry_field) for entry_field, field in fields.items()},
+                    )
+                    for entry in chunk.order_by('id')
+                ])
+
+
+class Migration(migrations.Migration):
+    # Each copy chunk commits on its own; a failed run resumes where it stopped
+    atomic = False
+
+    dependencies = [
+        ('doctors', '0014_patient_timeline_indexes'),
+        ('patients', '0018_encounter_entries'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_entries, split_entries),
+        migrations.DeleteModel(
+            name='MedicalVisit',
+        ),
+    ]
@@ -1,18 +1,30 @@
 from django.db import models
+from django.db.models import DEFERRED
 from django.conf import settings
 from django.utils import timezone
 
+from .fields import CodedStatusField
+
+# Stored numbers of each status code; append new codes, never renumber
+APPOINTMENT_STATUS_CODES = {'booked': 1, 'cancelled': 2, 'completed': 3}
+BILLING_STATUS_CODES = {'pending': 1, 'paid': 2, 'cancelled': 3}
+ENCOUNTER_KIND_CODES = {'visit': 1, 'diagnosis': 2, 'treatment': 3}
+
 
 class TimeSlot(models.Model):
     """
     Represents a specific time slot on a given date for a doctor.
     Used for appointment booking.
+
+    Partitioned by month on `date` in MySQL (see patients/partitions.py),
+    so its relations carry no database-level foreign keys.
     """
     doctor = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         limit_choices_to={'role': 'doctor'},
-        related_name='time_slots'
+        related_name='time_slots',
+        db_constraint=False
     )
     date = models.DateField()
     start_time = models.TimeField()
@@ -41,61 +53,253 @@ class Appointment(models.Model):
         related_name='doctor_appointments',
         limit_choices_to={'role': 'doctor'}
     )
-    schedule = models.ForeignKey(TimeSlot, on_delete=models.CASCADE)
+    schedule = models.ForeignKey(TimeSlot, on_delete=models.CASCADE, db_constraint=False)
     symptoms = models.TextField(blank=True, null=True)
     STATUS_CHOICES = [
         ('booked', 'Booked'),
         ('cancelled', 'Cancelled'),
         ('completed', 'Completed'),
     ]
-    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='booked')
+    status = CodedStatusField(codes=APPOINTMENT_STATUS_CODES, choices=STATUS_CHOICES, default='booked')
+    # States that keep the slot taken, for free-slot lists and calendars
+    OCCUPYING_STATUSES = ('booked', 'completed')
     created_at = models.DateTimeField(default=timezone.now)
 
+    # Copies of the time slot's date and start time, so appointment lists
+    # filter and sort without joining TimeSlot. Filled in on save; edits to
+    # a slot are pushed down by a signal (see patients/signals.py).
+    date = models.DateField(editable=False)
+    start_time = models.TimeField(editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['doctor', 'date', 'start_time'], name='appointment_doctor_date_idx'),
+            models.Index(fields=['patient', 'date', 'start_time'], name='appointment_patient_date_idx'),
+            models.Index(fields=['date', 'start_time'], name='appointment_date_idx'),
+            # Per-status counts and the archive sweep
+            models.Index(fields=['patient', 'status'], name='appointment_patient_status_idx'),
+            models.Index(fields=['status', 'date'], name='appointment_status_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Appointment: {self.patient.get_full_name()} with Dr. {self.doctor.get_full_name()} on {self.date} at {self.start_time}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the day counters hold this appointment under, so
+        # they can follow a change of doctor, day or status
+        loaded = dict(zip(field_names, values))
+        key = (loaded.get('doctor_id', DEFERRED), loaded.get('date', DEFERRED), loaded.get('status', DEFERRED))
+        if DEFERRED not in key:
+            instance._counted = key
+        # ...and which doctor's calendar shows it
+        if loaded.get('doctor_id', DEFERRED) is not DEFERRED:
+            instance._loaded_doctor_id = loaded['doctor_id']
+        return instance
+
+    def counter_key(self):
+        return (self.doctor_id, self.date, self.status)
+
+    def save(self, *args, **kwargs):
+        # Assign `schedule` rather than `schedule_id` when moving an
+        # appointment, so the copied columns follow without a query
+        if self.date is None or Appointment.schedule.is_cached(self):
+            self.date = self.schedule.date
+            self.start_time = self.schedule.start_time
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'schedule' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'date', 'start_time'}
+        super().save(*args, **kwargs)
+
+
+class AppointmentHistory(models.Model):
+    """
+    Cold-storage record of an archived appointment and its time slot
+    (see patients/archive.py). Ids are kept as plain integers so rows
+    survive user deletion.
+    """
+    appointment_id = models.PositiveBigIntegerField(unique=True)
+    patient_id = models.PositiveBigIntegerField()
+    doctor_id = models.PositiveBigIntegerField()
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    status = CodedStatusField(codes=APPOINTMENT_STATUS_CODES, choices=Appointment.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    # Snapshot of the notes, prescriptions, visits and treatments archived with it
+    records = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['-date', '-start_time']
+        indexes = [
+            models.Index(fields=['doctor_id', 'date'], name='apphistory_doctor_date_idx'),
+            models.Index(fields=['patient_id', 'date'], name='apphistory_patient_date_idx'),
+        ]
+        verbose_name = "Appointment History"
+        verbose_name_plural = "Appointment History"
+
+    def __str__(self):
+        return f"Archived appointment {self.appointment_id} on {self.date} {self.start_time} ({self.status})"
+
+
+class DoctorDayStats(models.Model):
+    """
+    Appointments per doctor and day, by status, kept in step as
+    appointments are booked, moved, cancelled and completed (see
+    patients/counters.py). Dashboard counts read these rows instead of
+    counting appointments.
+    """
+    doctor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role': 'doctor'},
+        related_name='day_stats'
+    )
+    date = models.DateField()
+    # One column per Appointment status code
+    booked = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('doctor', 'date')
+        indexes = [
+            models.Index(fields=['date'], name='doctordaystats_date_idx'),
+        ]
+        verbose_name = "Doctor Day Stats"
+        verbose_name_plural = "Doctor Day Stats"
+
+    def __str__(self):
+        return f"{self.doctor_id} on {self.date}: {self.booked} booked, {self.completed} completed, {self.cancelled} cancelled"
+
+
+class DoctorStats(models.Model):
+    """All-time appointments per doctor, by status: the sum of its DoctorDayStats rows."""
+    doctor = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        limit_choices_to={'role': 'doctor'},
+        related_name='appointment_stats'
+    )
+    booked = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Doctor Stats"
+        verbose_name_plural = "Doctor Stats"
+
+    def __str__(self):
+        return f"{self.doctor_id}: {self.booked} booked, {self.completed} completed, {self.cancelled} cancelled"
+
+
+class DoctorPatient(models.Model):
+    """
+    A doctor and a patient who have had an appointment together, with the
+    first and last completed visit and the number of completed visits.
+    Linked on booking and updated on completion (see patients/counters.py);
+    archiving an appointment keeps its visit here.
+    """
+    doctor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role': 'doctor'},
+        related_name='patient_links'
+    )
+    patient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role': 'patient'},
+        related_name='doctor_links'
+    )
+    first_visit = models.DateField(null=True, blank=True)
+    last_visit = models.DateField(null=True, blank=True)
+    visit_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('doctor', 'patient')
+        indexes = [
+            models.Index(fields=['doctor', 'last_visit'], name='doctorpatient_recent_idx'),
+        ]
+        verbose_name = "Doctor Patient"
+        verbose_name_plural = "Doctor Patients"
+
     def __str__(self):
-        return f"Appointment: {self.patient.get_full_name()} with Dr. {self.doctor.get_full_name()} on {self.schedule.date} at {self.schedule.start_time}"
+        return f"{self.doctor_id} - {self.patient_id}: {self.visit_count} visit(s), last {self.last_visit}"
 
 
-class MedicalVisit(models.Model):
+class EncounterEntry(models.Model):
+    """
+    One clinical record of a patient: a visit record, a diagnosis note or a
+    treatment, told apart by `kind`. They share one table, so an
+    appointment's records are one range scan on its appointment index and a
+    patient's history one scan on (patient, created_at).
+    """
     patient = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-        limit_choices_to={'role': 'patient'}
+        limit_choices_to={'role': 'patient'},
+        related_name='encounter_entries'
     )
     doctor = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         limit_choices_to={'role': 'doctor'},
-        related_name='visit_notes'
+        related_name='recorded_entries'
     )
     appointment = models.ForeignKey(
         'Appointment',
         on_delete=models.SET_NULL,
         null=True,
-        blank=True
+        blank=True,
+        related_name='encounter_entries'
     )
-    diagnosis = models.CharField(max_length=255)  # e.g., "Viral Fever"
+    KIND_CHOICES = [
+        ('visit', 'Visit'),
+        ('diagnosis', 'Diagnosis Note'),
+        ('treatment', 'Treatment'),
+    ]
+    kind = CodedStatusField(codes=ENCOUNTER_KIND_CODES, choices=KIND_CHOICES)
+    diagnosis = models.CharField(max_length=255, blank=True)  # Visits: e.g., "Viral Fever"
+    # The note, treatment details or visit notes
+    notes = models.TextField(blank=True)
     symptoms = models.TextField(blank=True, null=True)
     medications_prescribed = models.TextField(blank=True)  # Optional summary
-    notes = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self):
-        return f"{self.diagnosis} - {self.patient.get_full_name()} - {self.created_at.date()}"
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ['-created_at']
-        verbose_name = "Medical Visit"
-        verbose_name_plural = "Medical Visits"
+        indexes = [
+            models.Index(fields=['patient', 'created_at'], name='encounter_patient_time_idx'),
+        ]
+        verbose_name = "Encounter Entry"
+        verbose_name_plural = "Encounter Entries"
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for patient {self.patient_id} on {self.created_at.date()}"
 
 class Billing(models.Model):
+    # Partitioned by month on created_at in MySQL (see patients/partitions.py),
+    # so its relations carry no database-level foreign keys
+
+    # Allowed status changes; status is the only record of payment
+    ALLOWED_TRANSITIONS = {
+        'pending': {'paid', 'cancelled'},
+        'cancelled': {'pending', 'paid'},
+        'paid': {'pending'},  # manual correction / refund
+    }
+
     patient = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-        limit_choices_to={'role': 'patient'}
+        limit_choices_to={'role': 'patient'},
+        db_constraint=False
     )
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField()
-    is_paid = models.BooleanField(default=False)
     due_date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -104,10 +308,20 @@ class Billing(models.Model):
         'Appointment',
         on_delete=models.SET_NULL,
         null=True,
-        blank=True
+        blank=True,
+        db_constraint=False
     )
-    status = models.CharField(
-        max_length=50,
+    # Set, and `appointment` cleared, when the appointment is archived
+    history = models.ForeignKey(
+        'AppointmentHistory',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bills',
+        db_constraint=False
+    )
+    status = CodedStatusField(
+        codes=BILLING_STATUS_CODES,
         default='pending',
         choices=[
             ('pending', 'Pending'),
@@ -116,6 +330,74 @@ class Billing(models.Model):
         ]
     )
 
+    # Last checkout session created for this bill, reused on re-clicks
+    checkout_session_id = models.CharField(max_length=255, blank=True, null=True)
+    checkout_session_url = models.TextField(blank=True, null=True)
+    checkout_session_amount = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    checkout_session_expires_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Revenue and "today's bills" aggregates filter on status first
+            models.Index(fields=['status', 'due_date'], name='billing_status_due_idx'),
+            models.Index(fields=['patient', 'status'], name='billing_patient_status_idx'),
+        ]
+
     def __str__(self):
         status = "Paid" if self.is_paid else "Unpaid"
-        return f"Billing for {self.patient.get_full_name()} - {status} - Amount: ₹{self.amount}"
\ No newline at end of file
+        return f"Billing for {self.patient.get_full_name()} - {status} - Amount: ₹{self.amount}"
+
+    @property
+    def is_paid(self):
+        # Kept for templates and callers written against the old column
+        return self.status == 'paid'
+
+    def can_transition_to(self, status):
+        return status in self.ALLOWED_TRANSITIONS.get(self.status, set())
+
+    def transition_to(self, status):
+        """
+        Move the bill to a new status in a single conditional UPDATE.
+
+        The row is only changed if it is still in a state that allows the
+        transition, so concurrent webhook deliveries and manual edits can't
+        apply a transition from a stale state. Returns True if the row changed.
+        """
+        sources = [src for src, targets in self.ALLOWED_TRANSITIONS.items() if status in targets]
+        updated = Billing.objects.filter(id=self.id, status__in=sources).update(status=status)
+        if updated:
+            self.status = status
+        return updated > 0
+
+
+class PaymentEvent(models.Model):
+    """
+    A gateway event that has been applied to a bill.
+    The unique event id makes re-delivered events no-ops.
+    """
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    billing = models.ForeignKey(
+        Billing,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='payment_events',
+        db_constraint=False
+    )
+    # Set when the event carried a paid session for its bill, so an event
+    # that couldn't be applied on arrival can be retried
+    session_id = models.CharField(max_length=255, blank=True)
+    applied = models.BooleanField(default=False)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-received_at']
+        verbose_name = "Payment Event"
+        verbose_name_plural = "Payment Events"
+        indexes = [
+            models.Index(fields=['applied', 'received_at'], name='paymentevent_unapplied_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} ({self.event_id})"
@@ -0,0 +1,267 @@
+# patients/partitions.py
+"""
+Monthly RANGE partitioning of the time slot and billing tables (MySQL only).
+
+Each table is split on a date column into one partition per month, named
+pYYYYMM and holding rows before the first of the following month, plus a
+catch-all `pmax`. roll_partitions() splits upcoming months out of `pmax`
+ahead of time and drops months that fell out of the retention window,
+but never one that rows elsewhere still reference (a time slot month
+stays until archiving has moved every appointment in it).
+
+MySQL requires the partition column in every unique key, so the primary
+keys become (id, <column>), and it doesn't allow foreign keys on
+partitioned tables, so the relations to and from these tables are
+enforced by the ORM only (db_constraint=False). On other backends
+(SQLite in development and tests) everything here is a no-op.
+"""
+import logging
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection as default_connection
+
+from .models import Appointment, Billing, TimeSlot
+
+logger = logging.getLogger(__name__)
+
+# Table -> partition column
+PARTITIONED_TABLES = {
+    'patients_timeslot': 'date',
+    'patients_billing': 'created_at',
+}
+
+MAXVALUE_PARTITION = 'pmax'
+
+# Empty monthly partitions kept ready past the current month
+MONTHS_AHEAD = getattr(settings, 'PARTITION_MONTHS_AHEAD', 3)
+
+# Months kept per table before a partition is dropped; None keeps everything.
+# Bills are financial records and are never dropped by default.
+RETENTION_MONTHS = getattr(settings, 'PARTITION_RETENTION_MONTHS', {
+    'patients_timeslot': 24,
+    'patients_billing': None,
+})
+
+
+def is_supported(connection=default_connection):
+    return connection.vendor == 'mysql'
+
+
+# -----------------------------
+# Month arithmetic
+# -----------------------------
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def partition_month(name):
+    """The month a pYYYYMM partition holds, or None for pmax and others."""
+    try:
+        return datetime.strptime(name, 'p%Y%m').date()
+    except ValueError:
+        return None
+
+
+def _definition(month):
+    # Datetimes are stored in UTC, so month boundaries are UTC midnights
+    bound = add_months(month, 1)
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{bound.isoformat()}')"
+
+
+def _maxvalue_definition():
+    return f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)"
+
+
+def _months(first, last):
+    month = first
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def _utc_today():
+    return datetime.now(dt_timezone.utc).date()
+
+
+# -----------------------------
+# Introspection
+# -----------------------------
+def existing_partitions(table, connection=default_connection):
+    """Partition names of a table in order; empty if it isn't partitioned."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION",
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def explain_partitions(queryset, connection=default_connection):
+    """
+    Run EXPLAIN for a queryset and return {table alias: partitions read}.
+    A value of None means the table isn't partitioned.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN {sql}", params)
+        columns = [col[0] for col in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return {
+        row['table']: row['partitions'].split(',') if row.get('partitions') else None
+        for row in rows
+    }
+
+
+def hot_queries(today=None):
+    """
+    Hot querysets that read a partitioned table, keyed by description, as
+    (queryset, table, prunable). The dashboard and export ones are built by
+    the same helpers the views use. Queries marked not prunable filter on
+    something other than the partition column (a bill's due date or status,
+    a slot's id), so MySQL has to look in every partition; they are listed
+    so that stays visible, not because it can be fixed here.
+    """
+    from admins.exports import build_queryset
+    from admins.views import _paid_bills, _todays_appointments, _todays_bills
+
+    today = today or _utc_today()
+    return {
+        "Booking: a doctor's slot on a day": (
+            TimeSlot.objects.filter(doctor_id=0, date=today, start_time=time(9)), 'patients_timeslot', True,
+        ),
+        "Slot generation: existing slots in the coming weeks": (
+            TimeSlot.objects.filter(date__range=(today, today + timedelta(days=27))), 'patients_timeslot', True,
+        ),
+        "Bills export: this month": (
+            build_queryset('bills', date_from=month_start(today)), 'patients_billing', True,
+        ),
+        "Admin dashboard: today's appointments": (
+            _todays_appointments(), 'patients_timeslot', True,
+        ),
+        "Admin dashboard: bills due today": (_todays_bills(), 'patients_billing', False),
+        "Admin dashboard: total revenue": (_paid_bills(), 'patients_billing', False),
+        "Appointment detail: its time slot": (
+            Appointment.objects.select_related('schedule').filter(id=0), 'patients_timeslot', False,
+        ),
+    }
+
+
+# -----------------------------
+# Partitioning
+# -----------------------------
+# Migration 0012 partitioned the tables with a frozen copy of these two.
+def partition_table(table, column, connection=default_connection, months_ahead=MONTHS_AHEAD):
+    """Repartition an existing table by month, from its oldest row to months_ahead."""
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({qn(column)}) FROM {qn(table)}")
+        oldest = cursor.fetchone()[0]
+        today = _utc_today()
+        first = month_start(oldest.date() if isinstance(oldest, datetime) else oldest or today)
+        definitions = [_definition(m) for m in _months(first, add_months(month_start(today), months_ahead))]
+        definitions.append(_maxvalue_definition())
+
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} DROP PRIMARY KEY, ADD PRIMARY KEY ({qn('id')}, {qn(column)})"
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} PARTITION BY RANGE COLUMNS({qn(column)}) ({', '.join(definitions)})"
+        )
+
+
+def unpartition_table(table, column, connection=default_connection):
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} REMOVE PARTITIONING")
+        cursor.execute(f"ALTER TABLE {qn(table)} DROP PRIMARY KEY, ADD PRIMARY KEY ({qn('id')})")
+
+
+# -----------------------------
+# Maintenance
+# -----------------------------
+def _still_needed(table, before):
+    """Whether rows older than `before` are still referenced and must be kept."""
+    if table == 'patients_timeslot':
+        # Appointments not yet archived still point at their slots, and with
+        # no foreign key constraint nothing else stops the drop. Checked on the
+        # reference itself too, in case an appointment's copied date is stale
+        return (
+            Appointment.objects.filter(date__lt=before).exists()
+            or Appointment.objects.filter(schedule__date__lt=before).exists()
+        )
+    if table == 'patients_billing':
+        boundary = datetime.combine(before, time.min, tzinfo=dt_timezone.utc)
+        return Billing.objects.filter(created_at__lt=boundary, status='pending').exists()
+    return False
+
+
+def plan_partitions(table, connection=default_connection, months_ahead=MONTHS_AHEAD, retention_months=None):
+    """
+    The ALTER TABLE statements that bring a partitioned table up to date:
+    one splitting new months out of pmax, and one dropping expired months.
+    """
+    partitions = existing_partitions(table, connection)
+    months = sorted(m for m in map(partition_month, partitions) if m)
+    if not months:
+        return []
+
+    qn = connection.ops.quote_name
+    statements = []
+    today = month_start(_utc_today())
+
+    missing = list(_months(add_months(months[-1], 1), add_months(today, months_ahead)))
+    if missing:
+        definitions = [_definition(m) for m in missing] + [_maxvalue_definition()]
+        statements.append(
+            f"ALTER TABLE {qn(table)} REORGANIZE PARTITION {MAXVALUE_PARTITION} INTO ({', '.join(definitions)})"
+        )
+
+    if retention_months is not None:
+        cutoff = add_months(today, -retention_months)
+        expired = []
+        # Oldest first, stopping at the first month still in use; the newest
+        # monthly partition always stays
+        for month in months[:-1]:
+            bound = add_months(month, 1)
+            if bound > cutoff:
+                break
+            if _still_needed(table, bound):
+                logger.warning("Keeping %s.%s: rows are still referenced.", table, partition_name(month))
+                break
+            expired.append(partition_name(month))
+        if expired:
+            statements.append(f"ALTER TABLE {qn(table)} DROP PARTITION {', '.join(expired)}")
+
+    return statements
+
+
+def roll_partitions(connection=default_connection, months_ahead=MONTHS_AHEAD, retention=None, dry_run=False):
+    """
+    Add upcoming monthly partitions and drop expired ones on every
+    partitioned table. Returns the statements run (or planned, for a dry run).
+    """
+    if not is_supported(connection):
+        return []
+    retention = RETENTION_MONTHS if retention is None else retention
+
+    statements = []
+    for table in PARTITIONED_TABLES:
+        planned = plan_partitions(table, connection, months_ahead, retention.get(table))
+        if not dry_run:
+            with connection.cursor() as cursor:
+                for sql in planned:
+                    cursor.execute(sql)
+        statements.extend(planned)
+    return statements
@@ -0,0 +1,174 @@
+# patients/payments.py
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import stripe
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Billing
+
+
+# -----------------------------
+# Gateway Client
+# -----------------------------
+# One shared client per process: bounded connect/read timeouts so a slow
+# gateway can't pin a worker, and a pooled requests session so repeated
+# calls reuse the same TLS connection.
+stripe.api_key = settings.STRIPE_SECRET_KEY
+stripe.max_network_retries = getattr(settings, 'STRIPE_MAX_NETWORK_RETRIES', 2)
+stripe.default_http_client = stripe.RequestsClient(
+    timeout=getattr(settings, 'STRIPE_TIMEOUT', (3.05, 10))
+)
+
+# Point the client at a local fake gateway (e.g. stripe-mock) when configured.
+if getattr(settings, 'STRIPE_API_BASE', ''):
+    stripe.api_base = settings.STRIPE_API_BASE
+
+# Checkout sessions live for this long; between 30 minutes and 12 hours.
+CHECKOUT_SESSION_TTL = getattr(settings, 'CHECKOUT_SESSION_TTL', 3600)
+
+# The gateway refuses an expires_at less than 30 minutes or more than 24 hours
+# out. A session expires between one and two windows ahead, so one window is
+# at least the minimum and at most half of the maximum.
+MIN_CHECKOUT_SESSION_TTL = 30 * 60
+MAX_CHECKOUT_SESSION_TTL = 12 * 3600
+
+# Don't hand out a cached session that is about to expire under the patient.
+REUSE_MARGIN = timedelta(minutes=5)
+
+
+class PaymentGatewayError(Exception):
+    """Raised when the payment gateway cannot be reached or rejects a request."""
+
+
+def _amount_in_paise(billing):
+    return int(billing.amount * 100)
+
+
+def _checkout_window():
+    """
+    Current idempotency window and the matching session expiry.
+
+    Both values are derived from the clock bucket so that a retried request
+    sends byte-identical parameters, which the gateway requires for an
+    idempotent replay. The expiry always falls after the window closes.
+    """
+    ttl = max(MIN_CHECKOUT_SESSION_TTL, min(CHECKOUT_SESSION_TTL, MAX_CHECKOUT_SESSION_TTL))
+    bucket = int(time.time()) // ttl
+    expires_at = (bucket + 2) * ttl
+    return bucket, expires_at
+
+
+def idempotency_key_for(billing, bucket):
+    """One key per billing row, amount and window."""
+    return f"checkout-billing-{billing.id}-{_amount_in_paise(billing)}-{bucket}"
+
+
+def _cached_session_url(billing):
+    """Return the stored checkout URL if it can still be used for this bill."""
+    if not billing.checkout_session_id or not billing.checkout_session_url:
+        return None
+    if billing.checkout_session_amount != billing.amount:
+        return None
+    if not billing.checkout_session_expires_at:
+        return None
+    if billing.checkout_session_expires_at <= timezone.now() + REUSE_MARGIN:
+        return None
+    return billing.checkout_session_url
+
+
+def get_or_create_checkout_session(billing, success_url, cancel_url):
+    """
+    Return a checkout URL for the bill, creating a gateway session only
+    when no reusable one is stored on the row.
+    """
+    cached_url = _cached_session_url(billing)
+    if cached_url:
+        return cached_url
+
+    bucket, expires_at = _checkout_window()
+    try:
+        session = stripe.checkout.Session.create(
+            payment_method_types=['card'],
+            line_items=[{
+                'price_data': {
+                    'currency': 'inr',
+                    'product_data': {
+                        'name': f"Medical Bill #{billing.id}",
+                        'description': billing.description,
+                    },
+                    'unit_amount': _amount_in_paise(billing),  # in paise
+                },
+                'quantity': 1,
+            }],
+            mode='payment',
+            client_reference_id=str(billing.id),
+            metadata={'billing_id': str(billing.id)},
+            expires_at=expires_at,
+            success_url=success_url,
+            cancel_url=cancel_url,
+            idempotency_key=idempotency_key_for(billing, bucket),
+        )
+    except stripe.StripeError as e:
+        raise PaymentGatewayError(str(e)) from e
+
+    Billing.objects.filter(id=billing.id).update(
+        checkout_session_id=session.id,
+        checkout_session_url=session.url,
+        checkout_session_amount=billing.amount,
+        checkout_session_expires_at=datetime.fromtimestamp(expires_at, tz=dt_timezone.utc),
+    )
+    return session.url
+
+
+def session_is_paid(session, billing_id):
+    return (
+        getattr(session, 'payment_status', None) == 'paid'
+        and str(getattr(session, 'client_reference_id', None)) == str(billing_id)
+    )
+
+
+def verify_checkout_session(billing):
+    """
+    Ask the gateway whether the bill's stored checkout session has been paid,
+    and record the payment if so. Returns True if the bill is paid.
+    """
+    if billing.is_paid:
+        return True
+    if not billing.checkout_session_id:
+        return False
+    try:
+        session = stripe.checkout.Session.retrieve(billing.checkout_session_id)
+    except stripe.StripeError as e:
+        raise PaymentGatewayError(str(e)) from e
+
+    if not session_is_paid(session, billing.id):
+        return False
+    billing.transition_to('paid')
+    return True
+
+
+def construct_webhook_event(payload, signature):
+    """Verify the gateway signature and return the parsed event."""
+    return stripe.Webhook.construct_event(
+        payload, signature, settings.STRIPE_WEBHOOK_SECRET
+    )
+
+
+def iter_paid_sessions(created_since):
+    """
+    Yield completed checkout sessions created after the given datetime,
+    fetched a page (100 sessions) per gateway round trip.
+    """
+    try:
+        sessions = stripe.checkout.Session.list(
+            status='complete',
+            created={'gte': int(created_since.timestamp())},
+            limit=100,
+        )
+        for session in sessions.auto_paging_iter():
+            if getattr(session, 'payment_status', None) == 'paid':
+                yield session
+    except stripe.StripeError as e:
+        raise PaymentGatewayError(str(e)) from e
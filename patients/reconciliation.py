@@ -0,0 +1,98 @@
+# patients/reconciliation.py
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Billing, PaymentEvent
+from .payments import iter_paid_sessions, session_is_paid
+
+# Gateway events that mean the checkout session has been paid
+PAID_EVENT_TYPES = (
+    'checkout.session.completed',
+    'checkout.session.async_payment_succeeded',
+)
+
+
+def _apply(event, billing):
+    """
+    Move the event's bill to 'paid'. The event counts as applied once the
+    bill is paid, whether this event or an earlier path paid it. Returns
+    True if the bill changed state.
+    """
+    changed = billing.transition_to('paid')
+    event.applied = changed or Billing.objects.filter(id=billing.id, status='paid').exists()
+    event.save(update_fields=['applied'])
+    return changed
+
+
+def _apply_paid_session(event_id, event_type, session):
+    """
+    Record a paid session exactly once and move its bill to 'paid'.
+    Returns True if the bill changed state.
+    """
+    billing_id = getattr(session, 'client_reference_id', None)
+    billing = Billing.objects.filter(id=billing_id).first() if billing_id else None
+    paid = billing is not None and session_is_paid(session, billing.id)
+
+    with transaction.atomic():
+        event, created = PaymentEvent.objects.get_or_create(
+            event_id=event_id,
+            defaults={'event_type': event_type, 'billing': billing, 'session_id': session.id if paid else ''},
+        )
+        if not created or not paid:
+            return False  # Already ingested, or nothing to apply
+        return _apply(event, billing)
+
+
+def ingest_event(event):
+    """Apply a verified gateway webhook event idempotently."""
+    if event.type not in PAID_EVENT_TYPES:
+        return False
+    return _apply_paid_session(event.id, event.type, event.data.object)
+
+
+def reconcile_pending_bills(lookback=timedelta(days=2)):
+    """
+    Batch-verify pending bills against the gateway.
+
+    Rather than one lookup per bill, page through every completed session in
+    the lookback window and match them to pending bills in memory. Returns
+    the number of bills moved to 'paid'.
+    """
+    pending_ids = set(
+        Billing.objects.filter(status='pending')
+        .exclude(checkout_session_id__isnull=True)
+        .values_list('id', flat=True)
+    )
+    if not pending_ids:
+        return 0
+
+    reconciled = 0
+    for session in iter_paid_sessions(timezone.now() - lookback):
+        billing_id = getattr(session, 'client_reference_id', None)
+        if not billing_id or not billing_id.isdigit() or int(billing_id) not in pending_ids:
+            continue
+        if _apply_paid_session(f"reconcile:{session.id}", 'reconcile.session_paid', session):
+            reconciled += 1
+    return reconciled
+
+
+def retry_unapplied_events(since):
+    """
+    Apply again the paid-session events received since `since` that didn't
+    reach their bill on arrival (e.g. the transition lost a race). Returns
+    the number of bills moved to 'paid'.
+    """
+    events = (
+        PaymentEvent.objects.filter(applied=False, received_at__gte=since, billing__isnull=False)
+        .exclude(session_id='')
+        .select_related('billing')
+    )
+    retried = 0
+    for event in events.iterator():
+        if event.billing is None:
+            continue  # The bill is gone
+        with transaction.atomic():
+            retried += _apply(event, event.billing)
+    return retried
@@ -0,0 +1,65 @@
+# patients/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from doctors.models import DoctorAvailability, DoctorLeave
+
+from .calendar import invalidate_all, invalidate_doctor
+from .counters import count_appointment, count_visit, link_patient, move_appointment
+from .models import Appointment, TimeSlot
+
+
+@receiver([post_save, post_delete], sender=DoctorAvailability)
+@receiver([post_save, post_delete], sender=TimeSlot)
+@receiver([post_save, post_delete], sender=Appointment)
+def invalidate_calendar(sender, instance, **kwargs):
+    invalidate_doctor(instance.doctor_id)
+    # An appointment handed to another doctor leaves the old calendar too
+    previous = getattr(instance, '_loaded_doctor_id', None)
+    if previous is not None and previous != instance.doctor_id:
+        invalidate_doctor(previous)
+    if sender is Appointment:
+        instance._loaded_doctor_id = instance.doctor_id
+
+
+@receiver([post_save, post_delete], sender=DoctorLeave)
+def invalidate_leave_calendar(sender, instance, **kwargs):
+    if instance.doctor_id:
+        invalidate_doctor(instance.doctor_id)
+    else:
+        invalidate_all()
+
+
+@receiver(post_save, sender=TimeSlot)
+def sync_appointment_times(sender, instance, created, **kwargs):
+    """Keep the date/start_time copied onto appointments in step with their slot."""
+    if created:
+        return
+    moved = Appointment.objects.filter(schedule_id=instance.id).exclude(
+        date=instance.date, start_time=instance.start_time
+    )
+    for appointment in moved:
+        # Saved one by one so the day counters follow the new date
+        appointment.schedule = instance
+        appointment.save(update_fields=['schedule'])
+
+
+@receiver(post_save, sender=Appointment)
+def count_saved_appointment(sender, instance, created, **kwargs):
+    current = instance.counter_key()
+    previous = getattr(instance, '_counted', None)
+    if created:
+        count_appointment(current, 1)
+        link_patient(instance.doctor_id, instance.patient_id)
+    elif previous:
+        move_appointment(previous, current)
+    # An instance never loaded from the database has nothing to move from;
+    # the nightly reconcile settles it, as it does visits un-completed later
+    if instance.status == 'completed' and (created or (previous and previous[2] != 'completed')):
+        count_visit(instance.doctor_id, instance.patient_id, instance.date)
+    instance._counted = current
+
+
+@receiver(post_delete, sender=Appointment)
+def count_deleted_appointment(sender, instance, **kwargs):
+    count_appointment(getattr(instance, '_counted', instance.counter_key()), -1)
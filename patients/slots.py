@@ -0,0 +1,100 @@
+# patients/slots.py
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from doctors.models import DoctorAvailability
+from .availability import SLOT_LENGTH, leave_calendar, on_leave, slot_starts, windows_on
+from .calendar import invalidate_doctor
+from .models import Appointment, TimeSlot
+
+BOOKING_HORIZON_DAYS = getattr(settings, 'SLOT_BOOKING_HORIZON_DAYS', 30)
+DEFAULT_BATCH_SIZE = 1000
+
+
+# -----------------------------
+# Pre-generation
+# -----------------------------
+def generate_slots(start_date=None, days=BOOKING_HORIZON_DAYS, doctor_ids=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Create the bookable slots for every doctor's weekly availability over
+    the next `days` days. Slots that already exist (by doctor, date and
+    start time) are left alone, so this is safe to rerun. Returns the
+    number of slots created.
+    """
+    start_date = start_date or timezone.localdate()
+    end_date = start_date + timedelta(days=days - 1)
+
+    windows = defaultdict(list)  # (doctor_id, day_of_week) -> [(start, end)]
+    availabilities = DoctorAvailability.objects.values_list('doctor_id', 'day_of_week', 'start_time', 'end_time')
+    if doctor_ids is not None:
+        availabilities = availabilities.filter(doctor_id__in=doctor_ids)
+    for doctor_id, day_of_week, start_time, end_time in availabilities:
+        windows[(doctor_id, day_of_week)].append((start_time, end_time))
+
+    # Days off get no slots
+    off = leave_calendar(start_date, end_date, doctor_ids)
+
+    existing = TimeSlot.objects.filter(date__range=(start_date, end_date))
+    if doctor_ids is not None:
+        existing = existing.filter(doctor_id__in=doctor_ids)
+    existing = set(existing.values_list('doctor_id', 'date', 'start_time'))
+
+    created = 0
+    touched = set()
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        day_code = day.strftime('%a').lower()
+        slots = []
+        for (doctor_id, day_of_week), day_windows in windows.items():
+            if day_of_week != day_code or on_leave(off, doctor_id, day):
+                continue
+            # Overlapping windows are merged first, so their slots never overlap
+            merged = windows_on(day, day_windows)
+            missing = [
+                TimeSlot(doctor_id=doctor_id, date=day, start_time=start.time(), end_time=(start + SLOT_LENGTH).time())
+                for start in slot_starts(merged, merged)
+                if (doctor_id, day, start.time()) not in existing
+            ]
+            if not missing:
+                continue
+            slots.extend(missing)
+            created += len(missing)
+            touched.add(doctor_id)
+        if slots:
+            # Conflicts are slots created by bookings in the meantime
+            TimeSlot.objects.bulk_create(slots, batch_size=batch_size, ignore_conflicts=True)
+
+    # Bulk inserts don't send signals
+    for doctor_id in touched:
+        invalidate_doctor(doctor_id)
+    return created
+
+
+# -----------------------------
+# Garbage Collection
+# -----------------------------
+def collect_unused_slots(before=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Delete past slots no appointment points at (never booked, or left
+    behind by an edit), one batch per transaction. Returns the count.
+    """
+    before = before or timezone.localdate()
+    unused = TimeSlot.objects.filter(date__lt=before).exclude(
+        Exists(Appointment.objects.filter(schedule_id=OuterRef('pk')))
+    )
+    deleted = 0
+    while True:
+        batch = list(unused.values_list('id', 'doctor_id')[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            TimeSlot.objects.filter(id__in=[pk for pk, _ in batch]).delete()
+        deleted += len(batch)
+        for doctor_id in {doctor_id for _, doctor_id in batch}:
+            invalidate_doctor(doctor_id)
+    return deleted
@@ -1,3 +1,423 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+import stripe
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser, Notification
+from doctors.models import DoctorAvailability, DoctorLeave
+
+from . import payments
+from .archive import AppointmentPages, _archive_batch, archive_closed_appointments
+from .availability import SLOT_LENGTH, covers, day_code, merge, slot_starts, subtract
+from .calendar import _count_slots, week_start
+from .counters import reconcile_doctor_days
+from .leave import CANCELLED_SUBJECT, RESCHEDULED_SUBJECT, _free_slots, resolve_leave
+from .models import Appointment, AppointmentHistory, Billing, PaymentEvent, TimeSlot
+from .reconciliation import retry_unapplied_events
+from .slots import generate_slots
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+class FakeGateway(stripe.HTTPClient):
+    """
+    Local stand-in for the Stripe API: keeps checkout sessions in memory and
+    replays the stored response for a repeated idempotency key, as Stripe does.
+    """
+    name = 'fake'
+
+    def __init__(self):
+        super().__init__()
+        self.sessions = {}
+        self.replies = {}  # idempotency key -> response body
+        self.created = 0
+
+    def request(self, method, url, headers, post_data=None, **kwargs):
+        path = urlsplit(url).path
+        if method == 'post' and path == '/v1/checkout/sessions':
+            key = (headers or {}).get('Idempotency-Key')
+            if key not in self.replies:
+                self.created += 1
+                params = parse_qs(post_data or '')
+                session = {
+                    'id': f"cs_test_{self.created}",
+                    'object': 'checkout.session',
+                    'url': f"https://checkout.test/cs_test_{self.created}",
+                    'status': 'open',
+                    'payment_status': 'unpaid',
+                    'client_reference_id': params['client_reference_id'][0],
+                }
+                self.sessions[session['id']] = session
+                self.replies[key] = json.dumps(session)
+            return self.replies[key], 200, {}
+        if method == 'get' and path.startswith('/v1/checkout/sessions/'):
+            session = self.sessions.get(path.rsplit('/', 1)[1])
+            if session:
+                return json.dumps(session), 200, {}
+        return json.dumps({'error': {'message': 'No such resource'}}), 404, {}
+
+    def close(self):
+        pass
+
+
+def signed(payload, secret=WEBHOOK_SECRET):
+    """Stripe-Signature header for a webhook payload."""
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+class PaymentTestCase(TestCase):
+    def setUp(self):
+        self.gateway = FakeGateway()
+        patcher = mock.patch.object(stripe, 'default_http_client', self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.patient = CustomUser.objects.create_user(username='patient', password='x', role='patient')
+        self.bill = Billing.objects.create(
+            patient=self.patient, amount=Decimal('250.00'), description='Consultation', due_date=date.today()
+        )
+
+    def checkout(self):
+        return payments.get_or_create_checkout_session(
+            self.bill, success_url='https://hospital.test/ok', cancel_url='https://hospital.test/cancel'
+        )
+
+
+# -----------------------------
+# Checkout Sessions
+# -----------------------------
+class CheckoutSessionTests(PaymentTestCase):
+    def test_stored_session_is_reused(self):
+        first = self.checkout()
+        self.bill.refresh_from_db()
+        second = self.checkout()
+        self.assertEqual(first, second)
+        self.assertEqual(self.gateway.created, 1)
+
+    def test_retry_replays_the_same_gateway_session(self):
+        first = self.checkout()
+        # The session was created but never stored, e.g. the worker died before the UPDATE
+        Billing.objects.filter(id=self.bill.id).update(checkout_session_id=None, checkout_session_url=None)
+        self.bill.refresh_from_db()
+        second = self.checkout()
+        self.assertEqual(first, second)
+        self.assertEqual(self.gateway.created, 1)
+
+    def test_changed_amount_gets_a_new_session(self):
+        self.checkout()
+        self.bill.refresh_from_db()
+        self.bill.amount = Decimal('300.00')
+        self.checkout()
+        self.assertEqual(self.gateway.created, 2)
+
+    def test_expiry_stays_within_gateway_limit(self):
+        for ttl in (60, 600, 1800, 3600, 12 * 3600, 20 * 3600):
+            with mock.patch.object(payments, 'CHECKOUT_SESSION_TTL', ttl):
+                bucket, expires_at = payments._checkout_window()
+            ahead = expires_at - time.time()
+            self.assertGreaterEqual(ahead, 30 * 60)
+            self.assertLessEqual(ahead, 24 * 3600)
+
+
+# -----------------------------
+# Webhooks
+# -----------------------------
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class WebhookTests(PaymentTestCase):
+    def event(self, event_id='evt_1'):
+        return json.dumps({
+            'id': event_id,
+            'object': 'event',
+            'type': 'checkout.session.completed',
+            'data': {'object': {
+                'id': 'cs_test_1',
+                'object': 'checkout.session',
+                'payment_status': 'paid',
+                'client_reference_id': str(self.bill.id),
+            }},
+        })
+
+    def deliver(self, payload, signature):
+        return self.client.post(
+            reverse('patients:stripe_webhook'), payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=signature,
+        )
+
+    def test_bad_signature_is_rejected(self):
+        payload = self.event()
+        response = self.deliver(payload, signed(payload, secret='whsec_other'))
+        self.assertEqual(response.status_code, 400)
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, 'pending')
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_signed_event_marks_the_bill_paid(self):
+        payload = self.event()
+        self.assertEqual(self.deliver(payload, signed(payload)).status_code, 200)
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, 'paid')
+
+    def test_duplicate_delivery_is_applied_once(self):
+        payload = self.event()
+        self.assertEqual(self.deliver(payload, signed(payload)).status_code, 200)
+        # Corrected by hand in between; a re-delivery must not pay the bill again
+        Billing.objects.filter(id=self.bill.id).update(status='pending')
+        self.assertEqual(self.deliver(payload, signed(payload)).status_code, 200)
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, 'pending')
+        self.assertEqual(PaymentEvent.objects.filter(event_id='evt_1').count(), 1)
+        self.assertTrue(PaymentEvent.objects.get(event_id='evt_1').applied)
+
+    def test_event_that_lost_a_race_is_retried(self):
+        payload = self.event()
+        with mock.patch.object(Billing, 'transition_to', return_value=False):
+            self.assertEqual(self.deliver(payload, signed(payload)).status_code, 200)
+        event = PaymentEvent.objects.get(event_id='evt_1')
+        self.assertFalse(event.applied)
+
+        self.assertEqual(retry_unapplied_events(since=event.received_at - timedelta(minutes=1)), 1)
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, 'paid')
+        self.assertTrue(PaymentEvent.objects.get(event_id='evt_1').applied)
+
+
+# -----------------------------
+# Archive
+# -----------------------------
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(username='doctor', password='x', role='doctor')
+        self.patient = CustomUser.objects.create_user(username='patient', password='x', role='patient')
+
+    def appointment(self, days_ago, amount=Decimal('100.00')):
+        day = date.today() - timedelta(days=days_ago)
+        slot = TimeSlot.objects.create(doctor=self.doctor, date=day, start_time=dt_time(9), end_time=dt_time(9, 30))
+        appointment = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, schedule=slot, status='completed'
+        )
+        Billing.objects.create(
+            patient=self.patient, appointment=appointment, amount=amount, description='Visit',
+            status='paid', due_date=day,
+        )
+        return appointment
+
+    def test_bills_stay_live_on_the_history_row(self):
+        appointment = self.appointment(days_ago=400)
+        self.assertEqual(archive_closed_appointments(), 1)
+        bill = Billing.objects.get()
+        self.assertIsNone(bill.appointment_id)
+        self.assertEqual(bill.history.appointment_id, appointment.id)
+        self.assertEqual(bill.history.doctor_id, self.doctor.id)
+
+    def test_batch_rechecks_candidates_under_lock(self):
+        kept = self.appointment(days_ago=400)
+        archived = self.appointment(days_ago=401)
+        # Listed as a candidate, then its bill reopened before the batch ran
+        Billing.objects.filter(appointment=kept).update(status='pending')
+        self.assertEqual(_archive_batch([kept.id, archived.id]), 1)
+        self.assertTrue(Appointment.objects.filter(id=kept.id).exists())
+        self.assertEqual(list(AppointmentHistory.objects.values_list('appointment_id', flat=True)), [archived.id])
+
+    def test_pages_merge_both_tiers_newest_first(self):
+        for days_ago in (5, 400, 20, 500, 30, 600):
+            self.appointment(days_ago)
+        archive_closed_appointments()
+        self.assertEqual(AppointmentHistory.objects.count(), 3)
+
+        pages = AppointmentPages(Appointment.objects.filter(patient=self.patient), self.patient)
+        self.assertEqual(len(pages), 6)
+        days = [(date.today() - a.date).days for a in pages[0:6]]
+        self.assertEqual(days, [5, 20, 30, 400, 500, 600])
+        page = pages[2:4]
+        self.assertEqual([(date.today() - a.date).days for a in page], [30, 400])
+        self.assertTrue(page[1].is_archived)
+        self.assertEqual([b.amount for b in page[1].bills], [Decimal('100.00')])
+
+
+# -----------------------------
+# Availability
+# -----------------------------
+class IntervalModelTests(SimpleTestCase):
+    """
+    merge/subtract/slot_starts against a brute-force model that represents
+    every interval list as the set of minutes it covers.
+    """
+    DAY = datetime(2026, 1, 5)
+    ROUNDS = 2000
+
+    def interval(self, start, end):
+        return (self.DAY + timedelta(minutes=start), self.DAY + timedelta(minutes=end))
+
+    def minute(self, moment):
+        return int((moment - self.DAY).total_seconds() // 60)
+
+    def minutes(self, intervals):
+        covered = set()
+        for start, end in intervals:
+            covered.update(range(self.minute(start), self.minute(end)))
+        return covered
+
+    def random_intervals(self, rng):
+        # Coarse endpoints, so touching, nested and empty intervals all turn up
+        intervals = []
+        for _ in range(rng.randint(0, 6)):
+            start = rng.randrange(0, 600, rng.choice((1, 15, 30)))
+            intervals.append(self.interval(start, start + rng.randrange(0, 240, 15)))
+        return intervals
+
+    def assertMerged(self, intervals):
+        for start, end in intervals:
+            self.assertLess(start, end)
+        for (_, end), (start, _) in zip(intervals, intervals[1:]):
+            # Apart, not touching: touching intervals are joined
+            self.assertLess(end, start)
+
+    def test_against_minute_model(self):
+        rng = random.Random(49)
+        length = self.minute(self.DAY + SLOT_LENGTH)
+        for _ in range(self.ROUNDS):
+            windows, blocked = self.random_intervals(rng), self.random_intervals(rng)
+
+            merged = merge(windows)
+            self.assertMerged(merged)
+            self.assertEqual(self.minutes(merged), self.minutes(windows))
+
+            free = subtract(merged, merge(blocked))
+            self.assertMerged(free)
+            self.assertEqual(self.minutes(free), self.minutes(windows) - self.minutes(blocked))
+
+            open_minutes = self.minutes(free)
+            expected = []
+            for start, end in merged:
+                # Slots on each window's own grid, kept when every minute is free
+                for offset in range(self.minute(start), self.minute(end) - length + 1, length):
+                    if set(range(offset, offset + length)) <= open_minutes:
+                        expected.append(self.DAY + timedelta(minutes=offset))
+            starts = slot_starts(merged, free)
+            self.assertEqual(starts, expected)
+            self.assertTrue(all(covers(free, start) for start in starts))
+
+
+class FreeSlotTests(TestCase):
+    def test_completed_appointments_keep_their_slot(self):
+        doctor = CustomUser.objects.create_user(username='doctor', password='x', role='doctor')
+        patient = CustomUser.objects.create_user(username='patient', password='x', role='patient')
+        day = date.today() + timedelta(days=7)
+        DoctorAvailability.objects.create(doctor=doctor, day_of_week=day_code(day), start_time=dt_time(9), end_time=dt_time(10))
+        # Seen early and marked completed ahead of its slot
+        slot = TimeSlot.objects.create(doctor=doctor, date=day, start_time=dt_time(9), end_time=dt_time(9, 30))
+        Appointment.objects.create(patient=patient, doctor=doctor, schedule=slot, status='completed')
+
+        self.client.force_login(patient)
+        response = self.client.get(
+            reverse('patients:get_available_time_slots'), {'doctor_id': doctor.id, 'date': day.isoformat()}
+        )
+        self.assertEqual(response.json()['available_slots'], ['09:30'])
+        self.assertEqual(_free_slots([doctor.id], day, day)[doctor.id], [datetime.combine(day, dt_time(9, 30))])
+        counts = _count_slots([doctor.id], week_start(day))[doctor.id][day.isoformat()]
+        self.assertEqual(counts, {'booked': 1, 'free': 1})
+
+
+class CalendarInvalidationTests(TestCase):
+    def test_reassigned_appointment_invalidates_both_doctors(self):
+        first = CustomUser.objects.create_user(username='first', password='x', role='doctor')
+        second = CustomUser.objects.create_user(username='second', password='x', role='doctor')
+        patient = CustomUser.objects.create_user(username='patient', password='x', role='patient')
+        day = date.today() + timedelta(days=7)
+        slot = TimeSlot.objects.create(doctor=first, date=day, start_time=dt_time(9), end_time=dt_time(9, 30))
+        appointment = Appointment.objects.create(patient=patient, doctor=first, schedule=slot)
+
+        appointment = Appointment.objects.get(pk=appointment.pk)
+        appointment.doctor = second
+        with mock.patch('patients.signals.invalidate_doctor') as invalidate_doctor:
+            appointment.save()
+        self.assertEqual({call.args[0] for call in invalidate_doctor.call_args_list}, {first.id, second.id})
+
+
+class SlotGenerationTests(TestCase):
+    def test_fills_gaps_beside_slots_outside_the_windows(self):
+        doctor = CustomUser.objects.create_user(username='doctor', password='x', role='doctor')
+        day = date.today() + timedelta(days=7)
+        DoctorAvailability.objects.create(doctor=doctor, day_of_week=day_code(day), start_time=dt_time(9), end_time=dt_time(10))
+        TimeSlot.objects.create(doctor=doctor, date=day, start_time=dt_time(9), end_time=dt_time(9, 30))
+        # Left behind when the availability window moved: as many slots as
+        # the day should have, but 09:30 is still missing
+        TimeSlot.objects.create(doctor=doctor, date=day, start_time=dt_time(14), end_time=dt_time(14, 30))
+
+        self.assertEqual(generate_slots(start_date=day, days=1), 1)
+        self.assertEqual(
+            sorted(TimeSlot.objects.filter(doctor=doctor, date=day).values_list('start_time', flat=True)),
+            [dt_time(9), dt_time(9, 30), dt_time(14)],
+        )
+        self.assertEqual(generate_slots(start_date=day, days=1), 0)
+
+
+# -----------------------------
+# Leave
+# -----------------------------
+class LeaveTests(TestCase):
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(
+            username='doctor', password='x', role='doctor', first_name='Ada', last_name='Lee'
+        )
+        self.patient = CustomUser.objects.create_user(
+            username='patient', password='x', role='patient', email='patient@example.com'
+        )
+        # Two slots a day, every day
+        for code, _ in DoctorAvailability.DAYS_OF_WEEK:
+            DoctorAvailability.objects.create(doctor=self.doctor, day_of_week=code, start_time=dt_time(9), end_time=dt_time(10))
+        self.day = date.today() + timedelta(days=3)
+        self.first = self.book(self.day, dt_time(9))
+        self.second = self.book(self.day, dt_time(9, 30))
+        # The day after the leave already has its 09:00 taken
+        self.book(self.day + timedelta(days=1), dt_time(9))
+
+    def book(self, day, start):
+        end = (datetime.combine(day, start) + SLOT_LENGTH).time()
+        slot = TimeSlot.objects.create(doctor=self.doctor, date=day, start_time=start, end_time=end)
+        return Appointment.objects.create(patient=self.patient, doctor=self.doctor, schedule=slot)
+
+    def leave(self, on_conflict):
+        return DoctorLeave.objects.create(doctor=self.doctor, start_date=self.day, end_date=self.day, on_conflict=on_conflict)
+
+    def test_reschedule_moves_into_the_next_free_slots(self):
+        leave = self.leave('reschedule')
+        self.assertEqual(resolve_leave(leave), (2, 0))
+
+        first = Appointment.objects.select_related('schedule').get(id=self.first.id)
+        second = Appointment.objects.select_related('schedule').get(id=self.second.id)
+        self.assertEqual((first.status, first.date, first.start_time), ('booked', self.day + timedelta(days=1), dt_time(9, 30)))
+        self.assertEqual((second.status, second.date, second.start_time), ('booked', self.day + timedelta(days=2), dt_time(9)))
+        for appointment in (first, second):
+            self.assertEqual((appointment.schedule.date, appointment.schedule.start_time), (appointment.date, appointment.start_time))
+        self.assertEqual(reconcile_doctor_days(dry_run=True), {})
+
+        notifications = list(Notification.objects.order_by('id'))
+        self.assertEqual([(n.user_id, n.subject) for n in notifications], [(self.patient.id, RESCHEDULED_SUBJECT)] * 2)
+        self.assertIn(f"moved to {first.date:%d %b %Y} at 09:30", notifications[0].message)
+        leave.refresh_from_db()
+        self.assertIsNotNone(leave.resolved_at)
+
+    def test_cancel_cancels_and_notifies(self):
+        leave = self.leave('cancel')
+        self.assertEqual(resolve_leave(leave), (0, 2))
+
+        for appointment in Appointment.objects.filter(id__in=[self.first.id, self.second.id]):
+            self.assertEqual((appointment.status, appointment.date), ('cancelled', self.day))
+        self.assertEqual(reconcile_doctor_days(dry_run=True), {})
+        self.assertEqual(
+            list(Notification.objects.values_list('user_id', 'subject')), [(self.patient.id, CANCELLED_SUBJECT)] * 2
+        )
+        # Resolved once; running it again finds nothing left to do
+        self.assertEqual(resolve_leave(leave), (0, 0))
+        self.assertEqual(Notification.objects.count(), 2)
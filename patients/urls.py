@@ -7,14 +7,15 @@ app_name = 'patients'
 urlpatterns = [
     # Main Dashboard
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/tab/<slug:tab>/', views.dashboard_tab, name='dashboard_tab'),
 
     # Edit Profile
     path('edit-profile/', views.edit_profile, name='edit_profile'),
     
     # Redirect old standalone pages to dashboard with correct tab
-    path('medical-records/', RedirectView.as_view(url='/patients/dashboard/#medical-records', permanent=True)),
-    path('prescriptions/', RedirectView.as_view(url='/patients/dashboard/#prescriptions', permanent=True)),
-    path('billing/', RedirectView.as_view(url='/patients/dashboard/#billing', permanent=True)),
+    path('medical-records/', RedirectView.as_view(url='/patients/dashboard/?tab=medical-records#medical-records', permanent=True)),
+    path('prescriptions/', RedirectView.as_view(url='/patients/dashboard/?tab=prescriptions#prescriptions', permanent=True)),
+    path('billing/', RedirectView.as_view(url='/patients/dashboard/?tab=billing#billing', permanent=True)),
 
     # Booking & Appointments
     path('appointments/', views.appointments, name='appointments'),
@@ -31,6 +32,7 @@ urlpatterns = [
 
     # Health & Education
     path('health-article/<int:article_id>/', views.view_health_article, name='view_health_article'),
+    path('health-articles/search/', views.search_health_articles, name='search_health_articles'),
 
     # PDF Downloads
     path('download-medical-history-pdf/', views.download_medical_history_pdf, name='download_medical_history_pdf'),
@@ -42,9 +44,11 @@ urlpatterns = [
     path('get_doctors_by_department/', views.get_doctors_by_department, name='get_doctors_by_department'),
     path('get_available_time_slots/', views.get_available_time_slots, name='get_available_time_slots'),
     path('get_doctor_schedule/', views.get_doctor_schedule, name='get_doctor_schedule'),
+    path('get_doctor_calendar/', views.get_doctor_calendar, name='get_doctor_calendar'),
 
     # Payment
     path('payment-success/', views.payment_success, name='payment_success'),
+    path('stripe-webhook/', views.stripe_webhook, name='stripe_webhook'),
 
     # Dashboard Redirect (Root for patients)
     path('', RedirectView.as_view(url='/patients/dashboard/', permanent=True), name='dashboard'),
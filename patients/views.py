@@ -3,63 +3,135 @@ from email.policy import default
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.urls import reverse
-from django.views.decorators.http import require_GET
+from django.views.decorators.http import require_GET, require_POST
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import login
 from django.contrib.auth.forms import UserCreationForm
 from accounts.utils import role_required
 from django.utils import timezone
 from datetime import date, datetime, time, timedelta
 from admins.models import DoctorAllocation, Department, HealthArticle
-from .models import Billing, Appointment, MedicalVisit, TimeSlot
-from doctors.models import DoctorAvailability, Prescription, DiagnosisNote
+from admins.fragment_cache import fragment_context
+from admins.articles import article_conditional
+from admins.search import attach_snippets, search_articles
+from .models import Billing, Appointment, AppointmentHistory, EncounterEntry, TimeSlot
+from doctors.models import DoctorAvailability, Prescription
 from accounts.models import CustomUser
 from accounts.forms import PatientProfileForm
+from accounts.dashboard import DashboardTabs
+from accounts.panels import gather
 from .forms import AppointmentBookingForm
 from django.db.models import Sum, Count
 import json
 from django.core.paginator import Paginator
+from django.utils.functional import SimpleLazyObject
 from django.http import HttpResponse
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from io import BytesIO
 import stripe
 from django.conf import settings
-
-
-stripe.api_key = settings.STRIPE_SECRET_KEY
+from .calendar import DOCTORS_PER_PAGE, build_calendar, week_days, week_start
+from .archive import AppointmentPages, archived_appointment, archived_appointments, count_archived
+from .availability import SLOT_LENGTH, free_slots
+from .payments import (
+    PaymentGatewayError,
+    construct_webhook_event,
+    get_or_create_checkout_session,
+    verify_checkout_session,
+)
+from .reconciliation import ingest_event
 
 
 # -----------------------------
 # Patient Dashboard
 # -----------------------------
-@login_required
-@role_required('patient')
-def dashboard(request):
-    user = request.user
-    today = timezone.now().date()
+dashboard_tabs = DashboardTabs('patients:dashboard_tab', 'patients/dashboard_tabs', default='overview')
 
-    # Upcoming Appointments
-    upcoming_appointments = Appointment.objects.filter(
+
+def _upcoming_appointments(user):
+    return Appointment.objects.filter(
         patient=user,
-        schedule__date__gte=today,
+        date__gte=timezone.now().date(),
         status='booked'
-    ).select_related('doctor', 'schedule').order_by('schedule__date', 'schedule__start_time')
+    ).select_related('doctor').order_by('date', 'start_time')
+
+
+# Article lists are fragment-cached; the page is built lazily so a
+# cache hit doesn't run its queries
+def _health_articles():
+    return HealthArticle.objects.select_related('author').defer('content', 'content_html')
+
+
+@dashboard_tabs.tab('overview')
+def _overview_tab(request):
+    user = request.user
+    counts = gather({
+        'upcoming_appointments_count': _upcoming_appointments(user).count,
+        'completed_count': Appointment.objects.filter(patient=user, status='completed').count,
+        'archived_count': AppointmentHistory.objects.filter(patient_id=user.id, status='completed').count,
+        'active_prescriptions_count': Prescription.objects.filter(patient=user, status='Pending').count,
+        'unpaid_bills_count': Billing.objects.filter(patient=user, status='pending').count,
+    })
+    return {
+        **counts,
+        'medical_records_count': counts['completed_count'] + counts['archived_count'],
+        'latest_health_articles': _health_articles()[:3],
+        **fragment_context(),
+    }
+
+
+@dashboard_tabs.tab('appointments')
+def _appointments_tab(request):
+    return {'upcoming_appointments': _upcoming_appointments(request.user)}
+
 
-    # Completed Appointments for Medical Records
+@dashboard_tabs.tab('medical-records')
+def _medical_records_tab(request):
+    user = request.user
+
+    # Completed appointments from the live and the archive tier, newest
+    # first; only the page shown is read and turned into records
     completed_appointments = Appointment.objects.filter(
         patient=user,
         status='completed'
-    ).select_related('doctor', 'schedule').order_by('-schedule__date')
+    ).select_related('doctor')
+    medical_records_page = Paginator(
+        AppointmentPages(completed_appointments, user, status='completed'), 5
+    ).get_page(request.GET.get('page_medical_records'))
+
+    # Diagnosis notes of the live appointments on the page in one query
+    notes_by_appointment = {}
+    diagnosis_entries = EncounterEntry.objects.filter(
+        patient=user,
+        kind='diagnosis',
+        appointment_id__in=[a.id for a in medical_records_page if not getattr(a, 'is_archived', False)]
+    ).order_by('-created_at').values_list('appointment_id', 'notes')
+    for appointment_id, note in diagnosis_entries:
+        notes_by_appointment.setdefault(appointment_id, []).append(note)
 
     medical_records = []
-    for appointment in completed_appointments:
+    for appointment in medical_records_page:
+        if getattr(appointment, 'is_archived', False):
+            # Older visits live in the archive tier
+            notes = [n.notes for n in appointment.diagnosis_notes]
+            medicines = [p.medication.name for p in appointment.prescriptions]
+            medical_records.append({
+                'appointment': appointment,
+                'date': appointment.date,
+                'doctor_name': f"Dr. {appointment.doctor.get_full_name()}",
+                'department': appointment.department or "General Practice",
+                'diagnosis': "; ".join(notes) if notes else "No diagnosis recorded",
+                'medicines': ", ".join(medicines) if medicines else "No medicines prescribed",
+                'detail_url': reverse('patients:visit_detail', args=[appointment.id])
+            })
+            continue
+
         # Get diagnosis notes
-        diagnosis_notes = DiagnosisNote.objects.filter(
-            appointment=appointment,
-            patient=user
-        ).values_list('note', flat=True)
+        diagnosis_notes = notes_by_appointment.get(appointment.id, [])
         diagnosis_text = "; ".join(diagnosis_notes) if diagnosis_notes else "No diagnosis recorded"
 
         # Get prescriptions (only medicine names)
@@ -81,7 +153,7 @@ def dashboard(request):
 
         medical_records.append({
             'appointment': appointment,
-            'date': appointment.schedule.date,
+            'date': appointment.date,
             'doctor_name': f"Dr. {appointment.doctor.get_full_name()}",
             'department': department_name,
             'diagnosis': diagnosis_text,
@@ -89,42 +161,47 @@ def dashboard(request):
             'detail_url': reverse('patients:visit_detail', args=[appointment.id])
         })
 
-    # Paginate medical records
-    medical_records_paginator = Paginator(medical_records, 5)
-    medical_records_page_number = request.GET.get('page_medical_records')
-    medical_records_page = medical_records_paginator.get_page(medical_records_page_number)
+    medical_records_page.object_list = medical_records
+    return {'medical_records_page': medical_records_page}
 
+
+@dashboard_tabs.tab('billing')
+def _billing_tab(request):
     # Unpaid Bills
-    unpaid_bills = Billing.objects.filter(patient=user, is_paid=False)
+    unpaid_bills = Billing.objects.filter(
+        patient=request.user, status='pending'
+    ).select_related('appointment__doctor').order_by('due_date', 'id')
     bills_paginator = Paginator(unpaid_bills, 8)
-    bills_page_number = request.GET.get('page_bills')
-    bills_page = bills_paginator.get_page(bills_page_number)
-
-    # Summary counts
-    medical_records_count = medical_records_paginator.count
-    active_prescriptions_count = prescriptions.count() if 'prescriptions' in locals() else 0
-    unpaid_bills_count = bills_paginator.count
+    return {'bills_page': bills_paginator.get_page(request.GET.get('page_bills'))}
 
-    health_articles_list = HealthArticle.objects.all()
-    latest_health_articles = health_articles_list[:3]
-    paginator = Paginator(health_articles_list, 6)
-    page_number = request.GET.get('page')
-    health_articles = paginator.get_page(page_number)
 
-    context = {
-        'upcoming_appointments': upcoming_appointments,
-        'medical_records_count': medical_records_count,
-        'active_prescriptions_count': active_prescriptions_count,
-        'unpaid_bills_count': unpaid_bills_count,
-        'medical_records_page': medical_records_page,
-        'bills_page': bills_page,
-        'recent_activity': [],
-        'user': request.user,
-        'latest_health_articles': latest_health_articles,
-        'health_articles': health_articles,
+@dashboard_tabs.tab('education')
+def _education_tab(request):
+    health_articles_list = _health_articles()
+    return {
+        'health_articles': SimpleLazyObject(
+            lambda: Paginator(health_articles_list, 6).get_page(request.GET.get('page'))
+        ),
+        **fragment_context(),
     }
 
-    return render(request, 'patients/dashboard.html', context)
+
+@dashboard_tabs.tab('profile')
+def _profile_tab(request):
+    return {'user': request.user}
+
+
+@login_required
+@role_required('patient')
+def dashboard(request):
+    return dashboard_tabs.render_shell(request, 'patients/dashboard.html')
+
+
+@login_required
+@role_required('patient')
+def dashboard_tab(request, tab):
+    """One dashboard tab, fetched by the dashboard page when it is first shown."""
+    return dashboard_tabs.render_tab(request, tab)
 
 # -----------------------------
 # Profile
@@ -143,7 +220,7 @@ def edit_profile(request):
             else:
                 form.save()
                 messages.success(request, 'Your profile has been updated successfully!')
-                return redirect('/patients/dashboard/#profile')
+                return redirect('/patients/dashboard/?tab=profile#profile')
         else:
             messages.error(request, 'Please correct the errors below.')
     else:
@@ -162,28 +239,31 @@ def appointments(request):
     # Upcoming Appointments (not cancelled)
     upcoming_appointments = Appointment.objects.filter(
         patient=user,
-        schedule__date__gte=today,
+        date__gte=today,
         status='booked'
-    ).select_related('doctor', 'schedule').order_by('schedule__date', 'schedule__start_time')
+    ).select_related('doctor').order_by('date', 'start_time')
 
     # Past Appointments (completed or cancelled, in the past)
     past_appointments = Appointment.objects.filter(
         patient=user,
-        schedule__date__lt=today
-    ).select_related('doctor', 'schedule').order_by('-schedule__date', '-schedule__start_time')
+        date__lt=today
+    ).select_related('doctor').order_by('-date', '-start_time')
 
     # Paginate Upcoming (10 per page)
     paginator_upcoming = Paginator(upcoming_appointments, 6)
     page_upcoming = request.GET.get('page_upcoming')
     upcoming_page = paginator_upcoming.get_page(page_upcoming)
 
-    # Paginate Past (10 per page)
-    paginator_past = Paginator(past_appointments, 6)
+    # Paginate Past (10 per page), from both the live and the archive tier
+    paginator_past = Paginator(AppointmentPages(past_appointments, user), 6)
     page_past = request.GET.get('page_past')
     past_page = paginator_past.get_page(page_past)
 
     # Summary counts
-    completed_count = past_appointments.filter(status='completed').count()
+    completed_count = (
+        past_appointments.filter(status='completed').count()
+        + count_archived(user, status='completed')
+    )
     total_appointments_count = upcoming_page.paginator.count + past_page.paginator.count
 
     context = {
@@ -203,12 +283,23 @@ def appointments(request):
 @role_required('patient')
 def medical_record_detail(request, appointment_id):
     # Get the appointment, ensuring it belongs to the logged-in patient
-    appointment = get_object_or_404(Appointment, id=appointment_id, patient=request.user, status='completed')
+    appointment = Appointment.objects.filter(id=appointment_id, patient=request.user, status='completed').first()
+    if appointment is None:
+        archived = archived_appointment(request.user, appointment_id, status='completed')
+        if archived is None:
+            raise Http404("No medical record found.")
+        return render(request, 'patients/medical_record_detail.html', {
+            'appointment': archived,
+            'diagnosis_notes': archived.diagnosis_notes,
+            'prescriptions': archived.prescriptions,
+            'bill': archived.bills[0] if archived.bills else None,
+        })
 
     # Get diagnosis notes for this appointment
-    diagnosis_notes = DiagnosisNote.objects.filter(
+    diagnosis_notes = EncounterEntry.objects.filter(
         appointment=appointment,
-        patient=request.user
+        patient=request.user,
+        kind='diagnosis'
     ).order_by('-created_at')
 
     # Get prescriptions for this appointment
@@ -235,24 +326,44 @@ def medical_record_detail(request, appointment_id):
 # -----------------------------
 # Visit Detail & PDF Download
 # -----------------------------
+def _patient_appointment(patient, appointment_id):
+    """The patient's appointment from the live tables, else from the archive; 404 if neither."""
+    appointment = Appointment.objects.filter(id=appointment_id, patient=patient).first()
+    if appointment is None:
+        appointment = archived_appointment(patient, appointment_id)
+    if appointment is None:
+        raise Http404("No appointment found.")
+    return appointment
+
+
+def _encounter_entries(appointment):
+    """Visit records, diagnosis notes and treatments of one appointment, newest first."""
+    if getattr(appointment, 'is_archived', False):
+        entries = [*appointment.medical_visits, *appointment.diagnosis_notes, *appointment.treatments]
+        return sorted(entries, key=lambda entry: entry.created_at, reverse=True)
+    return list(
+        EncounterEntry.objects.filter(appointment=appointment).select_related('doctor').order_by('-created_at')
+    )
+
 @login_required
 @role_required('patient')
 def visit_detail(request, appointment_id):
-    appointment = get_object_or_404(Appointment, id=appointment_id, patient=request.user)
-    
-    # Get related medical history for this visit
-    medical_history = MedicalVisit.objects.filter(
-        patient=request.user
-    ).order_by('-created_at')[:5]
+    appointment = _patient_appointment(request.user, appointment_id)
+
+    # The records of this visit: the same entries the PDF prints
+    entries = _encounter_entries(appointment)
     
     # ✅ Get prescriptions FOR THIS SPECIFIC APPOINTMENT
-    prescriptions = Prescription.objects.filter(
-        appointment=appointment
-    ).select_related('medication', 'doctor').order_by('-created_at')
+    if getattr(appointment, 'is_archived', False):
+        prescriptions = appointment.prescriptions
+    else:
+        prescriptions = Prescription.objects.filter(
+            appointment=appointment
+        ).select_related('medication', 'doctor').order_by('-created_at')
     
     context = {
         'appointment': appointment,
-        'medical_history': medical_history,
+        'entries': entries,
         'prescriptions': prescriptions,
     }
     return render(request, 'patients/visit_detail.html', context)
@@ -260,29 +371,27 @@ def visit_detail(request, appointment_id):
 @login_required
 @role_required('patient')
 def download_visit_pdf(request, appointment_id):
-    appointment = get_object_or_404(Appointment, id=appointment_id, patient=request.user)
+    appointment = _patient_appointment(request.user, appointment_id)
+    entries = _encounter_entries(appointment)
 
-    # Get diagnosis notes
-    from doctors.models import DiagnosisNote
-    diagnosis_notes = DiagnosisNote.objects.filter(
-        appointment=appointment,
-        patient=request.user
-    ).order_by('-created_at')
+    if getattr(appointment, 'is_archived', False):
+        prescriptions = appointment.prescriptions
+        bill = appointment.bills[0] if appointment.bills else None
+    else:
+        # Get prescriptions
+        prescriptions = Prescription.objects.filter(
+            appointment=appointment,
+            patient=request.user
+        ).select_related('medication', 'doctor').order_by('-created_at')
 
-    # Get prescriptions
-    prescriptions = Prescription.objects.filter(
-        appointment=appointment,
-        patient=request.user
-    ).select_related('medication', 'doctor').order_by('-created_at')
+        # Try to get bill
+        bill = Billing.objects.filter(appointment=appointment).first()
 
-    # Try to get bill
-    try:
-        bill = Billing.objects.get(appointment=appointment)
+    if bill:
         total_amount = bill.amount
         is_paid = bill.is_paid
         due_date = bill.due_date
-    except Billing.DoesNotExist:
-        bill = None
+    else:
         total_amount = 0
         is_paid = False
         due_date = None
@@ -325,25 +434,31 @@ def download_visit_pdf(request, appointment_id):
     p.setFont("Helvetica", 11)
     p.drawString(50, y, f"Doctor: Dr. {appointment.doctor.get_full_name()}")
     y -= 15
-    p.drawString(50, y, f"Date: {appointment.schedule.date.strftime('%b %d, %Y')}")
+    p.drawString(50, y, f"Date: {appointment.date.strftime('%b %d, %Y')}")
     y -= 15
-    p.drawString(50, y, f"Time: {appointment.schedule.start_time.strftime('%I:%M %p')}")
+    p.drawString(50, y, f"Time: {appointment.start_time.strftime('%I:%M %p')}")
     y -= 15
     symptoms = appointment.symptoms or "Not specified"
     p.drawString(50, y, f"Symptoms: {symptoms}")
     y -= 30
 
-    # Diagnosis
-    if diagnosis_notes:
+    # Diagnosis and treatment
+    if entries:
         p.setFont("Helvetica-Bold", 14)
-        p.drawString(50, y, "Diagnosis")
+        p.drawString(50, y, "Diagnosis & Treatment")
         y -= 25
         p.setFont("Helvetica", 11)
-        for note in diagnosis_notes:
+        for entry in entries:
             if y < 100:
                 p.showPage()
                 y = height - 50
-            p.drawString(50, y, f"• {note.note}")
+            if entry.kind == 'visit':
+                line = f"Diagnosis: {entry.diagnosis}" + (f" - {entry.notes}" if entry.notes else "")
+            elif entry.kind == 'treatment':
+                line = f"Treatment: {entry.notes}"
+            else:
+                line = entry.notes
+            p.drawString(50, y, f"• {line}")
             y -= 15
         y -= 10
 
@@ -419,22 +534,12 @@ def pay_bill(request, billing_id):
     billing = get_object_or_404(Billing, id=billing_id, patient=request.user)
 
     if request.method == 'POST':
+        if billing.is_paid:
+            messages.info(request, "This bill is already paid.")
+            return redirect('patients:dashboard')
         try:
-            # Create Stripe Checkout Session
-            session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=[{
-                    'price_data': {
-                        'currency': 'inr',
-                        'product_data': {
-                            'name': f"Medical Bill #{billing.id}",
-                            'description': billing.description,
-                        },
-                        'unit_amount': int(billing.amount * 100),  # in paise
-                    },
-                    'quantity': 1,
-                }],
-                mode='payment',
+            checkout_url = get_or_create_checkout_session(
+                billing,
                 success_url=request.build_absolute_uri(
                     reverse('patients:payment_success')
                 ) + f'?session_id={{CHECKOUT_SESSION_ID}}&billing_id={billing.id}',
@@ -442,13 +547,15 @@ def pay_bill(request, billing_id):
                     reverse('patients:dashboard')
                 ),
             )
-            return redirect(session.url, code=303)
-        except Exception as e:
+            return redirect(checkout_url, code=303)
+        except PaymentGatewayError as e:
             messages.error(request, f"Error creating payment session: {str(e)}")
             return redirect('patients:dashboard')
 
     return render(request, 'patients/pay_bill.html', {'billing': billing})
 
+@login_required
+@role_required('patient')
 def payment_success(request):
     session_id = request.GET.get('session_id')
     billing_id = request.GET.get('billing_id')
@@ -457,32 +564,75 @@ def payment_success(request):
         messages.error(request, "Missing payment details.")
         return redirect('patients:dashboard')
 
+    billing = get_object_or_404(Billing, id=billing_id, patient=request.user)
+    if billing.is_paid:
+        messages.info(request, "This bill is already paid.")
+        return redirect('patients:dashboard')
+
+    # Never trust the redirect parameters alone: confirm with the gateway
+    if session_id != billing.checkout_session_id:
+        messages.error(request, "Payment session does not match this bill.")
+        return redirect('patients:dashboard')
+
     try:
-        billing = get_object_or_404(Billing, id=billing_id, patient=request.user)
-        if not billing.is_paid:
-            billing.is_paid = True
-            billing.save()
+        if verify_checkout_session(billing):
             messages.success(request, "Payment successful! Thank you.")
         else:
-            messages.info(request, "This bill is already paid.")
-    except Exception as e:
-        messages.error(request, f"Error updating bill: {str(e)}")
+            messages.info(request, "Your payment is being processed. The bill will update once it is confirmed.")
+    except PaymentGatewayError:
+        messages.info(request, "Your payment is being processed. The bill will update once it is confirmed.")
 
     return redirect('patients:dashboard')
 
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    """
+    Gateway callback; the signed event is the source of truth for payments.
+    """
+    try:
+        event = construct_webhook_event(
+            request.body, request.META.get('HTTP_STRIPE_SIGNATURE', '')
+        )
+    except (ValueError, stripe.SignatureVerificationError):
+        return HttpResponse(status=400)
+
+    ingest_event(event)
+    return HttpResponse(status=200)
+
 # -----------------------------
 # Health Education
 # -----------------------------
 @login_required
 @role_required('patient')
+@cache_control(private=True, no_cache=True)
+@article_conditional
 def view_health_article(request, article_id):
     """
     Patient view to read a single health article.
     """
-    article = get_object_or_404(HealthArticle, id=article_id)
+    article = get_object_or_404(HealthArticle.objects.select_related('author').defer('content'), id=article_id)
     
     return render(request, 'patients/view_health_article.html', {'article': article})
 
+@login_required
+@role_required('patient')
+def search_health_articles(request):
+    """
+    Patient search over health articles, ranked by relevance and recency.
+    """
+    query = request.GET.get('q', '').strip()
+    articles, terms = search_articles(query) if query else ([], [])
+
+    paginator = Paginator(articles, 6)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    attach_snippets(page_obj, terms)
+
+    return render(request, 'patients/search_health_articles.html', {
+        'query': query,
+        'page_obj': page_obj,
+    })
+
 # -----------------------------
 # Prescription PDF Download
 # -----------------------------
@@ -634,39 +784,22 @@ def get_available_time_slots(request):
 
     try:
         doctor = CustomUser.objects.get(id=doctor_id, role='doctor')
-        day_of_week_short = selected_date.strftime('%a').lower()  # 'Monday' → 'mon'
-        availability = DoctorAvailability.objects.get(doctor=doctor, day_of_week=day_of_week_short)
-    except (CustomUser.DoesNotExist, DoctorAvailability.DoesNotExist):
+    except CustomUser.DoesNotExist:
         return JsonResponse({'available_slots': []})
 
-    start_time = availability.start_time
-    end_time = availability.end_time
-
-    current = datetime.combine(selected_date, start_time)
-    end_dt = datetime.combine(selected_date, end_time)
-
-    # Get already booked time slots
-    booked_slots = Appointment.objects.filter(
+    # Taken slots are blocked, and so is the part of today already gone
+    blocked = []
+    for start_time in Appointment.objects.filter(
         doctor=doctor,
-        schedule__date=selected_date,
-        status='booked'
-    ).values_list('schedule__start_time', flat=True)
-    booked_times = {bt.strftime('%H:%M') for bt in booked_slots}
-
-    available_slots = []
-    while current + timedelta(minutes=30) <= end_dt:
-        slot_time = current.time()
-        slot_str = slot_time.strftime('%H:%M')
-
-        # Skip past times on today
-        if selected_date == today and slot_time < now_time:
-            current += timedelta(minutes=30)
-            continue
+        date=selected_date,
+        status__in=Appointment.OCCUPYING_STATUSES
+    ).values_list('start_time', flat=True):
+        start = datetime.combine(selected_date, start_time)
+        blocked.append((start, start + SLOT_LENGTH))
+    if selected_date == today:
+        blocked.append((datetime.combine(today, time.min), datetime.combine(today, now_time)))
 
-        if slot_str not in booked_times:
-            available_slots.append(slot_str)
-
-        current += timedelta(minutes=30)
+    available_slots = [slot.strftime('%H:%M') for slot in free_slots(doctor, selected_date, blocked)]
 
     return JsonResponse({'available_slots': available_slots})
 
@@ -685,7 +818,7 @@ def book_appointment_form(request):
             symptoms = form.cleaned_data['symptoms']
 
             # Calculate end time
-            end_time_obj = (datetime.combine(date, time_obj) + timedelta(minutes=30)).time()
+            end_time_obj = (datetime.combine(date, time_obj) + SLOT_LENGTH).time()
 
             # ✅ Get or create TimeSlot with correct date
             time_slot, created = TimeSlot.objects.get_or_create(
@@ -726,9 +859,41 @@ def book_appointment_form(request):
 @login_required
 @role_required('patient')
 def view_doctors_schedule(request):
-    doctors = CustomUser.objects.filter(role='doctor')
-    schedules = TimeSlot.objects.filter(doctor__in=doctors).order_by('date', 'start_time')
-    return render(request, 'patients/doctor_schedule.html', {'schedules': schedules})
+    """
+    Week-at-a-glance grid of free/booked slots per doctor, paged by week
+    (?week=YYYY-MM-DD) and by doctor (?page=), optionally by department.
+    """
+    start, doctors_page, department_id = _calendar_params(request)
+    days = week_days(start)
+    return render(request, 'patients/doctor_schedule.html', {
+        'days': days,
+        'rows': build_calendar(doctors_page, start),
+        'doctors_page': doctors_page,
+        'departments': Department.objects.all(),
+        'department_id': department_id,
+        'previous_week': start - timedelta(days=7),
+        'next_week': start + timedelta(days=7),
+        'today': timezone.localdate(),
+    })
+
+def _calendar_params(request):
+    """Week start, page of doctors and department filter for the calendar views."""
+    start = week_start(request.GET.get('week'))
+    doctors = CustomUser.objects.filter(role='doctor').only('id', 'username', 'first_name', 'last_name')
+    department_id = request.GET.get('department')
+    if department_id and department_id.isdigit():
+        doctors = doctors.filter(
+            id__in=DoctorAllocation.objects.filter(department_id=department_id).values('doctor_id')
+        )
+    else:
+        department_id = None
+    doctor_id = request.GET.get('doctor_id')
+    if doctor_id and doctor_id.isdigit():
+        doctors = doctors.filter(id=doctor_id)
+    doctors_page = Paginator(doctors.order_by('first_name', 'last_name', 'id'), DOCTORS_PER_PAGE).get_page(
+        request.GET.get('page')
+    )
+    return start, doctors_page, department_id
 
 # -----------------------------
 # Cancel Appointment
@@ -761,7 +926,7 @@ def edit_appointment(request, appointment_id):
     # Only allow editing of booked appointments
     if appointment.status != 'booked':
         messages.error(request, 'Cannot edit this appointment.')
-        return redirect('/patients/dashboard/#appointments')
+        return redirect('/patients/dashboard/?tab=appointments#appointments')
     
     if request.method == 'POST':
         form = AppointmentBookingForm(request.POST, instance=appointment)
@@ -772,7 +937,7 @@ def edit_appointment(request, appointment_id):
             symptoms = form.cleaned_data['symptoms']
 
             # Get or create the TimeSlot
-            end_time_obj = (datetime.combine(date, time_obj) + timedelta(minutes=30)).time()
+            end_time_obj = (datetime.combine(date, time_obj) + SLOT_LENGTH).time()
             time_slot, created = TimeSlot.objects.get_or_create(
                 doctor=doctor,
                 date=date,
@@ -799,8 +964,8 @@ def edit_appointment(request, appointment_id):
         # Pre-populate form with existing appointment data
         form = AppointmentBookingForm(initial={
             'doctor': appointment.doctor,
-            'date': appointment.schedule.date,
-            'time': appointment.schedule.start_time,
+            'date': appointment.date,
+            'time': appointment.start_time,
             'symptoms': appointment.symptoms
         })
 
@@ -816,11 +981,27 @@ def download_medical_history_pdf(request):
 
     user = request.user
 
-    # Fetch data
-    medical_visits = MedicalVisit.objects.filter(patient=user).order_by('-created_at')
-    prescriptions = Prescription.objects.filter(patient=user).select_related('medication', 'doctor').order_by('-created_at')
-    appointments = Appointment.objects.filter(patient=user).select_related('doctor', 'schedule').order_by('-schedule__date')
-    bills = Billing.objects.filter(patient=user).order_by('-created_at')
+    # Fetch data from the live tables and the archive
+    archived = archived_appointments(user)
+    medical_visits = [
+        *EncounterEntry.objects.filter(patient=user, kind='visit').select_related('doctor').order_by('-created_at'),
+        *(v for a in archived for v in a.medical_visits),
+    ]
+    prescriptions = [
+        *Prescription.objects.filter(patient=user).select_related('medication', 'doctor').order_by('-created_at'),
+        *(p for a in archived for p in a.prescriptions),
+    ]
+    # Archived appointments' bills are live rows too, linked through `history`
+    bills = Billing.objects.filter(patient=user).select_related('history').order_by('-created_at')
+
+    # Medicine cost per appointment, for the billing section
+    medicine_costs = dict(
+        Prescription.objects.filter(patient=user, appointment__isnull=False)
+        .values('appointment_id').annotate(total=Sum('line_total'))
+        .values_list('appointment_id', 'total')
+    )
+    for a in archived:
+        medicine_costs[a.id] = sum(p.line_total for p in a.prescriptions)
 
     # Header
     p.setFont("Helvetica-Bold", 16)
@@ -842,7 +1023,7 @@ def download_medical_history_pdf(request):
     y -= 25
 
     p.setFont("Helvetica", 10)
-    if medical_visits.exists():
+    if medical_visits:
         for visit in medical_visits:
             diagnosis = visit.diagnosis or "Unknown"
             symptoms = visit.symptoms or "Not specified"
@@ -879,7 +1060,7 @@ def download_medical_history_pdf(request):
     y -= 25
 
     p.setFont("Helvetica", 10)
-    if prescriptions.exists():
+    if prescriptions:
         for prescription in prescriptions:
             text = (
                 f"{prescription.created_at.strftime('%Y-%m-%d')}: "
@@ -921,14 +1102,14 @@ def download_medical_history_pdf(request):
     y -= 25
 
     p.setFont("Helvetica", 10)
-    if bills.exists():
+    if bills:
         total_paid = 0
         total_unpaid = 0
 
         for bill in bills:
             # Calculate medicine cost (sum of prescriptions for this bill's appointment)
-            associated_prescriptions = Prescription.objects.filter(appointment=bill.appointment)
-            medicine_cost = sum(p.line_total for p in associated_prescriptions)
+            appointment_id = bill.history.appointment_id if bill.history_id else bill.appointment_id
+            medicine_cost = medicine_costs.get(appointment_id) or 0
             consultation_fee = settings.CONSULTATION_FEE
             expected_total = medicine_cost + consultation_fee
 
@@ -990,6 +1171,33 @@ def download_medical_history_pdf(request):
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
+@require_GET
+@login_required
+@role_required('patient')
+def get_doctor_calendar(request):
+    """
+    JSON calendar for one week: free/booked slot counts per doctor per day.
+    Same parameters as the schedule page.
+    """
+    start, doctors_page, _ = _calendar_params(request)
+    days = [day.isoformat() for day in week_days(start)]
+    return JsonResponse({
+        'week': start.isoformat(),
+        'previous_week': (start - timedelta(days=7)).isoformat(),
+        'next_week': (start + timedelta(days=7)).isoformat(),
+        'days': days,
+        'page': doctors_page.number,
+        'num_pages': doctors_page.paginator.num_pages,
+        'doctors': [
+            {
+                'id': row['doctor'].id,
+                'name': row['doctor'].get_full_name() or row['doctor'].username,
+                'days': dict(zip(days, row['days'])),
+            }
+            for row in build_calendar(doctors_page, start)
+        ],
+    })
+
 @require_GET
 @login_required
 @role_required('patient')